@@ -2,16 +2,35 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse, HTMLResponse
+import numpy as np
 import pandas as pd
 import joblib
-import requests
-from datetime import datetime
 from pydantic import BaseModel
 from typing import List, Dict
+import asyncio
 import json
 import os
+import sys
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Smart Agriculture API")
+# Add the parent directory to sys.path to share the project-wide HTTP client
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import http_client
+from weather_providers import get_provider
+from prewarm import PREWARM_ENABLED, FieldPrewarmer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared HTTP client and start pre-warming saved fields"""
+    await http_client.connect_http_client()
+    if PREWARM_ENABLED:
+        prewarmer.start()
+    yield
+    await prewarmer.stop()
+    await http_client.close_http_client()
+
+app = FastAPI(title="Smart Agriculture API", lifespan=lifespan)
 
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -23,95 +42,117 @@ DISEASE_ENCODER_PATH = "model/disease_label_encoder.pkl"
 RISK_ENCODER_PATH = "model/risk_label_encoder.pkl"
 FIELDS_FILE = "data/fields.json"
 
+# Per-field forecasts come from MET Norway unless overridden (e.g. "simulator" for offline load tests)
+field_provider = get_provider(os.getenv("FIELD_WEATHER_PROVIDER", "met"))
+
 # Load models
 model = joblib.load(MODEL_PATH)
 le_disease = joblib.load(DISEASE_ENCODER_PATH)
 le_risk = joblib.load(RISK_ENCODER_PATH)
 
+RISK_FEATURES = ["Disease_enc", "Temperature", "Humidity", "Rainfall",
+                 "Cloud Cover", "Wind Speed", "Leaf Wetness"]
+# Encoded disease codes and risk labels, looked up once instead of per prediction
+DISEASE_NAMES = np.asarray(le_disease.classes_)
+DISEASE_CODES = le_disease.transform(DISEASE_NAMES)
+RISK_LABELS = np.asarray(le_risk.classes_)
+
 class Field(BaseModel):
     name: str
     lat: float
     lon: float
 
-def estimate_leaf_wetness(humidity: float, rainfall: float) -> float:
-    if humidity > 90 and rainfall > 0:
-        return 13 + (humidity - 90) * 0.1 + rainfall * 0.5
-    elif humidity > 90:
-        return 11 + (humidity - 90) * 0.2
-    elif rainfall > 0:
-        return 10 + rainfall * 0.5
-    else:
-        return 8
-
-def get_met_weather_forecast(lat: float, lon: float):
-    url = f"https://api.met.no/weatherapi/locationforecast/2.0/compact?lat={lat}&lon={lon}"
-    headers = {
-        "User-Agent": "smart-agri-dashboard/1.0 contact@example.com"
-    }
-
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=f"MET API Error: {response.text}")
-
-    data = response.json()
-    timeseries = data['properties']['timeseries']
-    forecast_list = []
-    seen_dates = set()
-
-    for entry in timeseries:
-        timestamp = entry['time']
-        dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-
-        if dt.hour == 12 and dt.date() not in seen_dates:
-            details = entry['data']['instant']['details']
-            rain = entry['data'].get('next_6_hours', {}).get('details', {}).get('precipitation_amount', 0.0)
-
-            forecast = {
-                'Date': dt.strftime('%Y-%m-%d'),
-                'Temperature': details.get('air_temperature', 0),
-                'Humidity': details.get('relative_humidity', 0),
-                'Rainfall': rain,
-                'Cloud Cover': details.get('cloud_area_fraction', 0),
-                'Wind Speed': details.get('wind_speed', 0),
-            }
-
-            forecast['Leaf Wetness'] = round(estimate_leaf_wetness(forecast['Humidity'], forecast['Rainfall']), 2)
-            forecast_list.append(forecast)
-            seen_dates.add(dt.date())
-
-        if len(forecast_list) == 7:
-            break
-
+def estimate_leaf_wetness(humidity, rainfall) -> np.ndarray:
+    """Leaf wetness hours from humidity and rainfall; accepts scalars or arrays"""
+    humidity = np.asarray(humidity, dtype=np.float64)
+    rainfall = np.asarray(rainfall, dtype=np.float64)
+    humid = humidity > 90
+    wet = rainfall > 0
+    return np.select(
+        [humid & wet, humid, wet],
+        [13 + (humidity - 90) * 0.1 + rainfall * 0.5, 11 + (humidity - 90) * 0.2, 10 + rainfall * 0.5],
+        default=8.0,
+    )
+
+def add_leaf_wetness(forecast_list: List[Dict]) -> List[Dict]:
+    """Fill in 'Leaf Wetness' for every forecast day in one vectorized pass"""
+    if forecast_list:
+        wetness = np.round(estimate_leaf_wetness(
+            [f['Humidity'] for f in forecast_list], [f['Rainfall'] for f in forecast_list]
+        ), 2)
+        for forecast, value in zip(forecast_list, wetness.tolist()):
+            forecast['Leaf Wetness'] = value
     return forecast_list
 
-def predict_risk_for_all_diseases(forecast_data: List[Dict]):
-    forecast_df = pd.DataFrame(forecast_data)
-    all_results = []
-    
-    for disease_name in le_disease.classes_:
-        disease_encoded = le_disease.transform([disease_name])[0]
-        temp_df = forecast_df.copy()
-        temp_df["Disease_enc"] = disease_encoded
-
-        features = ["Disease_enc", "Temperature", "Humidity", "Rainfall",
-                   "Cloud Cover", "Wind Speed", "Leaf Wetness"]
-        X = temp_df[features]
-        predictions = model.predict(X)
-        
-        for idx, row in temp_df.iterrows():
-            result = {
-                "date": row["Date"],
-                "disease": disease_name,
-                "risk": le_risk.inverse_transform([predictions[idx]])[0],
-                "temperature": row["Temperature"],
-                "humidity": row["Humidity"],
-                "rainfall": row["Rainfall"],
-                "cloud_cover": row["Cloud Cover"],
-                "leaf_wetness": row["Leaf Wetness"]
-            }
-            all_results.append(result)
-    
-    return all_results
+async def get_met_weather_forecast(lat: float, lon: float):
+    forecast_list = await field_provider.fetch_noon_samples_async(lat, lon, days=7)
+    return add_leaf_wetness(forecast_list)
+
+def load_fields() -> Dict:
+    if os.path.exists(FIELDS_FILE):
+        with open(FIELDS_FILE, "r") as f:
+            return json.load(f)
+    return {}
+
+async def compute_field_risk(lat: float, lon: float) -> List[Dict]:
+    forecast_data = await get_met_weather_forecast(lat, lon)
+    return await asyncio.to_thread(predict_risk_for_all_diseases, forecast_data)
+
+# Risk forecasts for saved fields are refreshed in the background on the provider's update cadence
+prewarmer = FieldPrewarmer(compute_field_risk, load_fields)
+
+def predict_risk_columns(forecast_data: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Risk for every (disease, day) pair from a single model call
+
+    The forecast days are stacked once per disease into one
+    (diseases x days, features) matrix; outputs are columns of that length,
+    disease-major, with the risk labels looked up from the encoded
+    predictions by array indexing.
+    """
+    n_days, n_diseases = len(forecast_data), len(DISEASE_NAMES)
+    forecast_df = pd.DataFrame(forecast_data, columns=["Date"] + RISK_FEATURES[1:])
+    weather = forecast_df[RISK_FEATURES[1:]].to_numpy(dtype=np.float64)
+
+    X = np.empty((n_diseases * n_days, len(RISK_FEATURES)), dtype=np.float64)
+    X[:, 0] = np.repeat(DISEASE_CODES, n_days)
+    X[:, 1:] = np.tile(weather, (n_diseases, 1))
+    predictions = model.predict(pd.DataFrame(X, columns=RISK_FEATURES)) if len(X) else np.empty(0, dtype=np.intp)
+
+    columns = {
+        "date": np.tile(forecast_df["Date"].to_numpy(dtype=object), n_diseases),
+        "disease": np.repeat(DISEASE_NAMES, n_days),
+        "risk": RISK_LABELS[predictions],
+    }
+    for key, column in [("temperature", "Temperature"), ("humidity", "Humidity"), ("rainfall", "Rainfall"),
+                        ("cloud_cover", "Cloud Cover"), ("leaf_wetness", "Leaf Wetness")]:
+        columns[key] = X[:, RISK_FEATURES.index(column)]
+    return columns
+
+def predict_risk_for_fields(forecasts: List[List[Dict]]) -> List[List[Dict]]:
+    """
+    Per-(disease, day) risk records for several fields from a single model call
+
+    Every field's days are stacked into one predict_risk_columns() call and
+    the disease-major rows are cut back into one list per field, ordered
+    as predict_risk_for_all_diseases() returns them.
+    """
+    stacked = [day for forecast in forecasts for day in forecast]
+    if not stacked:
+        return [[] for _ in forecasts]
+    columns = predict_risk_columns(stacked)
+    keys = list(columns)
+    records = [dict(zip(keys, values)) for values in zip(*(columns[k].tolist() for k in keys))]
+    n_days = len(stacked)
+    offsets = np.cumsum([0] + [len(forecast) for forecast in forecasts]).tolist()
+    return [
+        [records[d * n_days + day] for d in range(len(DISEASE_NAMES)) for day in range(start, end)]
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+def predict_risk_for_all_diseases(forecast_data: List[Dict]) -> List[Dict]:
+    """Per-(disease, day) risk records for one field"""
+    return predict_risk_for_fields([forecast_data])[0]
 
 @app.get("/")
 async def home(request: Request):
@@ -130,6 +171,9 @@ async def add_field(field: Field):
         os.makedirs(os.path.dirname(FIELDS_FILE), exist_ok=True)
         with open(FIELDS_FILE, "w") as f:
             json.dump(fields, f, indent=2)
+
+        if PREWARM_ENABLED:
+            prewarmer.schedule(field.name, field.lat, field.lon)
             
         return {"message": "Field added successfully"}
     except Exception as e:
@@ -138,30 +182,62 @@ async def add_field(field: Field):
 @app.get("/api/fields")
 async def get_fields():
     try:
-        if os.path.exists(FIELDS_FILE):
-            with open(FIELDS_FILE, "r") as f:
-                return json.load(f)
-        return {}
+        return load_fields()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/forecast")
+async def get_all_forecasts():
+    """
+    Risk forecast for every saved field, from the same provider and cache as
+    /api/forecast/{field_name}; fields without a pre-warmed result are
+    fetched concurrently and scored together in one model call off the event loop
+    """
+    try:
+        fields = load_fields()
+        results = {name: prewarmer.get(name, field["lat"], field["lon"]) for name, field in fields.items()}
+        missing = [name for name, result in results.items() if result is None]
+        forecasts = await asyncio.gather(*(
+            get_met_weather_forecast(fields[name]["lat"], fields[name]["lon"]) for name in missing
+        ), return_exceptions=True)
+        for i, (name, forecast) in enumerate(zip(missing, forecasts)):
+            if isinstance(forecast, BaseException):
+                print(f"⚠️  Forecast failed for field '{name}': {forecast}")
+                forecasts[i] = []
+        risks = await asyncio.to_thread(predict_risk_for_fields, forecasts)
+        for name, forecast, risk in zip(missing, forecasts, risks):
+            results[name] = risk
+            if forecast:
+                prewarmer.put(name, fields[name]["lat"], fields[name]["lon"], risk)
+        return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/forecast/{field_name}")
 async def get_forecast(field_name: str):
     try:
-        with open(FIELDS_FILE, "r") as f:
-            fields = json.load(f)
+        fields = load_fields()
         
         if field_name not in fields:
             raise HTTPException(status_code=404, detail="Field not found")
             
         field = fields[field_name]
-        forecast_data = get_met_weather_forecast(field["lat"], field["lon"])
-        risk_predictions = predict_risk_for_all_diseases(forecast_data)
+        risk_predictions = prewarmer.get(field_name, field["lat"], field["lon"])
+        if risk_predictions is None:
+            risk_predictions = await compute_field_risk(field["lat"], field["lon"])
+            prewarmer.put(field_name, field["lat"], field["lon"], risk_predictions)
         
         return risk_predictions
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/prewarm/status")
+async def get_prewarm_status():
+    """Pre-warm scheduler counters and the age in seconds of each field's result"""
+    return prewarmer.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
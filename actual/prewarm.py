@@ -0,0 +1,148 @@
+"""
+Field Pre-warming Module
+Background scheduler that refreshes forecasts and precomputes disease
+risk for every saved field, so dashboard requests are answered from memory
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Scheduler Configuration
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+# MET Norway locationforecast is re-issued roughly every 30 minutes
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "1800"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+PREWARM_JITTER = float(os.getenv("PREWARM_JITTER", "5"))
+
+
+class FieldPrewarmer:
+    """
+    Periodically recompute results for every saved field
+
+    Each cycle reads the field list, then runs compute(lat, lon) for every
+    field with at most `concurrency` calls in flight. Each call starts after
+    a random delay of up to `jitter` seconds so upstream requests are
+    spread out. Results are kept per field name together with the
+    coordinates they were computed for, and get() only returns a result
+    when the coordinates still match and it is younger than max_age.
+    """
+
+    def __init__(self, compute: Callable[[float, float], Awaitable[Any]],
+                 load_fields: Callable[[], Dict[str, Dict[str, float]]],
+                 interval: float = PREWARM_INTERVAL, concurrency: int = PREWARM_CONCURRENCY,
+                 jitter: float = PREWARM_JITTER, max_age: Optional[float] = None):
+        self.compute = compute
+        self.load_fields = load_fields
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.jitter = jitter
+        self.max_age = 2 * interval if max_age is None else max_age
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.cycles = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_cycle_seconds = 0.0
+
+    def get(self, name: str, lat: float, lon: float) -> Optional[Any]:
+        """
+        Precomputed result for a field, or None when missing, outdated or
+        computed for different coordinates
+        """
+        entry = self._results.get(name)
+        if (entry is None or entry["lat"] != lat or entry["lon"] != lon
+                or time.monotonic() - entry["computed_at"] > self.max_age):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["result"]
+
+    def put(self, name: str, lat: float, lon: float, result: Any):
+        self._results[name] = {"lat": lat, "lon": lon, "result": result,
+                               "computed_at": time.monotonic()}
+
+    async def refresh_field(self, name: str, lat: float, lon: float, jitter: bool = True) -> Any:
+        """Recompute one field under the concurrency bound and store the result"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if jitter and self.jitter > 0:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+        async with self._semaphore:
+            try:
+                result = await self.compute(lat, lon)
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️  Pre-warm failed for field '{name}': {e}")
+                return None
+        self.refreshes += 1
+        self.put(name, lat, lon, result)
+        return result
+
+    def schedule(self, name: str, lat: float, lon: float):
+        """Refresh one field in the background, e.g. right after it is saved"""
+        previous = self._pending.get(name)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task = asyncio.get_running_loop().create_task(self.refresh_field(name, lat, lon, jitter=False))
+        self._pending[name] = task
+        task.add_done_callback(lambda t: self._pending.get(name) is t and self._pending.pop(name))
+
+    async def run_cycle(self):
+        """Refresh every saved field once"""
+        started = time.monotonic()
+        try:
+            fields = self.load_fields()
+        except Exception as e:
+            print(f"⚠️  Pre-warm could not read fields: {e}")
+            return
+        for name in list(self._results):
+            if name not in fields:
+                del self._results[name]
+        await asyncio.gather(*(
+            self.refresh_field(name, field["lat"], field["lon"]) for name, field in fields.items()
+        ))
+        self.cycles += 1
+        self.last_cycle_seconds = time.monotonic() - started
+        print(f"✅ Pre-warmed {len(fields)} fields in {self.last_cycle_seconds:.1f}s")
+
+    async def _run(self):
+        while True:
+            await self.run_cycle()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._pending.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        now = time.monotonic()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "fields": {name: round(now - entry["computed_at"], 1) for name, entry in self._results.items()},
+            "cycles": self.cycles,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "last_cycle_seconds": round(self.last_cycle_seconds, 3),
+            "interval": self.interval,
+            "concurrency": self.concurrency,
+            "jitter": self.jitter,
+        }
@@ -1,7 +1,12 @@
-import requests
+import os
+import sys
 import pandas as pd
 import joblib
-from datetime import datetime
+
+# Add the parent directory to sys.path to share the project-wide MET client
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from met_client import met_client
 
 # ---------------------- CONFIG ----------------------
 LAT = 15.3
@@ -23,47 +28,12 @@ def estimate_leaf_wetness(humidity, rainfall):
     else:
         return 8
 
-# 🌦️ Fetch 7-day forecast from MET Norway
+# 🌦️ Fetch 7-day forecast from MET Norway (shared client honours Expires/Last-Modified)
 def get_met_weather_forecast(lat, lon):
-    url = f"https://api.met.no/weatherapi/locationforecast/2.0/compact?lat={lat}&lon={lon}"
-    headers = {
-        "User-Agent": "smart-agri-dashboard/1.0 yuvaraj@example.com"
-    }
-
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"MET API Error: {response.status_code} - {response.text}")
-
-    data = response.json()
-    timeseries = data['properties']['timeseries']
-
-    forecast_list = []
-    seen_dates = set()
-
-    for entry in timeseries:
-        timestamp = entry['time']
-        dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-
-        if dt.hour == 12 and dt.date() not in seen_dates:
-            details = entry['data']['instant']['details']
-            rain = entry['data'].get('next_6_hours', {}).get('details', {}).get('precipitation_amount', 0.0)
-
-            forecast = {
-                'Date': dt.strftime('%Y-%m-%d'),
-                'Temperature': details.get('air_temperature', 0),
-                'Humidity': details.get('relative_humidity', 0),
-                'Rainfall': rain,
-                'Cloud Cover': details.get('cloud_area_fraction', 0),
-                'Wind Speed': details.get('wind_speed', 0)
-            }
-
-            forecast['Leaf Wetness'] = round(estimate_leaf_wetness(forecast['Humidity'], forecast['Rainfall']), 2)
-
-            forecast_list.append(forecast)
-            seen_dates.add(dt.date())
+    forecast_list = met_client.noon_samples(lat, lon, days=7)
 
-        if len(forecast_list) == 7:
-            break
+    for forecast in forecast_list:
+        forecast['Leaf Wetness'] = round(estimate_leaf_wetness(forecast['Humidity'], forecast['Rainfall']), 2)
 
     return pd.DataFrame(forecast_list)
 
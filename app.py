@@ -1,26 +1,17 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import joblib
 import numpy as np
 from streamlit_folium import st_folium
 import folium
-from utils import fetch_weather_data, get_hourly_forecast, recommend_fertilizer, predict_stress_level, get_7_day_forecast, generate_weather_alerts
+from utils import fetch_weather_data, get_hourly_forecast, recommend_fertilizer, predict_stress_level, predict_yield_value, get_7_day_forecast, generate_weather_alerts
 import os
+from model_registry import model_registry
+from crop_service import predict_crop
+from spray_planner import SPRAY_WINDOW_HOURS, plan_spray_windows
 
-# Load Crop Model
-crop_model_path = os.path.join('model', 'crop_model.pkl')
-if os.path.exists(crop_model_path):
-    crop_model = joblib.load(crop_model_path)
-    crop_model_loaded = True
-else:
-    crop_model_loaded = False
-
-# Load Other Models
-yield_model = joblib.load("model/yield_model.pkl")
-time_model = joblib.load("model/best_window_model.pkl")
-fert_model = joblib.load("model/fertilizer_model.pkl")
-stress_model = joblib.load("model/stress_model.pkl")
+# Models are loaded on first use and shared across Streamlit reruns
+crop_model_loaded = model_registry.available("crop")
 
 st.set_page_config(page_title="Smart Potato Farming", layout="wide")
 
@@ -93,8 +84,7 @@ if output and output['last_clicked']:
 
         if page == "📈 Yield Prediction":
             st.header("📊 Potato Yield Prediction")
-            features = pd.DataFrame([[ozone, temp, rain, soil]], columns=["ozone", "temp", "rain", "soil"])
-            prediction = yield_model.predict(features)[0]
+            prediction = predict_yield_value({"ozone": ozone, "temp": temp, "rain": rain, "soil": soil})
             st.success(f"📊 Predicted Potato Yield: **{prediction:.2f} tonnes/hectare**")
 
             st.subheader("📉 Ozone vs Yield Sensitivity for Potato")
@@ -105,7 +95,7 @@ if output and output['last_clicked']:
                 "rain": rain,
                 "soil": soil
             })
-            predictions = yield_model.predict(pred_df)
+            predictions = model_registry.get_compiled("yield").predict(pred_df)
             fig, ax = plt.subplots()
             ax.plot(ozone_vals, predictions, color='green')
             ax.set_xlabel("Ozone Level (ppb)")
@@ -119,23 +109,14 @@ if output and output['last_clicked']:
             if not hourly_data.empty:
                 st.write("### Hourly Forecast Preview:")
                 st.dataframe(hourly_data)
-                hourly_data['probability'] = time_model.predict_proba(
-                    hourly_data[["hour", "temp", "humidity", "wind", "ozone", "rain"]]
-                )[:, 1]
-
-                best_window = None
-                best_score = -1
-                for i in range(len(hourly_data) - 2):
-                    window = hourly_data.iloc[i:i+3]
-                    avg_prob = window['probability'].mean()
-                    if avg_prob > best_score:
-                        best_score = avg_prob
-                        best_window = f"{int(window.iloc[0]['hour'])}:00 to {int(window.iloc[2]['hour']) + 1}:00"
-
-                if best_score >= 0.5:
-                    st.success(f"✅ Best 3-hour window to spray: **{best_window}** (Confidence: {best_score:.2f})")
-                else:
-                    st.warning(f"⚠️ No ideal 3-hour window, but highest confidence: **{best_window}** (Confidence: {best_score:.2f})")
+                windows = plan_spray_windows([hourly_data])[0]
+                if windows and windows[0]["suitable"]:
+                    st.success(f"✅ Best {SPRAY_WINDOW_HOURS}-hour window to spray: **{windows[0]['window']}** (Confidence: {windows[0]['confidence']:.2f})")
+                elif windows:
+                    st.warning(f"⚠️ No ideal {SPRAY_WINDOW_HOURS}-hour window, but highest confidence: **{windows[0]['window']}** (Confidence: {windows[0]['confidence']:.2f})")
+                if len(windows) > 1:
+                    st.write("### Other windows:")
+                    st.table(pd.DataFrame(windows[1:])[["window", "confidence"]])
             else:
                 st.warning("⚠️ No hourly forecast data available for prediction.")
 
@@ -151,7 +132,7 @@ if output and output['last_clicked']:
                 "ph": ph,
                 "stage": stage
             }])
-            prediction = recommend_fertilizer(input_df, fert_model)
+            prediction = recommend_fertilizer(input_df, model_registry.get_compiled("fertilizer"))
             st.success(f"🌿 Recommended Fertilizer: **{prediction}**")
 
         elif page == "⚠️ Crop Stress Level Prediction":
@@ -160,7 +141,7 @@ if output and output['last_clicked']:
             symptom = st.selectbox("Symptom on Leaf/Plant", ["None", "Wilting", "Curling", "Stunted Growth"])
             input_df = pd.DataFrame([[ozone, temp, humidity, color, symptom]],
                                     columns=["ozone", "temp", "humidity", "color", "symptom"])
-            level, explanation = predict_stress_level(stress_model, input_df)
+            level, explanation = predict_stress_level(model_registry.get_compiled("stress"), input_df)
             st.info(f"Stress Level: **{level}**")
             st.write(explanation)
 
@@ -177,9 +158,8 @@ if output and output['last_clicked']:
             ozone = st.number_input("Ozone (ppb)", min_value=10, max_value=100, value=40)
             if crop_model_loaded:
                 if st.button("Recommend Crop"):
-                    features = [[N, P, K, temperature, humidity, ph, rainfall, ozone]]
                     try:
-                        pred = crop_model.predict(features)[0]
+                        pred, _ = predict_crop(N, P, K, temperature, humidity, ph, rainfall, ozone)
                         st.success(f"Recommended Crop: **{pred}**")
                     except Exception as e:
                         st.warning("No preferred crop available for the given conditions.")
@@ -1,5 +1,5 @@
 from flask import Flask, render_template, request, jsonify
-from utils import fetch_weather_data, get_hourly_forecast, recommend_fertilizer, predict_stress_level
+from utils import fetch_weather_data, recommend_fertilizer, predict_stress_level, predict_yield_value
 
 app = Flask(__name__)
 
@@ -22,14 +22,10 @@ def get_agri_data():
     return jsonify({'weather': weather, 'recommendations': recommendations})
 
 # --- Dashboard API endpoints ---
-import joblib
-import pandas as pd
+from model_registry import model_registry
+from crop_service import predict_crop
+from spray_planner import SPRAY_TOP_K, SPRAY_WINDOW_HOURS, plan_field, summarize
 
-yield_model = joblib.load("model/yield_model.pkl")
-fert_model = joblib.load("model/fert_model.pkl")
-stress_model = joblib.load("model/stress_model.pkl")
-time_model = joblib.load("model/best_window_model.pkl")
-crop_model = joblib.load("model/crop_model.pkl")
 @app.route('/recommend_crop')
 def recommend_crop():
     # Get input features from request.args
@@ -37,7 +33,7 @@ def recommend_crop():
         features = [float(request.args.get(f)) for f in ['N','P','K','temperature','humidity','ph','rainfall','ozone']]
     except Exception:
         return jsonify({'error': 'Invalid or missing input'}), 400
-    pred = crop_model.predict([features])[0]
+    pred, _ = predict_crop(*features)
     return jsonify({'recommended_crop': pred})
 @app.route('/best_time_to_spray')
 def best_time_to_spray():
@@ -45,26 +41,11 @@ def best_time_to_spray():
     lon = request.args.get('lon', type=float)
     if lat is None or lon is None:
         return jsonify({'result': None, 'window': None}), 400
-    hourly_data = get_hourly_forecast(lat, lon)
-    if hourly_data.empty:
-        return jsonify({'result': 'No hourly forecast data available.', 'window': None})
-    # Predict probability for each hour
-    hourly_data['probability'] = time_model.predict_proba(
-        hourly_data[["hour", "temp", "humidity", "wind", "ozone", "rain"]]
-    )[:, 1]
-    best_window = None
-    best_score = -1
-    for i in range(len(hourly_data) - 2):
-        window = hourly_data.iloc[i:i+3]
-        avg_prob = window['probability'].mean()
-        if avg_prob > best_score:
-            best_score = avg_prob
-            best_window = f"{int(window.iloc[0]['hour'])}:00 to {int(window.iloc[2]['hour']) + 1}:00"
-    if best_score >= 0.5:
-        msg = f"Best 3-hour window to spray: {best_window} (Confidence: {best_score:.2f})"
-    else:
-        msg = f"No ideal 3-hour window, but highest confidence: {best_window} (Confidence: {best_score:.2f})"
-    return jsonify({'result': msg, 'window': best_window, 'confidence': best_score})
+    hours = request.args.get('hours', default=SPRAY_WINDOW_HOURS, type=int)
+    top_k = request.args.get('top_k', default=SPRAY_TOP_K, type=int)
+    if not 1 <= hours <= 24 or not 1 <= top_k <= 20:
+        return jsonify({'result': None, 'window': None}), 400
+    return jsonify(summarize(plan_field(lat, lon, hours, top_k), hours))
 
 @app.route('/predict_yield')
 def predict_yield():
@@ -77,8 +58,7 @@ def predict_yield():
         return jsonify({'result': None}), 400
     temp = weather['temp']
     rain = weather['rain']
-    features = pd.DataFrame([[ozone, temp, rain, soil]], columns=["ozone", "temp", "rain", "soil"])
-    prediction = yield_model.predict(features)[0]
+    prediction = predict_yield_value({"ozone": ozone, "temp": temp, "rain": rain, "soil": soil})
     return jsonify({'result': f"Predicted Potato Yield: {prediction:.2f} tonnes/hectare"})
 
 @app.route('/recommend_fertilizer')
@@ -94,15 +74,15 @@ def recommend_fertilizer_api():
         return jsonify({'result': None}), 400
     temp = weather['temp']
     rain = weather['rain']
-    input_df = pd.DataFrame([{
+    input_data = {
         "ozone": ozone,
         "temp": temp,
         "rain": rain,
         "soil": soil,
         "ph": ph,
         "stage": stage
-    }])
-    result = recommend_fertilizer(input_df, fert_model)
+    }
+    result = recommend_fertilizer(input_data, model_registry.get_compiled("fertilizer"))
     return jsonify({'result': f"Recommended Fertilizer: {result}"})
 
 @app.route('/predict_stress')
@@ -114,9 +94,8 @@ def predict_stress():
     humidity = request.args.get('humidity', type=float)
     color = request.args.get('color', type=str)
     symptom = request.args.get('symptom', type=str)
-    input_df = pd.DataFrame([[ozone, temp, humidity, color, symptom]],
-                            columns=["ozone", "temp", "humidity", "color", "symptom"])
-    level, explanation = predict_stress_level(stress_model, input_df)
+    input_data = {"ozone": ozone, "temp": temp, "humidity": humidity, "color": color, "symptom": symptom}
+    level, explanation = predict_stress_level(model_registry.get_compiled("stress"), input_data)
     return jsonify({'result': f"Stress Level: {level}", 'explanation': explanation})
 
 if __name__ == '__main__':
@@ -0,0 +1,241 @@
+"""
+Batch Prediction Service
+Validates many input rows at once, fetches weather once per distinct
+location and scores each model with a single vectorized call
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from forecast_bundle import fetch_weather_batch
+from inference_batcher import batched_model
+from feature_encoders import encoder_for
+from utils import explain_stress_level
+
+# Load environment variables
+load_dotenv()
+
+# Batch Configuration
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "5000"))
+
+# Default location used by the single-row endpoints when none is given (India center)
+DEFAULT_LAT = 20.5937
+DEFAULT_LON = 78.9629
+
+
+class BatchInputError(ValueError):
+    """Raised when a batch as a whole is malformed (not per-row problems)"""
+
+
+def to_frame(payload: Any, max_rows: int = BATCH_MAX_ROWS) -> pd.DataFrame:
+    """
+    Build a DataFrame from a JSON array of row objects or a columnar
+    object of equal-length arrays
+
+    Raises:
+        BatchInputError: If the payload has another shape, is empty, has
+            ragged columns or exceeds max_rows
+    """
+    if isinstance(payload, list):
+        if not all(isinstance(row, dict) for row in payload):
+            raise BatchInputError("Every row must be a JSON object")
+        n_rows = len(payload)
+        # An explicit index keeps one row per record even when every record
+        # is empty ([{}] would otherwise give zero rows)
+        frame = pd.DataFrame.from_records(payload, index=range(n_rows))
+    elif isinstance(payload, dict):
+        lengths = {len(v) if isinstance(v, list) else -1 for v in payload.values()}
+        if -1 in lengths or len(lengths) > 1:
+            raise BatchInputError("Columnar input must map every field to an array of the same length")
+        frame = pd.DataFrame(payload)
+        n_rows = lengths.pop() if lengths else 0
+    else:
+        raise BatchInputError("Expected a JSON array of rows or an object of column arrays")
+    if n_rows == 0:
+        raise BatchInputError("Batch is empty")
+    if n_rows > max_rows:
+        raise BatchInputError(f"Batch has {n_rows} rows; the maximum is {max_rows}")
+    return frame.reset_index(drop=True)
+
+
+class RowErrors:
+    """First validation error per row, in input order"""
+
+    def __init__(self, n_rows: int):
+        self.messages = np.full(n_rows, None, dtype=object)
+
+    def add(self, mask: np.ndarray, message: str):
+        self.messages[np.asarray(mask) & (self.messages == None)] = message  # noqa: E711
+
+    @property
+    def ok(self) -> np.ndarray:
+        return self.messages == None  # noqa: E711
+
+
+def numeric_column(frame: pd.DataFrame, field: str, errors: RowErrors,
+                   default: Optional[float] = None, required: bool = False) -> np.ndarray:
+    """
+    Read a numeric column, vectorized
+
+    Missing values take the default (NaN when there is none). Values that
+    are present but not numeric, and missing required values, are
+    recorded as row errors.
+    """
+    raw = frame[field] if field in frame.columns else pd.Series([None] * len(frame))
+    values = pd.to_numeric(raw, errors="coerce")
+    errors.add((raw.notna() & values.isna()).to_numpy(), f"Invalid value for '{field}'")
+    if required:
+        errors.add(raw.isna().to_numpy(), f"Missing '{field}'")
+    values = values.to_numpy(dtype=np.float64)
+    if default is not None:
+        values = np.where(np.isnan(values), default, values)
+    return values
+
+
+def text_column(frame: pd.DataFrame, field: str, errors: RowErrors,
+                default: Optional[str] = None) -> np.ndarray:
+    """Read a string column; missing values take the default or are row errors"""
+    raw = frame[field] if field in frame.columns else pd.Series([None] * len(frame))
+    if default is None:
+        errors.add(raw.isna().to_numpy(), f"Missing '{field}'")
+    return raw.where(raw.notna(), default).astype(object).to_numpy()
+
+
+def current_weather(lats: np.ndarray, lons: np.ndarray, needed: np.ndarray,
+                    errors: RowErrors) -> Dict[str, np.ndarray]:
+    """
+    Current temperature, humidity and rain for the rows that need them,
+    fetched once per distinct location
+
+    Rows whose weather is unavailable are recorded as row errors.
+    """
+    weather = {name: np.full(len(lats), np.nan) for name in ("temp", "humidity", "rain")}
+    rows = np.flatnonzero(needed & errors.ok)
+    if len(rows) == 0:
+        return weather
+    points, inverse = np.unique(np.column_stack([lats[rows], lons[rows]]), axis=0, return_inverse=True)
+    bundles = fetch_weather_batch([tuple(p) for p in points.tolist()], ("current",))
+    conditions = [b.current_conditions() if b is not None else None for b in bundles]
+    for name in weather:
+        per_point = np.array([c[name] if c else np.nan for c in conditions])
+        weather[name][rows] = per_point[inverse.ravel()]
+    missing = np.zeros(len(lats), dtype=bool)
+    missing[rows] = np.isnan(weather["temp"][rows])
+    errors.add(missing, "Weather data unavailable")
+    return weather
+
+
+def assemble(errors: RowErrors, rows: Sequence[int], values: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-row results and errors back into input order"""
+    results: List[Dict[str, Any]] = [{"error": message} for message in errors.messages]
+    for row, value in zip(rows, values):
+        results[row] = value
+    return {"count": len(results), "errors": int((~errors.ok).sum()), "results": results}
+
+
+def _valid_rows(errors: RowErrors) -> Tuple[np.ndarray, bool]:
+    rows = np.flatnonzero(errors.ok)
+    return rows, len(rows) > 0
+
+
+def recommend_crop_batch(payload: Any) -> Dict[str, Any]:
+    """Batch counterpart of /api/crop/recommend; missing features default to 0"""
+    frame = to_frame(payload)
+    errors = RowErrors(len(frame))
+    X = np.column_stack([
+        numeric_column(frame, field, errors, default=0)
+        for field in ["N", "P", "K", "temperature", "humidity", "ph", "rainfall", "ozone"]
+    ])
+    rows, any_valid = _valid_rows(errors)
+    predictions = batched_model("crop").predict(X[rows]) if any_valid else []
+    return assemble(errors, rows, [{"crop": str(p)} for p in predictions])
+
+
+def predict_yield_batch(payload: Any) -> Dict[str, Any]:
+    """Batch counterpart of /api/yield/predict; weather is fetched for rows that omit it"""
+    frame = to_frame(payload)
+    n = len(frame)
+    errors = RowErrors(n)
+    crop = text_column(frame, "crop", errors, default="potato")
+    area = numeric_column(frame, "area", errors, default=1)
+    soil = numeric_column(frame, "soilMoisture", errors, default=0.5)
+    ozone = numeric_column(frame, "ozone", errors, default=40)
+    given = {name: numeric_column(frame, field, errors)
+             for name, field in [("temp", "temperature"), ("humidity", "humidity"), ("rain", "rainfall")]}
+    lats = numeric_column(frame, "lat", errors, default=DEFAULT_LAT)
+    lons = numeric_column(frame, "lon", errors, default=DEFAULT_LON)
+
+    needs_weather = np.isnan(given["temp"]) | np.isnan(given["humidity"]) | np.isnan(given["rain"])
+    fetched = current_weather(lats, lons, needs_weather, errors)
+    temp, humidity, rain = (np.where(np.isnan(given[k]), fetched[k], given[k]) for k in ("temp", "humidity", "rain"))
+
+    rows, any_valid = _valid_rows(errors)
+    if any_valid:
+        try:
+            model = batched_model("yield")
+            features = encoder_for(model).encode_columns(
+                {"ozone": ozone[rows], "temp": temp[rows], "rain": rain[rows], "soil": soil[rows]}
+            )
+            values = [round(float(v), 2) for v in model.predict(features)]
+        except Exception:
+            # Same fallback as the single-row endpoint
+            values = [round(float(area[r]) * (30 + (temp[r] * 0.5) + (rain[r] * 0.3)), 2) for r in rows]
+    else:
+        values = []
+
+    return assemble(errors, rows, [{
+        "yield": f"{value} tonnes/hectare",
+        "value": value,
+        "crop": crop[row],
+        "area": float(area[row]),
+        "weather_used": {"temperature": float(temp[row]), "humidity": float(humidity[row]), "rainfall": float(rain[row])},
+    } for row, value in zip(rows, values)])
+
+
+def recommend_fertilizer_batch(payload: Any) -> Dict[str, Any]:
+    """Batch counterpart of /recommend_fertilizer; current weather per distinct location"""
+    frame = to_frame(payload)
+    errors = RowErrors(len(frame))
+    lats = numeric_column(frame, "lat", errors, required=True)
+    lons = numeric_column(frame, "lon", errors, required=True)
+    ozone = numeric_column(frame, "ozone", errors, required=True)
+    soil = numeric_column(frame, "soil", errors, required=True)
+    ph = numeric_column(frame, "ph", errors, required=True)
+    stage = text_column(frame, "stage", errors)
+    weather = current_weather(lats, lons, np.ones(len(frame), dtype=bool), errors)
+
+    rows, any_valid = _valid_rows(errors)
+    predictions = []
+    if any_valid:
+        model = batched_model("fertilizer")
+        predictions = model.predict(encoder_for(model).encode_columns({
+            "ozone": ozone[rows], "temp": weather["temp"][rows], "rain": weather["rain"][rows],
+            "soil": soil[rows], "ph": ph[rows], "stage": stage[rows],
+        }))
+    return assemble(errors, rows, [{"result": f"Recommended Fertilizer: {p}"} for p in predictions])
+
+
+def predict_stress_batch(payload: Any) -> Dict[str, Any]:
+    """Batch counterpart of /predict_stress"""
+    frame = to_frame(payload)
+    errors = RowErrors(len(frame))
+    columns = {
+        "ozone": numeric_column(frame, "ozone", errors, required=True),
+        "temp": numeric_column(frame, "temp", errors, required=True),
+        "humidity": numeric_column(frame, "humidity", errors, required=True),
+        "color": text_column(frame, "color", errors),
+        "symptom": text_column(frame, "symptom", errors),
+    }
+
+    rows, any_valid = _valid_rows(errors)
+    predictions = []
+    if any_valid:
+        model = batched_model("stress")
+        predictions = model.predict(encoder_for(model).encode_columns({k: v[rows] for k, v in columns.items()}))
+    return assemble(errors, rows, [
+        {"result": f"Stress Level: {level}", "explanation": explain_stress_level(level)} for level in predictions
+    ])
@@ -4,7 +4,7 @@ Defines input/output schemas for crop recommendation endpoints
 """
 
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 
 
 class ManualCropInput(BaseModel):
@@ -17,6 +17,7 @@ class ManualCropInput(BaseModel):
     ph: float = Field(..., ge=3.0, le=10.0, description="pH value")
     rainfall: float = Field(..., ge=0, le=500, description="Rainfall (mm)")
     ozone: float = Field(..., ge=0, le=100, description="Ozone level (ppb)")
+    top_k: int = Field(5, ge=1, le=50, description="Number of ranked crops to return")
     
     class Config:
         json_schema_extra = {
@@ -46,6 +47,7 @@ class LocationCropInput(BaseModel):
     ph: Optional[float] = Field(None, ge=3.0, le=10.0)
     rainfall: Optional[float] = Field(None, ge=0, le=500)
     ozone: Optional[float] = Field(None, ge=0, le=100)
+    top_k: int = Field(5, ge=1, le=50, description="Number of ranked crops to return")
     
     class Config:
         json_schema_extra = {
@@ -63,11 +65,18 @@ class LocationCropInput(BaseModel):
         }
 
 
+class CropScore(BaseModel):
+    """One crop and its predicted probability"""
+    crop: str
+    probability: float
+
+
 class CropPredictionResponse(BaseModel):
     """Schema for crop recommendation response"""
     success: bool
     crop: str
     confidence: Optional[float] = None
+    ranking: List[CropScore] = []
     input_values: dict
     message: Optional[str] = None
     
@@ -77,6 +86,11 @@ class CropPredictionResponse(BaseModel):
                 "success": True,
                 "crop": "Rice",
                 "confidence": 0.95,
+                "ranking": [
+                    {"crop": "Rice", "probability": 0.95},
+                    {"crop": "Jute", "probability": 0.04},
+                    {"crop": "Coconut", "probability": 0.01}
+                ],
                 "input_values": {
                     "nitrogen": 90,
                     "phosphorus": 42,
@@ -104,5 +118,6 @@ class LocationDataResponse(BaseModel):
     potassium: float
     ph: float
     ozone: float
+    soil_source: Optional[str] = None
     location_name: Optional[str] = None
     message: Optional[str] = None
@@ -3,19 +3,117 @@ Crop Recommendation Service
 Handles prediction logic, weather API calls, and soil data fetching
 """
 
+import threading
 import numpy as np
-import requests
-from typing import Dict, Any, Optional, Tuple
-import joblib
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
+from forecast_bundle import fetch_forecast_bundle_async
+from inference_batcher import BatchedModel, batched_model
+from inference_cache import inference_cache
+from model_registry import model_registry
+from soil_raster import soil_raster
+from soil_regions import DEFAULT_SOIL, SOIL_FIELDS, soil_region_index
 
-# Load the trained crop recommendation model
-try:
-    crop_model = joblib.load("model/crop_model.pkl")
-    print("✅ Crop model loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading crop model: {e}")
-    crop_model = None
+
+CROP_FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall", "ozone"]
+
+# Number of ranked alternatives returned with a recommendation by default
+CROP_RANKING_TOP_K = 5
+
+
+class CropClassIndex:
+    """
+    Labels of the crop model's classes, with a case-insensitive name lookup
+
+    Built once per model generation so membership checks and ranking never
+    scan or convert classes_ per request.
+    """
+
+    def __init__(self, classes: Sequence[Any]):
+        self.labels = [str(c) for c in classes]
+        self.positions = {label.strip().lower(): i for i, label in enumerate(self.labels)}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def index_of(self, crop: Any) -> Optional[int]:
+        """Position of a crop name in classes_, or None if the model does not know it"""
+        return self.positions.get(str(crop).strip().lower())
+
+    def rank(self, proba: np.ndarray, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Crops ordered by probability, highest first
+
+        Ties keep class order, so the first entry is always the model's
+        predict() label (the first argmax of predict_proba()).
+        """
+        order = np.argsort(-proba, kind="stable")[:top_k]
+        return [{"crop": self.labels[i], "probability": float(proba[i])} for i in order]
+
+
+# Per model name, the registry generation its index was built for
+_class_indexes: Dict[str, Tuple[int, CropClassIndex]] = {}
+_class_indexes_lock = threading.Lock()
+
+
+def crop_class_index(crop_model: BatchedModel) -> CropClassIndex:
+    """
+    Get the shared CropClassIndex for a batched model's classes_
+
+    Keyed on the model's registry generation, so classes_ is read and
+    converted only when the model behind the name changes.
+    """
+    generation = model_registry.generation(crop_model.model_name)
+    cached = _class_indexes.get(crop_model.model_name)
+    if cached is None or cached[0] != generation:
+        with _class_indexes_lock:
+            cached = _class_indexes.get(crop_model.model_name)
+            if cached is None or cached[0] != generation:
+                cached = (generation, CropClassIndex(crop_model.classes_))
+                _class_indexes[crop_model.model_name] = cached
+    return cached[1]
+
+
+def _crop_inputs(nitrogen: float, phosphorus: float, potassium: float, temperature: float,
+                 humidity: float, ph: float, rainfall: float, ozone: float) -> Dict[str, float]:
+    return dict(zip(CROP_FEATURES, (nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, ozone)))
+
+
+def _crop_features(inputs: Dict[str, float]) -> np.ndarray:
+    # Input features in the same order as training
+    return np.array([[inputs[field] for field in CROP_FEATURES]])
+
+
+def _crop_proba(inputs: Dict[str, float]) -> np.ndarray:
+    crop_model = batched_model("crop")
+    try:
+        # Repeated inputs (slider defaults, polling) are answered from the inference cache
+        return inference_cache("crop").get_or_compute(
+            inputs, lambda exact: crop_model.predict_proba(_crop_features(exact))[0]
+        )
+    except FileNotFoundError as e:
+        raise ValueError(f"Crop model not loaded: {e}")
+
+
+async def _crop_proba_async(inputs: Dict[str, float]) -> np.ndarray:
+    crop_model = batched_model("crop")
+    # classes_ is read for ranking even on cache hits; fetch it without blocking the loop
+    await crop_model.load_metadata_async()
+
+    async def compute(exact: Dict[str, float]) -> np.ndarray:
+        return (await crop_model.predict_proba_async(_crop_features(exact)))[0]
+
+    try:
+        return await inference_cache("crop").get_or_compute_async(inputs, compute)
+    except FileNotFoundError as e:
+        raise ValueError(f"Crop model not loaded: {e}")
+
+
+def _ranked(proba: np.ndarray, top_k: Optional[int]) -> Tuple[str, Optional[float], List[Dict[str, Any]]]:
+    # predict() is the argmax of predict_proba(), so one forest pass gives the
+    # label, its confidence and the ranking
+    ranking = crop_class_index(batched_model("crop")).rank(proba, top_k)
+    return ranking[0]["crop"], ranking[0]["probability"], ranking
 
 
 def predict_crop(nitrogen: float, phosphorus: float, potassium: float,
@@ -36,25 +134,52 @@ def predict_crop(nitrogen: float, phosphorus: float, potassium: float,
     Returns:
         Tuple of (predicted_crop, confidence_score)
     """
-    if crop_model is None:
-        raise ValueError("Crop model not loaded")
-    
-    # Prepare input features in the same order as training
-    features = np.array([[nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, ozone]])
-    
-    # Make prediction
-    prediction = crop_model.predict(features)[0]
-    
-    # Get confidence score if available
-    confidence = None
-    if hasattr(crop_model, 'predict_proba'):
-        try:
-            proba = crop_model.predict_proba(features)[0]
-            confidence = float(max(proba))
-        except:
-            pass
-    
-    return str(prediction), confidence
+    crop, confidence, _ = predict_crop_ranked(
+        nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, ozone, top_k=1
+    )
+    return crop, confidence
+
+
+def predict_crop_ranked(nitrogen: float, phosphorus: float, potassium: float, temperature: float,
+                        humidity: float, ph: float, rainfall: float, ozone: float,
+                        top_k: Optional[int] = CROP_RANKING_TOP_K) -> Tuple[str, Optional[float], List[Dict[str, Any]]]:
+    """
+    Predict crop and rank the alternatives from a single predict_proba pass
+
+    Args:
+        top_k: Number of crops to rank (None ranks every crop the model knows)
+
+    Returns:
+        Tuple of (predicted_crop, confidence_score, ranking), where ranking
+        is a list of {"crop", "probability"} sorted by probability
+    """
+    proba = _crop_proba(_crop_inputs(nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, ozone))
+    return _ranked(proba, top_k)
+
+
+async def predict_crop_async(nitrogen: float, phosphorus: float, potassium: float,
+                             temperature: float, humidity: float, ph: float, rainfall: float,
+                             ozone: float) -> Tuple[str, Optional[float]]:
+    """
+    Async counterpart of predict_crop(); concurrent requests are batched
+    into one forest evaluation without blocking the event loop
+    """
+    crop, confidence, _ = await predict_crop_ranked_async(
+        nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, ozone, top_k=1
+    )
+    return crop, confidence
+
+
+async def predict_crop_ranked_async(nitrogen: float, phosphorus: float, potassium: float, temperature: float,
+                                    humidity: float, ph: float, rainfall: float, ozone: float,
+                                    top_k: Optional[int] = CROP_RANKING_TOP_K) -> Tuple[str, Optional[float], List[Dict[str, Any]]]:
+    """
+    Async counterpart of predict_crop_ranked()
+    """
+    proba = await _crop_proba_async(
+        _crop_inputs(nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, ozone)
+    )
+    return _ranked(proba, top_k)
 
 
 async def fetch_weather_data(latitude: float, longitude: float) -> Dict[str, Any]:
@@ -69,37 +194,13 @@ async def fetch_weather_data(latitude: float, longitude: float) -> Dict[str, Any
         Dictionary with temperature, humidity, and rainfall data
     """
     try:
-        # Open-Meteo API (free, no API key required)
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "current": "temperature_2m,relative_humidity_2m,precipitation",
-            "daily": "precipitation_sum",
-            "timezone": "auto"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract current weather
-        current = data.get("current", {})
-        daily = data.get("daily", {})
-        
-        temperature = current.get("temperature_2m", 25.0)
-        humidity = current.get("relative_humidity_2m", 70.0)
-        
-        # Use daily precipitation sum (average of next 7 days)
-        rainfall_data = daily.get("precipitation_sum", [])
-        rainfall = sum(rainfall_data[:7]) / 7 if rainfall_data else 100.0
+        # Open-Meteo API (free, no API key required), shared forecast bundle per grid cell
+        bundle = await fetch_forecast_bundle_async(latitude, longitude, ("current", "daily"))
+        weather = bundle.crop_weather()
+        if weather is None:
+            raise ValueError("No current weather data in Open-Meteo response")
         
-        return {
-            "success": True,
-            "temperature": round(temperature, 2),
-            "humidity": round(humidity, 2),
-            "rainfall": round(rainfall, 2)
-        }
+        return {"success": True, "stale": bundle.stale, **weather}
     
     except Exception as e:
         print(f"Error fetching weather data: {e}")
@@ -116,7 +217,8 @@ async def fetch_weather_data(latitude: float, longitude: float) -> Dict[str, Any
 def get_soil_data_by_region(latitude: float, longitude: float) -> Dict[str, float]:
     """
     Get soil data based on geographic region
-    Uses static mapping based on latitude/longitude ranges
+    Looks the point up in the soil regions file (SOIL_REGIONS_FILE, see
+    soil_regions.py); points outside every region get default values
     
     In production, you could integrate with:
     - SoilGrids API (https://rest.isric.org/)
@@ -128,92 +230,54 @@ def get_soil_data_by_region(latitude: float, longitude: float) -> Dict[str, floa
         longitude: Longitude coordinate
     
     Returns:
-        Dictionary with nitrogen, phosphorus, potassium, and pH values
+        Dictionary with nitrogen, phosphorus, potassium, pH and ozone values
     """
-    
-    # Default soil values
-    default_soil = {
-        "nitrogen": 50.0,
-        "phosphorus": 50.0,
-        "potassium": 50.0,
-        "ph": 6.5,
-        "ozone": 30.0
-    }
-    
-    # Regional soil mappings (simplified example)
-    # India regions
-    if 8.0 <= latitude <= 35.0 and 68.0 <= longitude <= 97.0:
-        # North India (fertile plains)
-        if latitude > 25.0:
-            return {
-                "nitrogen": 90.0,
-                "phosphorus": 60.0,
-                "potassium": 70.0,
-                "ph": 7.0,
-                "ozone": 28.0
-            }
-        # South India (varied terrain)
-        else:
-            return {
-                "nitrogen": 70.0,
-                "phosphorus": 50.0,
-                "potassium": 60.0,
-                "ph": 6.5,
-                "ozone": 32.0
-            }
-    
-    # USA regions
-    elif 25.0 <= latitude <= 49.0 and -125.0 <= longitude <= -65.0:
-        return {
-            "nitrogen": 80.0,
-            "phosphorus": 55.0,
-            "potassium": 65.0,
-            "ph": 6.8,
-            "ozone": 35.0
-        }
-    
-    # Europe
-    elif 35.0 <= latitude <= 70.0 and -10.0 <= longitude <= 40.0:
-        return {
-            "nitrogen": 75.0,
-            "phosphorus": 52.0,
-            "potassium": 68.0,
-            "ph": 6.7,
-            "ozone": 33.0
-        }
-    
-    # Africa
-    elif -35.0 <= latitude <= 37.0 and -20.0 <= longitude <= 52.0:
-        return {
-            "nitrogen": 45.0,
-            "phosphorus": 35.0,
-            "potassium": 50.0,
-            "ph": 6.0,
-            "ozone": 29.0
-        }
-    
-    # South America
-    elif -56.0 <= latitude <= 13.0 and -82.0 <= longitude <= -34.0:
-        return {
-            "nitrogen": 65.0,
-            "phosphorus": 45.0,
-            "potassium": 55.0,
-            "ph": 6.3,
-            "ozone": 31.0
-        }
-    
-    # Australia/Oceania
-    elif -45.0 <= latitude <= -10.0 and 110.0 <= longitude <= 180.0:
-        return {
-            "nitrogen": 55.0,
-            "phosphorus": 40.0,
-            "potassium": 52.0,
-            "ph": 6.2,
-            "ozone": 34.0
-        }
-    
-    # Default for other regions
-    return default_soil
+    region = soil_region_index().lookup(latitude, longitude)
+    if region is None:
+        return dict(DEFAULT_SOIL)
+    return {field: region[field] for field in SOIL_FIELDS}
+
+
+def get_soil_data(latitude: float, longitude: float) -> Tuple[Dict[str, float], str]:
+    """
+    Soil data for a point, preferring the gridded soil raster (see
+    soil_raster.py) where it has coverage
+
+    Returns:
+        (soil values in the shape of get_soil_data_by_region, source) where
+        source is "raster", "region" or "default"
+    """
+    raster = soil_raster()
+    if raster is not None:
+        values = raster.lookup(latitude, longitude)
+        if values is not None:
+            return values, "raster"
+    region = soil_region_index().lookup(latitude, longitude)
+    if region is None:
+        return dict(DEFAULT_SOIL), "default"
+    return {field: region[field] for field in SOIL_FIELDS}, "region"
+
+
+def get_soil_data_batch(latitudes: Sequence[float], longitudes: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized get_soil_data() for many points, e.g. map heatmaps
+
+    Returns:
+        Columns of soil values, plus "source" ("raster", "region" or
+        "default") and "region" (the matched region name, None unless the
+        value came from a region)
+    """
+    columns = soil_region_index().lookup_many(latitudes, longitudes)
+    columns["source"] = np.where(columns["region"] == None, "default", "region").astype(object)  # noqa: E711
+    raster = soil_raster()
+    if raster is not None:
+        sampled = raster.sample(latitudes, longitudes)
+        covered = sampled["covered"]
+        for field in SOIL_FIELDS:
+            columns[field] = np.where(covered, np.round(sampled[field], 2), columns[field])
+        columns["source"][covered] = "raster"
+        columns["region"][covered] = None
+    return columns
 
 
 async def fetch_all_location_data(latitude: float, longitude: float) -> Dict[str, Any]:
@@ -230,8 +294,8 @@ async def fetch_all_location_data(latitude: float, longitude: float) -> Dict[str
     # Fetch weather data
     weather_data = await fetch_weather_data(latitude, longitude)
     
-    # Get soil data
-    soil_data = get_soil_data_by_region(latitude, longitude)
+    # Get soil data (gridded raster where it has coverage, regions elsewhere)
+    soil_data, soil_source = get_soil_data(latitude, longitude)
     
     # Combine data
     location_data = {
@@ -246,10 +310,13 @@ async def fetch_all_location_data(latitude: float, longitude: float) -> Dict[str
         "potassium": soil_data["potassium"],
         "ph": soil_data["ph"],
         "ozone": soil_data["ozone"],
+        "soil_source": soil_source,
         "message": "Location data fetched successfully"
     }
     
     if not weather_data.get("success"):
         location_data["message"] = "Weather API unavailable, using default values"
+    elif weather_data.get("stale"):
+        location_data["message"] = "Weather API unavailable, using last known weather data"
     
     return location_data
@@ -0,0 +1,100 @@
+"""
+Feature Encoders Module
+Encoders compiled once from a model's feature_names_in_ that turn request
+dicts or column arrays straight into the model's float input matrix
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class FeatureEncoder:
+    """
+    Maps raw inputs to a model's training columns without pandas
+
+    Matches what pd.get_dummies followed by adding missing columns as 0 and
+    reindexing to feature_names_in_ produces:
+    - a numeric value for field k fills column k;
+    - a string value v for field k sets column "k_v" to 1 (and leaves
+      column k, if any, at 0, since get_dummies replaces it);
+    - unknown fields, unseen categories and missing values leave zeros.
+
+    Every "prefix_value" split of every feature name is precomputed into an
+    index, so encoding is a few dict lookups into a preallocated array.
+    """
+
+    def __init__(self, feature_names: Sequence[str]):
+        self.feature_names = tuple(str(name) for name in feature_names)
+        self.n_features = len(self.feature_names)
+        self.numeric_index: Dict[str, int] = {name: i for i, name in enumerate(self.feature_names)}
+        self.onehot_index: Dict[Tuple[str, str], int] = {}
+        for i, name in enumerate(self.feature_names):
+            for pos, char in enumerate(name):
+                if char == "_":
+                    self.onehot_index.setdefault((name[:pos], name[pos + 1:]), i)
+
+    def _fill(self, out: np.ndarray, row: int, record: Mapping[str, Any]):
+        for field, value in record.items():
+            if isinstance(value, str):
+                index = self.onehot_index.get((field, value))
+                if index is not None:
+                    out[row, index] = 1.0
+            elif value is not None:
+                index = self.numeric_index.get(field)
+                if index is not None:
+                    out[row, index] = value
+
+    def encode(self, record: Mapping[str, Any]) -> np.ndarray:
+        """Encode one request dict into a (1, n_features) array"""
+        out = np.zeros((1, self.n_features))
+        self._fill(out, 0, record)
+        return out
+
+    def encode_records(self, records: Iterable[Mapping[str, Any]]) -> np.ndarray:
+        """Encode a sequence of request dicts into an (n_rows, n_features) array"""
+        records = list(records)
+        out = np.zeros((len(records), self.n_features))
+        for row, record in enumerate(records):
+            self._fill(out, row, record)
+        return out
+
+    def encode_columns(self, columns: Mapping[str, Any]) -> np.ndarray:
+        """
+        Encode columnar input (field -> equal-length array) into an
+        (n_rows, n_features) array, vectorized per column
+
+        Object/string columns are one-hot encoded per distinct value; other
+        columns are copied into their feature column when the model has one.
+        """
+        arrays = {field: np.asarray(values) for field, values in columns.items()}
+        n_rows = len(next(iter(arrays.values()))) if arrays else 0
+        out = np.zeros((n_rows, self.n_features))
+        for field, values in arrays.items():
+            if values.dtype.kind in "OUS":
+                for category in set(values.tolist()):
+                    if not isinstance(category, str):
+                        continue
+                    index = self.onehot_index.get((field, category))
+                    if index is not None:
+                        out[values == category, index] = 1.0
+            else:
+                index = self.numeric_index.get(field)
+                if index is not None:
+                    out[:, index] = values
+        return out
+
+
+_encoders: Dict[Tuple[str, ...], FeatureEncoder] = {}
+_encoders_lock = threading.Lock()
+
+
+def encoder_for(model: Any) -> FeatureEncoder:
+    """Get the shared encoder for a model, compiled once per distinct feature_names_in_"""
+    key = tuple(str(name) for name in model.feature_names_in_)
+    encoder = _encoders.get(key)
+    if encoder is None:
+        with _encoders_lock:
+            encoder = _encoders.setdefault(key, FeatureEncoder(key))
+    return encoder
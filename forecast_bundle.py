@@ -0,0 +1,438 @@
+"""
+Forecast Bundle Module
+Fetches current, hourly and daily Open-Meteo data for a location in one
+request and derives every weather view used by the app from it
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecast_store import forecast_store
+from weather_cache import weather_cache
+from weather_providers import BUNDLE_VARIABLES, get_provider
+from weather_resilience import ResilientFetcher
+
+PRODUCTS = ("current", "hourly", "daily")
+
+# Time resolution used when decoding each product's "time" array
+TIME_UNITS = {"hourly": "datetime64[m]", "daily": "datetime64[D]"}
+
+# Maximum number of locations per multi-location upstream request
+WEATHER_BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "50"))
+
+# Configured backend (WEATHER_PROVIDER) behind a circuit breaker and
+# stale-while-revalidate front
+weather_provider = get_provider()
+weather_fetcher = ResilientFetcher(weather_provider.name, flights=weather_cache.flights)
+
+
+def parse_section(product: str, section: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Decode one Open-Meteo section into compact values
+
+    Current conditions become plain floats; hourly and daily series become
+    NumPy arrays (missing values as NaN, "time" as datetime64).
+    """
+    if not section:
+        return None
+    if product == "current":
+        return {k: v for k, v in section.items() if k != "time" and isinstance(v, (int, float))}
+    parsed = {}
+    for name, values in section.items():
+        if name == "time":
+            parsed[name] = np.array(values, dtype=TIME_UNITS[product])
+        else:
+            parsed[name] = np.array(values, dtype=float)
+    return parsed
+
+
+@dataclass
+class ForecastBundle:
+    """
+    Current, hourly and daily forecast for one grid cell
+
+    Sections are None when the upstream response did not include them.
+    stale is True when the data was served past its TTL while a refresh
+    runs in the background.
+    """
+    latitude: float
+    longitude: float
+    current: Optional[Dict[str, float]] = None
+    hourly: Optional[Dict[str, np.ndarray]] = None
+    daily: Optional[Dict[str, np.ndarray]] = None
+    stale: bool = False
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], latitude: float, longitude: float) -> "ForecastBundle":
+        """Build a bundle from an Open-Meteo-shaped payload"""
+        return cls(
+            latitude=latitude,
+            longitude=longitude,
+            current=parse_section("current", payload.get("current")),
+            hourly=parse_section("hourly", payload.get("hourly")),
+            daily=parse_section("daily", payload.get("daily")),
+        )
+
+    def current_conditions(self) -> Optional[Dict[str, float]]:
+        """
+        Current weather in the shape returned by utils.fetch_weather_data
+
+        Returns:
+            Dictionary with temp, humidity, rain and wind, or None
+        """
+        if not self.current:
+            return None
+        return {
+            "temp": round(float(self.current.get("temperature_2m", 0)), 2),
+            "humidity": round(float(self.current.get("relative_humidity_2m", 0)), 2),
+            "rain": round(float(self.current.get("precipitation", 0)), 2),
+            "wind": round(float(self.current.get("windspeed_10m", 0)), 2),
+        }
+
+    def hourly_frame(self, ozone: float = 60) -> pd.DataFrame:
+        """
+        Hourly forecast with the feature columns of the spray timing model
+
+        Args:
+            ozone: Constant ozone value (ppb) filled into every hour
+
+        Returns:
+            DataFrame with time (local timestamp of the hour), hour, temp,
+            humidity, rain, wind and ozone columns
+        """
+        if not self.hourly:
+            return pd.DataFrame()
+        times = pd.DatetimeIndex(self.hourly["time"])
+        df = pd.DataFrame({
+            "time": times,
+            "hour": times.hour,
+            "temp": self.hourly["temperature_2m"],
+            "humidity": self.hourly["relative_humidity_2m"],
+            "rain": self.hourly["precipitation"],
+            "wind": self.hourly["windspeed_10m"]
+        })
+        df["ozone"] = ozone
+        return df
+
+    def daily_frame(self) -> pd.DataFrame:
+        """
+        Daily forecast in the shape used by generate_weather_alerts
+
+        Returns:
+            DataFrame with day, temp, rain, wind and humidity columns
+        """
+        if not self.daily:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            "day": pd.DatetimeIndex(self.daily["time"]).strftime("%a"),
+            "temp": self.daily["temperature_2m_max"],
+            "rain": self.daily["precipitation_sum"],
+            "wind": self.daily["windspeed_10m_max"],
+            "humidity": self.daily["relative_humidity_2m_max"]
+        })
+
+    def noon_samples(self, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        One midday sample per day in the MET-style shape used by the
+        disease risk model (local 12:00, rainfall over the next 6 hours,
+        wind speed in m/s)
+
+        Args:
+            days: Maximum number of days to return
+
+        Returns:
+            List of dictionaries with Date, Temperature, Humidity, Rainfall,
+            Cloud Cover and Wind Speed
+        """
+        if not self.hourly:
+            return []
+        times = self.hourly["time"]
+        noon = np.flatnonzero((times - times.astype("datetime64[D]")) == np.timedelta64(12, "h"))[:days]
+        precipitation = np.nan_to_num(self.hourly["precipitation"])
+        # Hourly precipitation is the sum over the preceding hour
+        rain_6h = np.convolve(precipitation, np.ones(6), mode="full")[5:]
+        rain_6h = np.append(rain_6h[1:], 0.0)
+        cloud = self.hourly.get("cloud_cover", np.zeros(len(times)))
+        return [
+            {
+                "Date": str(times[i].astype("datetime64[D]")),
+                "Temperature": float(self.hourly["temperature_2m"][i]),
+                "Humidity": float(self.hourly["relative_humidity_2m"][i]),
+                "Rainfall": round(float(rain_6h[i]), 2),
+                "Cloud Cover": float(cloud[i]),
+                "Wind Speed": round(float(self.hourly["windspeed_10m"][i]) / 3.6, 2),
+            }
+            for i in noon
+        ]
+
+    def crop_weather(self) -> Optional[Dict[str, float]]:
+        """
+        Weather inputs for crop recommendation (crop_service format)
+
+        Rainfall is the mean of the next 7 daily precipitation sums.
+
+        Returns:
+            Dictionary with temperature, humidity and rainfall, or None
+        """
+        if not self.current:
+            return None
+        rainfall_data = self.daily["precipitation_sum"][:7] if self.daily else np.array([])
+        rainfall_data = rainfall_data[~np.isnan(rainfall_data)]
+        return {
+            "temperature": round(float(self.current.get("temperature_2m", 25.0)), 2),
+            "humidity": round(float(self.current.get("relative_humidity_2m", 70.0)), 2),
+            "rainfall": round(float(rainfall_data.sum() / 7), 2) if rainfall_data.size else 100.0
+        }
+
+
+def _section_keys(latitude: float, longitude: float) -> Dict[str, Tuple]:
+    return {
+        p: weather_cache.make_key(p, latitude, longitude, f"{weather_provider.name}:{BUNDLE_VARIABLES[p]}")
+        for p in PRODUCTS
+    }
+
+
+def _store_payload(keys: Dict[str, Tuple], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache each product of a fresh payload under its own TTL"""
+    bundle = ForecastBundle.from_payload(payload, keys["current"][1], keys["current"][2])
+    sections = {p: getattr(bundle, p) for p in PRODUCTS}
+    for product in PRODUCTS:
+        if sections[product] is not None:
+            weather_cache.set(keys[product], sections[product])
+            forecast_store.put(keys[product], sections[product],
+                               weather_cache.ttl_for(keys[product]), weather_cache.stale_ttl)
+    return sections
+
+
+def _cached_section(key: Tuple) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """
+    Read a section once from memory, falling back to the on-disk store
+
+    Returns:
+        Tuple of (section, is_fresh), or None when neither has it
+    """
+    found = weather_cache.lookup(key)
+    if found is not None and found[1]:
+        return found
+    return _stored_section(key, found)
+
+
+def _stored_section(key: Tuple, found: Optional[Tuple[Dict[str, Any], bool]]) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """Disk half of _cached_section() for a key memory has no fresh copy of (blocking)"""
+    # Another worker may have refreshed the store since our copy went stale
+    stored = forecast_store.get(key, allow_stale=True)
+    if stored is None:
+        return found
+    value, expires_in, stale_in = stored
+    if found is not None and expires_in <= 0:
+        return found
+    # Promote into memory with the lifetimes left on disk, so a stale entry
+    # expires from memory when it would have expired from the store
+    weather_cache.set(key, value, ttl=expires_in, stale_ttl=stale_in - expires_in)
+    return value, expires_in > 0
+
+
+def _cached_sections(keys: Dict[str, Tuple], products: Iterable[str]) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """
+    Read every requested product, each looked up once
+
+    Returns:
+        Tuple of (sections, all_fresh), or None when any product is missing
+    """
+    sections = {}
+    fresh = True
+    for product in products:
+        found = _cached_section(keys[product])
+        if found is None:
+            return None
+        sections[product], product_fresh = found
+        fresh = fresh and product_fresh
+    return sections, fresh
+
+
+async def _cached_sections_async(keys: Dict[str, Tuple],
+                                 products: Iterable[str]) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """
+    Async counterpart of _cached_sections(); memory is read on the event
+    loop and only disk reads go to a worker thread
+    """
+    sections = {}
+    fresh = True
+    for product in products:
+        found = weather_cache.lookup(keys[product])
+        if found is None or not found[1]:
+            found = await asyncio.to_thread(_stored_section, keys[product], found)
+        if found is None:
+            return None
+        sections[product], product_fresh = found
+        fresh = fresh and product_fresh
+    return sections, fresh
+
+
+def _assemble(latitude: float, longitude: float, sections: Dict[str, Any], stale: bool) -> ForecastBundle:
+    return ForecastBundle(
+        latitude=latitude,
+        longitude=longitude,
+        current=sections.get("current"),
+        hourly=sections.get("hourly"),
+        daily=sections.get("daily"),
+        stale=stale,
+    )
+
+
+def fetch_forecast_bundle(latitude: float, longitude: float,
+                          products: Iterable[str] = PRODUCTS) -> ForecastBundle:
+    """
+    Get the forecast bundle for a location, fetching all products in one
+    request when any requested product is missing from the cache
+
+    Expired products are served stale while refreshed in the background.
+
+    Args:
+        latitude: Latitude coordinate
+        longitude: Longitude coordinate
+        products: Products the caller needs ("current", "hourly", "daily")
+
+    Returns:
+        ForecastBundle for the grid cell containing the location
+
+    Raises:
+        CircuitOpenError: If nothing is cached and the provider is failing
+    """
+    keys = _section_keys(latitude, longitude)
+    lat, lon = keys["current"][1], keys["current"][2]
+    sections, fresh = weather_fetcher.fetch(
+        ("bundle", lat, lon),
+        lambda: _cached_sections(keys, products),
+        lambda: _store_payload(keys, weather_provider.fetch_payload(lat, lon))
+    )
+    return _assemble(lat, lon, sections, stale=not fresh)
+
+
+async def fetch_forecast_bundle_async(latitude: float, longitude: float,
+                                      products: Iterable[str] = PRODUCTS) -> ForecastBundle:
+    """
+    Async counterpart of fetch_forecast_bundle()
+    """
+    keys = _section_keys(latitude, longitude)
+    lat, lon = keys["current"][1], keys["current"][2]
+
+    async def load() -> Dict[str, Any]:
+        payload = await weather_provider.fetch_payload_async(lat, lon)
+        return await asyncio.to_thread(_store_payload, keys, payload)
+
+    sections, fresh = await weather_fetcher.fetch_async(
+        ("bundle", lat, lon),
+        lambda: _cached_sections_async(keys, products),
+        load
+    )
+    return _assemble(lat, lon, sections, stale=not fresh)
+
+
+def _plan_batch(points: Sequence[Tuple[float, float]], products: Iterable[str]):
+    """
+    Deduplicate points by grid cell and resolve what the cache already has
+
+    Returns:
+        Tuple of (keys per cell, cell per point, resolved bundles, missing
+        cells, stale sections of missing cells to fall back on)
+    """
+    products = tuple(products)
+    cell_keys: Dict[Tuple[float, float], Dict[str, Tuple]] = {}
+    point_cells = []
+    for latitude, longitude in points:
+        keys = _section_keys(latitude, longitude)
+        cell = (keys["current"][1], keys["current"][2])
+        cell_keys.setdefault(cell, keys)
+        point_cells.append(cell)
+
+    resolved: Dict[Tuple[float, float], ForecastBundle] = {}
+    missing = []
+    stale: Dict[Tuple[float, float], Dict[str, Any]] = {}
+    for cell, keys in cell_keys.items():
+        found = _cached_sections(keys, products)
+        if found is not None and found[1]:
+            resolved[cell] = _assemble(cell[0], cell[1], found[0], stale=False)
+        else:
+            missing.append(cell)
+            if found is not None:
+                stale[cell] = found[0]
+    return cell_keys, point_cells, resolved, missing, stale
+
+
+def _store_batch(cell_keys: Dict, chunk: Sequence[Tuple[float, float]], payloads: List[Dict[str, Any]]) -> Dict:
+    """Fan a multi-location response (one payload per location) back out to cells"""
+    return {
+        cell: _assemble(cell[0], cell[1], _store_payload(cell_keys[cell], item), stale=False)
+        for cell, item in zip(chunk, payloads)
+    }
+
+
+def _stale_batch(stale: Dict, chunk: Sequence[Tuple[float, float]]) -> Dict:
+    """Fall back to the last good data, read while planning, for cells of a failed chunk"""
+    resolved = {}
+    for cell in chunk:
+        if cell in stale:
+            weather_fetcher.stale_served += 1
+            resolved[cell] = _assemble(cell[0], cell[1], stale[cell], stale=True)
+    return resolved
+
+
+def fetch_weather_batch(points: Sequence[Tuple[float, float]],
+                        products: Iterable[str] = PRODUCTS) -> List[Optional[ForecastBundle]]:
+    """
+    Get forecast bundles for many locations with as few upstream requests
+    as possible
+
+    Points in the same grid cell share one bundle, cached cells are not
+    refetched, and the remaining cells are requested WEATHER_BATCH_SIZE at
+    a time (Open-Meteo takes comma-separated coordinate lists).
+
+    Args:
+        points: Sequence of (latitude, longitude) tuples
+        products: Products the caller needs ("current", "hourly", "daily")
+
+    Returns:
+        List of ForecastBundle (None where no data is available), in input order
+    """
+    products = tuple(products)
+    cell_keys, point_cells, resolved, missing, stale = _plan_batch(points, products)
+    for start in range(0, len(missing), WEATHER_BATCH_SIZE):
+        chunk = missing[start:start + WEATHER_BATCH_SIZE]
+        try:
+            payloads = weather_fetcher.breaker.call(lambda: weather_provider.fetch_batch_payloads(chunk))
+            resolved.update(_store_batch(cell_keys, chunk, payloads))
+        except Exception as e:
+            print(f"Error fetching weather batch: {e}")
+            resolved.update(_stale_batch(stale, chunk))
+    return [resolved.get(cell) for cell in point_cells]
+
+
+async def fetch_weather_batch_async(points: Sequence[Tuple[float, float]],
+                                    products: Iterable[str] = PRODUCTS) -> List[Optional[ForecastBundle]]:
+    """
+    Async counterpart of fetch_weather_batch(); chunks are requested
+    concurrently and cache reads and writes run in worker threads
+    """
+    products = tuple(products)
+    cell_keys, point_cells, resolved, missing, stale = await asyncio.to_thread(_plan_batch, points, products)
+
+    async def load(chunk: Sequence[Tuple[float, float]]) -> Dict:
+        try:
+            payloads = await weather_fetcher.breaker.call_async(
+                lambda: weather_provider.fetch_batch_payloads_async(chunk)
+            )
+            return await asyncio.to_thread(_store_batch, cell_keys, chunk, payloads)
+        except Exception as e:
+            print(f"Error fetching weather batch: {e}")
+            return _stale_batch(stale, chunk)
+
+    chunks = [missing[i:i + WEATHER_BATCH_SIZE] for i in range(0, len(missing), WEATHER_BATCH_SIZE)]
+    for chunk_resolved in await asyncio.gather(*(load(chunk) for chunk in chunks)):
+        resolved.update(chunk_resolved)
+    return [resolved.get(cell) for cell in point_cells]
@@ -0,0 +1,192 @@
+"""
+Forecast Store Module
+Persistent on-disk forecast cache (SQLite, WAL mode) shared by all
+workers on a host, so restarts and new workers start warm
+"""
+
+import io
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Store Configuration
+FORECAST_STORE_ENABLED = os.getenv("FORECAST_STORE_ENABLED", "1") == "1"
+FORECAST_STORE_PATH = os.getenv(
+    "FORECAST_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "forecasts.sqlite3")
+)
+FORECAST_STORE_PURGE_INTERVAL = int(os.getenv("FORECAST_STORE_PURGE_INTERVAL", "600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    product TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    variables TEXT NOT NULL,
+    issued_at REAL NOT NULL,
+    valid_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (product, lat, lon, variables, issued_at)
+);
+CREATE INDEX IF NOT EXISTS forecasts_stale_until ON forecasts (stale_until);
+"""
+
+
+def encode_section(section: Dict[str, Any]) -> bytes:
+    """
+    Serialize a forecast section as an uncompressed .npz blob
+
+    Arrays are stored in their binary NumPy form (times as datetime64),
+    so reading them back needs no JSON parsing or type conversion.
+    """
+    buffer = io.BytesIO()
+    np.savez(buffer, **{name: np.asarray(value) for name, value in section.items()})
+    return buffer.getvalue()
+
+
+def decode_section(product: str, blob: bytes) -> Dict[str, Any]:
+    """Inverse of encode_section(); current conditions come back as floats"""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+        if product == "current":
+            return {name: float(data[name]) for name in data.files}
+        return {name: data[name] for name in data.files}
+
+
+class ForecastStore:
+    """
+    SQLite-backed forecast cache keyed by (product, grid cell, variables,
+    issue time)
+
+    Each entry is valid until issued_at + TTL and kept for stale serving
+    until stale_until; the newest issue per key wins and older issues are
+    dropped on write. The database is opened lazily, one connection per
+    thread, and every error is swallowed so the store can only ever make
+    requests faster, never fail them.
+    """
+
+    def __init__(self, path: str = FORECAST_STORE_PATH, enabled: bool = FORECAST_STORE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._last_purge = 0.0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Tuple, allow_stale: bool = False) -> Optional[Tuple[Any, float, float]]:
+        """
+        Read the newest entry for a cache key
+
+        Args:
+            key: GeoCache key (product, lat, lon, variables)
+            allow_stale: Also return entries past valid_until but within stale_until
+
+        Returns:
+            Tuple of (section, seconds_until_expiry, seconds_until_stale_expiry),
+            or None
+        """
+        if not self.enabled:
+            return None
+        product, lat, lon, variables = key
+        now = time.time()
+        try:
+            row = self._connection().execute(
+                "SELECT valid_until, stale_until, data FROM forecasts "
+                "WHERE product = ? AND lat = ? AND lon = ? AND variables = ? AND stale_until > ? "
+                "ORDER BY issued_at DESC LIMIT 1",
+                (product, lat, lon, variables, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️  Forecast store read failed: {e}")
+            return None
+        if row is None or (row[0] <= now and not allow_stale):
+            self.misses += 1
+            return None
+        if row[0] <= now:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return decode_section(product, row[2]), row[0] - now, row[1] - now
+
+    def put(self, key: Tuple, section: Dict[str, Any], ttl: float, stale_ttl: float):
+        """Write a freshly issued section, replacing older issues of the same key"""
+        if not self.enabled:
+            return
+        product, lat, lon, variables = key
+        issued_at = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM forecasts WHERE product = ? AND lat = ? AND lon = ? AND variables = ?",
+                    (product, lat, lon, variables)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (product, lat, lon, variables, issued_at, issued_at + ttl,
+                     issued_at + ttl + stale_ttl, encode_section(section))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self.writes += 1
+            if issued_at - self._last_purge > FORECAST_STORE_PURGE_INTERVAL:
+                self._last_purge = issued_at
+                conn.execute("DELETE FROM forecasts WHERE stale_until <= ?", (issued_at,))
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️  Forecast store write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        entries = None
+        if self.enabled and self._initialized:
+            try:
+                entries = self._connection().execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
+
+
+# Shared store used by forecast_bundle
+forecast_store = ForecastStore()
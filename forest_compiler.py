@@ -0,0 +1,382 @@
+"""
+Forest Compiler Module
+Flattens fitted sklearn random forests into contiguous NumPy arrays and
+evaluates every tree at once, without sklearn's per-call overhead
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Dtype sklearn trees cast inputs to before comparing against thresholds
+TREE_DTYPE = np.float32
+
+# Compiled artifacts live next to their pickle: model/crop_model.pkl -> model/crop_model.forest/
+COMPILED_SUFFIX = ".forest"
+COMPILED_FORMAT = 1
+
+
+def file_digest(path: str) -> str:
+    """Content digest of a file, used to tell artifacts apart"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_path(model_path: str) -> str:
+    """Directory holding the compiled arrays for a pickled model"""
+    return os.path.splitext(model_path)[0] + COMPILED_SUFFIX
+
+
+def _labels_to_json(labels: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+    if labels is None:
+        return None
+    return {"dtype": labels.dtype.str if labels.dtype != object else "object", "values": labels.tolist()}
+
+
+def _labels_from_json(labels: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    if labels is None:
+        return None
+    return np.array(labels["values"], dtype=object if labels["dtype"] == "object" else labels["dtype"])
+
+
+class CompiledForest:
+    """
+    Array-backed evaluator for a RandomForestClassifier or RandomForestRegressor
+
+    All trees are concatenated into one node table. A leaf's children are
+    the leaf itself, so a fixed number of vectorized steps (the maximum tree
+    depth) walks every (row, tree) pair to its leaf. Inputs are cast to
+    float32 and compared against float64 thresholds exactly as sklearn does.
+    Leaf values are summed over trees in estimator order and then divided
+    by the number of trees, so predictions and probabilities are
+    bit-identical to the original forest.
+
+    Exposes predict(), predict_proba() (classifiers), classes_,
+    feature_names_in_ and n_features_in_, so it can stand in for the
+    estimator wherever those are used.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], classes: Optional[np.ndarray] = None,
+                 feature_names: Optional[np.ndarray] = None):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.missing_go_to_left = arrays["missing_go_to_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.n_trees = len(self.roots)
+        self.is_leaf = arrays["is_leaf"] if "is_leaf" in arrays else self.children[0::2] == np.arange(len(self.feature))
+        self.is_classifier = classes is not None
+        if classes is not None:
+            self.classes_ = classes
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_estimator(cls, forest: Any) -> "CompiledForest":
+        """
+        Flatten a fitted forest
+
+        Raises:
+            ValueError: If the forest has several outputs or is not tree-based
+        """
+        if not hasattr(forest, "estimators_") or not hasattr(forest.estimators_[0], "tree_"):
+            raise ValueError(f"{type(forest).__name__} is not a fitted tree ensemble")
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        classes = getattr(forest, "classes_", None)
+        features, thresholds, children, missing_left, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int64)
+            # Interleaved (left, right) children; leaves point at themselves
+            pairs = np.empty((n, 2), dtype=np.int64)
+            pairs[:, 0] = np.where(is_leaf, own, tree.children_left + offset)
+            pairs[:, 1] = np.where(is_leaf, own, tree.children_right + offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            children.append(pairs.ravel())
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(n, dtype=bool) if missing is None else missing.astype(bool))
+            if classes is not None:
+                values.append(tree.value[:, 0, :len(classes)].astype(np.float64))
+            else:
+                values.append(tree.value[:, 0, :1].astype(np.float64))
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        arrays = {
+            "feature": np.concatenate(features),
+            "threshold": np.concatenate(thresholds),
+            "children": np.concatenate(children),
+            "missing_go_to_left": np.concatenate(missing_left),
+            "value": np.concatenate(values),
+            "roots": np.asarray(roots, dtype=np.int64),
+            "max_depth": np.asarray(max_depth),
+            "n_features": np.asarray(forest.n_features_in_),
+        }
+        return cls(arrays, classes=classes, feature_names=getattr(forest, "feature_names_in_", None))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """The flattened node table, e.g. for saving to disk"""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children": self.children,
+            "missing_go_to_left": self.missing_go_to_left,
+            "value": self.value,
+            "roots": self.roots,
+            "max_depth": np.asarray(self.max_depth),
+            "n_features": np.asarray(self.n_features_in_),
+            "is_leaf": self.is_leaf,
+        }
+
+    def compact(self, n_trees: Optional[int] = None, max_depth: Optional[int] = None,
+                threshold_dtype: Any = None, value_dtype: Any = None) -> "CompiledForest":
+        """
+        Build a smaller, approximate copy of this forest
+
+        Args:
+            n_trees: Keep only the first n_trees trees
+            max_depth: Turn nodes at this depth into leaves; an internal
+                node's stored value is the mean over its subtree, so it is
+                the natural prediction for the truncated branch
+            threshold_dtype: e.g. np.float32 (float64 keeps thresholds exact)
+            value_dtype: e.g. np.float32 or np.float16 for leaf values
+
+        Nodes that become unreachable are dropped and node and feature
+        indices are stored in the narrowest integer types that fit.
+        """
+        n_trees = self.n_trees if n_trees is None else max(1, min(n_trees, self.n_trees))
+        depth_limit = self.max_depth if max_depth is None else min(max_depth, self.max_depth)
+
+        # Breadth-first over the kept trees, one depth level at a time
+        levels = [self.roots[:n_trees].astype(np.int64)]
+        for _ in range(depth_limit):
+            inner = levels[-1][~self.is_leaf[levels[-1]]]
+            if len(inner) == 0:
+                break
+            levels.append(np.stack([self.children[2 * inner], self.children[2 * inner + 1]], axis=1).ravel())
+        truncated = np.zeros(len(self.feature), dtype=bool)
+        if len(levels) == depth_limit + 1:
+            truncated[levels[-1]] = ~self.is_leaf[levels[-1]]
+        kept = np.concatenate(levels)
+        n_nodes = len(kept)
+
+        new_id = np.full(len(self.feature), -1, dtype=np.int64)
+        new_id[kept] = np.arange(n_nodes)
+        leaf = self.is_leaf[kept] | truncated[kept]
+        own = np.arange(n_nodes)
+        index_dtype = np.int32 if 2 * n_nodes < np.iinfo(np.int32).max else np.int64
+        children = np.empty((n_nodes, 2), dtype=index_dtype)
+        children[:, 0] = np.where(leaf, own, new_id[self.children[2 * kept]])
+        children[:, 1] = np.where(leaf, own, new_id[self.children[2 * kept + 1]])
+        feature_dtype = np.int8 if self.n_features_in_ <= np.iinfo(np.int8).max else np.int16 if self.n_features_in_ <= np.iinfo(np.int16).max else np.intp
+
+        arrays = {
+            "feature": np.where(leaf, 0, self.feature[kept]).astype(feature_dtype),
+            "threshold": self.threshold[kept].astype(threshold_dtype or self.threshold.dtype),
+            "children": children.ravel(),
+            "missing_go_to_left": self.missing_go_to_left[kept],
+            "value": self.value[kept].astype(value_dtype or self.value.dtype),
+            "roots": np.arange(n_trees, dtype=np.int64),
+            "max_depth": np.asarray(len(levels) - 1),
+            "n_features": np.asarray(self.n_features_in_),
+            "is_leaf": leaf,
+        }
+        return CompiledForest(arrays, classes=getattr(self, "classes_", None),
+                              feature_names=getattr(self, "feature_names_in_", None))
+
+    def save(self, directory: str, source: Optional[Dict[str, Any]] = None,
+             variant: Optional[Dict[str, Any]] = None):
+        """
+        Write the node table as one .npy file per array plus meta.json
+
+        The directory is written next to it and renamed into place, so
+        processes that have the previous version memory-mapped keep
+        reading it undisturbed.
+
+        Args:
+            directory: Target directory (replaced if it exists)
+            source: Identity of the pickle this was compiled from
+                (size, mtime_ns, digest), used to detect stale artifacts
+            variant: Compaction settings, when this is a compacted forest
+        """
+        staging = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        scalars = {}
+        for name, array in self.arrays().items():
+            if np.ndim(array) == 0:
+                # 0-d arrays cannot be memory-mapped; keep them in meta.json
+                scalars[name] = int(array)
+            else:
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        meta = {
+            "format": COMPILED_FORMAT,
+            "scalars": scalars,
+            "classes": _labels_to_json(getattr(self, "classes_", None)),
+            "feature_names": _labels_to_json(getattr(self, "feature_names_in_", None)),
+            "source": source,
+            "variant": variant,
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(staging, directory)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "CompiledForest":
+        """
+        Open a saved node table
+
+        With the default mmap_mode="r" the arrays are memory-mapped
+        read-only, so every process serving the model shares one page-cache
+        copy and nothing is read until a prediction touches it.
+        """
+        meta = read_compiled_meta(directory)
+        arrays = {
+            name[:-4]: np.load(os.path.join(directory, name), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in os.listdir(directory) if name.endswith(".npy")
+        }
+        arrays.update({name: np.asarray(value) for name, value in meta["scalars"].items()})
+        return cls(arrays, classes=_labels_from_json(meta["classes"]),
+                   feature_names=_labels_from_json(meta["feature_names"]))
+
+    def _as_array(self, X: Any) -> np.ndarray:
+        names = getattr(self, "feature_names_in_", None)
+        if hasattr(X, "columns") and names is not None and not np.array_equal(X.columns, names):
+            X = X[list(names)]
+        X = np.asarray(X, dtype=TREE_DTYPE)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+        return X
+
+    def apply(self, X: Any) -> np.ndarray:
+        """Global leaf index reached by every row in every tree, shape (n_rows, n_trees)"""
+        X = self._as_array(X)
+        flat = X.ravel()
+        row_base = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        has_nan = bool(np.isnan(flat).any())
+        for depth in range(self.max_depth):
+            x = np.take(flat, row_base + np.take(self.feature, nodes))
+            threshold = np.take(self.threshold, nodes)
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~np.take(self.missing_go_to_left, nodes), ~(x <= threshold))
+            else:
+                go_right = x > threshold
+            nodes = np.take(self.children, 2 * nodes + go_right)
+            # Most paths end well before max_depth; stop once every one has
+            if depth % 4 == 3 and np.take(self.is_leaf, nodes).all():
+                break
+        return nodes
+
+    def _mean_value(self, X: Any) -> np.ndarray:
+        leaf_values = self.value[self.apply(X)]
+        # cumsum adds trees strictly in order, matching sklearn's accumulation
+        # (in float64 even when a compacted forest stores narrower values)
+        return np.cumsum(leaf_values, axis=1, dtype=np.float64)[:, -1] / self.n_trees
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_value(X)
+
+    def predict(self, X: Any) -> np.ndarray:
+        mean = self._mean_value(X)
+        if self.is_classifier:
+            return self.classes_.take(np.argmax(mean, axis=1), axis=0)
+        return mean[:, 0]
+
+
+def read_compiled_meta(directory: str) -> Dict[str, Any]:
+    """
+    Read a compiled artifact's meta.json
+
+    Raises:
+        ValueError: If the artifact was written in another format version
+    """
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != COMPILED_FORMAT:
+        raise ValueError(f"Unsupported compiled artifact format {meta.get('format')} in {directory}")
+    return meta
+
+
+def source_identity(model_path: str, digest: Optional[str] = None) -> Dict[str, Any]:
+    """Size, modification time and content digest of a pickled model"""
+    stat = os.stat(model_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest or file_digest(model_path)}
+
+
+def fresh_compiled_meta(model_path: str) -> Optional[Dict[str, Any]]:
+    """
+    meta.json of the compiled artifact for a pickle, if it is up to date
+
+    Size and modification time are compared first; when only the time
+    differs (e.g. after a checkout) the pickle is hashed and compared by
+    digest instead.
+
+    Returns:
+        The metadata, or None when there is no usable compiled artifact
+    """
+    directory = compiled_path(model_path)
+    try:
+        meta = read_compiled_meta(directory)
+    except (OSError, ValueError):
+        return None
+    source = meta.get("source") or {}
+    stat = os.stat(model_path)
+    if source.get("size") != stat.st_size:
+        return None
+    if source.get("mtime_ns") != stat.st_mtime_ns and source.get("digest") != file_digest(model_path):
+        return None
+    return meta
+
+
+def export_compiled(model: Any, model_path: str) -> Optional[str]:
+    """
+    Save the compiled form of a pickled model next to its pickle
+
+    Called by the training scripts right after joblib.dump(model, model_path).
+
+    Returns:
+        The artifact directory, or None when the model cannot be compiled
+    """
+    compiled = compile_forest(model)
+    if not isinstance(compiled, CompiledForest):
+        return None
+    directory = compiled_path(model_path)
+    compiled.save(directory, source=source_identity(model_path))
+    return directory
+
+
+def compile_forest(model: Any) -> Any:
+    """
+    Compile a forest when possible
+
+    Returns:
+        A CompiledForest, or the model unchanged when it cannot be compiled
+    """
+    try:
+        return CompiledForest.from_estimator(model)
+    except (ValueError, AttributeError, IndexError, TypeError):
+        return model
@@ -0,0 +1,218 @@
+"""
+Shared HTTP Client Module
+Pooled keep-alive HTTP clients (httpx) for every outbound API call
+(Open-Meteo, MET Norway) with per-host connection limits and retries
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# HTTP Client Configuration
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "20"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.2"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "2.0"))
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "smart-agri-dashboard/1.0 contact@example.com")
+
+# Status codes worth retrying (rate limiting and transient upstream errors)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Global client instances (async for coroutines, sync for threadpool routes)
+async_client: Optional[httpx.AsyncClient] = None
+sync_client: Optional[httpx.Client] = None
+
+# Per-host concurrency limits
+_async_host_limits: Dict[str, asyncio.Semaphore] = {}
+_sync_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_sync_lock = threading.Lock()
+
+
+def _client_options() -> Dict[str, Any]:
+    """Common keep-alive, pooling and timeout options for both clients"""
+    return {
+        "timeout": httpx.Timeout(HTTP_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        "headers": {"User-Agent": USER_AGENT},
+        "follow_redirects": True,
+    }
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Zero-based retry attempt number
+
+    Returns:
+        Seconds to sleep before the next attempt
+    """
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+async def connect_http_client():
+    """
+    Create the shared async HTTP client
+    Called during application startup
+    """
+    global async_client
+
+    if async_client is None:
+        async_client = httpx.AsyncClient(**_client_options())
+        print("✅ Shared HTTP client ready")
+
+
+async def close_http_client():
+    """
+    Close the shared HTTP clients
+    Called during application shutdown
+    """
+    global async_client, sync_client
+
+    if async_client is not None:
+        await async_client.aclose()
+        async_client = None
+    with _sync_lock:
+        if sync_client is not None:
+            sync_client.close()
+            sync_client = None
+    _async_host_limits.clear()
+    print("✅ Shared HTTP client closed")
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the shared async client, creating it lazily when the
+    startup hook has not run (scripts, Streamlit, tests)
+    """
+    global async_client
+
+    if async_client is None:
+        async_client = httpx.AsyncClient(**_client_options())
+    return async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """
+    Get the shared blocking client used by sync code paths
+    (threadpool routes, Flask and Streamlit apps)
+    """
+    global sync_client
+
+    if sync_client is None:
+        with _sync_lock:
+            if sync_client is None:
+                sync_client = httpx.Client(**_client_options())
+    return sync_client
+
+
+def _async_host_limit(url: str) -> asyncio.Semaphore:
+    host = _host(url)
+    if host not in _async_host_limits:
+        _async_host_limits[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return _async_host_limits[host]
+
+
+def _sync_host_limit(url: str) -> threading.BoundedSemaphore:
+    host = _host(url)
+    with _sync_lock:
+        if host not in _sync_host_limits:
+            _sync_host_limits[host] = threading.BoundedSemaphore(HTTP_MAX_PER_HOST)
+        return _sync_host_limits[host]
+
+
+async def get(url: str, params: Optional[Dict[str, Any]] = None,
+              headers: Optional[Dict[str, str]] = None, retries: int = HTTP_RETRIES) -> httpx.Response:
+    """
+    GET a URL with the shared async client, retrying transport errors
+    and retryable status codes with jittered backoff
+
+    Args:
+        url: Request URL
+        params: Query parameters
+        headers: Extra request headers
+        retries: Number of retries after the first attempt
+
+    Returns:
+        The final httpx.Response (status is not checked)
+    """
+    client = get_async_client()
+    for attempt in range(retries + 1):
+        try:
+            async with _async_host_limit(url):
+                response = await client.get(url, params=params, headers=headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+def get_sync(url: str, params: Optional[Dict[str, Any]] = None,
+             headers: Optional[Dict[str, str]] = None, retries: int = HTTP_RETRIES) -> httpx.Response:
+    """
+    Blocking counterpart of get() using the shared sync client
+
+    Args:
+        url: Request URL
+        params: Query parameters
+        headers: Extra request headers
+        retries: Number of retries after the first attempt
+
+    Returns:
+        The final httpx.Response (status is not checked)
+    """
+    client = get_sync_client()
+    for attempt in range(retries + 1):
+        try:
+            with _sync_host_limit(url):
+                response = client.get(url, params=params, headers=headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        time.sleep(backoff_delay(attempt))
+
+
+async def get_json(url: str, params: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None) -> Any:
+    """
+    GET a URL and decode the JSON body, raising httpx.HTTPStatusError
+    on non-2xx responses
+    """
+    response = await get(url, params=params, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_json_sync(url: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Any:
+    """
+    Blocking counterpart of get_json()
+    """
+    response = get_sync(url, params=params, headers=headers)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,299 @@
+"""
+Inference Batcher Module
+Collects concurrent single-row predictions for the same model into one
+vectorized call, from threadpool routes and async routes alike
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from model_registry import model_registry
+from inference_pool import INFERENCE_POOL, InferencePoolError, inference_pool
+
+# Load environment variables
+load_dotenv()
+
+# Batching Configuration
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "1") == "1"
+INFERENCE_BATCH_MAX_ROWS = int(os.getenv("INFERENCE_BATCH_MAX_ROWS", "64"))
+INFERENCE_BATCH_MAX_WAIT_MS = float(os.getenv("INFERENCE_BATCH_MAX_WAIT_MS", "2"))
+
+
+class InferenceBatcher:
+    """
+    Micro-batching dispatcher for one registered model
+
+    Callers submit rows and get a concurrent.futures.Future. A daemon thread
+    takes the first queued request, gathers more until max_rows rows are
+    collected or max_wait seconds pass, runs one predict/predict_proba call
+    per method over the stacked rows, and resolves every caller's future
+    with its slice.
+
+    The wait adapts to load: a moving average of recent batch sizes decides
+    whether waiting is worthwhile. At low concurrency requests are
+    dispatched immediately, so a lone caller never pays the window.
+
+    With INFERENCE_POOL=1 each batch is handed to the inference process
+    pool and the thread goes straight back to collecting, so several
+    batches of the same model run in parallel across worker processes.
+    """
+
+    def __init__(self, model_name: str, max_rows: int = INFERENCE_BATCH_MAX_ROWS,
+                 max_wait: float = INFERENCE_BATCH_MAX_WAIT_MS / 1000):
+        self.model_name = model_name
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[str, np.ndarray, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._load = 1.0
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=f"batcher-{self.model_name}", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, method: str, X: np.ndarray) -> Future:
+        """
+        Queue rows for prediction
+
+        Args:
+            method: "predict" or "predict_proba"
+            X: 2-D array of feature rows in the model's feature order
+
+        Returns:
+            Future resolving to the model output for these rows
+        """
+        future: Future = Future()
+        # A running future can no longer be cancelled by a caller that gives up
+        # (asyncio.wrap_future cancels pending ones), so resolving it never fails
+        future.set_running_or_notify_cancel()
+        self._ensure_thread()
+        self._queue.put((method, X, future))
+        return future
+
+    def _collect(self) -> List[Tuple[str, np.ndarray, Future]]:
+        batch = [self._queue.get()]
+        rows = len(batch[0][1])
+        deadline = time.monotonic() + (self.max_wait if self._load >= 2 else 0.0)
+        while rows < self.max_rows:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [item for item in self._collect() if not item[2].cancelled()]
+            if not batch:
+                continue
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                # Never let one batch end the thread every later request depends on
+                self._fail([(X, future) for _, X, future in batch], e)
+
+    def _dispatch(self, batch: List[Tuple[str, np.ndarray, Future]]):
+        rows = sum(len(X) for _, X, _ in batch)
+        self._load = 0.8 * self._load + 0.2 * len(batch)
+        self.requests += len(batch)
+        self.batches += 1
+        self.rows += rows
+        self.max_batch_rows = max(self.max_batch_rows, rows)
+
+        if INFERENCE_POOL:
+            for method, items in self._by_method(batch).items():
+                try:
+                    future = inference_pool.submit(self.model_name, method, np.concatenate([X for X, _ in items]))
+                except Exception as e:
+                    self._fail(items, e)
+                    continue
+                future.add_done_callback(lambda done, items=items: self._resolve_from(done, items))
+            return
+
+        try:
+            model = model_registry.get_compiled(self.model_name)
+        except Exception as e:
+            self._fail([(X, future) for _, X, future in batch], e)
+            return
+
+        for method, items in self._by_method(batch).items():
+            try:
+                output = getattr(model, method)(np.concatenate([X for X, _ in items]))
+            except Exception as e:
+                self._fail(items, e)
+                continue
+            self._scatter(items, output)
+
+    @staticmethod
+    def _by_method(batch: List[Tuple[str, np.ndarray, Future]]) -> Dict[str, List[Tuple[np.ndarray, Future]]]:
+        groups: Dict[str, List[Tuple[np.ndarray, Future]]] = {}
+        for method, X, future in batch:
+            groups.setdefault(method, []).append((X, future))
+        return groups
+
+    @staticmethod
+    def _settle(future: Future, result: Any = None, error: Optional[BaseException] = None):
+        # A caller's future may already be done (cancelled); that must not affect the others
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    @classmethod
+    def _fail(cls, items: List[Tuple[np.ndarray, Future]], error: BaseException):
+        for _, future in items:
+            cls._settle(future, error=error)
+
+    @classmethod
+    def _scatter(cls, items: List[Tuple[np.ndarray, Future]], output: np.ndarray):
+        start = 0
+        for X, future in items:
+            cls._settle(future, output[start:start + len(X)])
+            start += len(X)
+
+    def _resolve_from(self, done: Future, items: List[Tuple[np.ndarray, Future]]):
+        # Runs as a done-callback, where concurrent.futures would log and swallow
+        # an exception and leave the remaining callers unresolved
+        if done.cancelled():
+            self._fail(items, InferencePoolError("Inference pool call was cancelled"))
+            return
+        error = done.exception()
+        if error is not None:
+            self._fail(items, error)
+        else:
+            self._scatter(items, done.result())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_rows": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_rows": self.max_batch_rows,
+            "queued": self._queue.qsize(),
+            "max_rows": self.max_rows,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class BatchedModel:
+    """
+    Drop-in stand-in for a registered model that routes predict and
+    predict_proba through its InferenceBatcher
+
+    Other attributes (classes_, feature_names_in_, ...) are read from the
+    current compiled model, so helpers written against an estimator work
+    unchanged. Async routes should use the *_async methods, which await
+    the batch without blocking the event loop.
+    """
+
+    def __init__(self, model_name: str, batcher: Optional[InferenceBatcher] = None):
+        self.model_name = model_name
+        self.batcher = batcher or InferenceBatcher(model_name)
+
+    def __getattr__(self, name: str) -> Any:
+        if INFERENCE_POOL:
+            # Read from the workers' copy so the web process never loads the model
+            metadata = inference_pool.metadata(self.model_name)
+            if name in metadata:
+                return metadata[name]
+            raise AttributeError(name)
+        return getattr(model_registry.get_compiled(self.model_name), name)
+
+    def _rows(self, X: Any) -> np.ndarray:
+        names = getattr(self, "feature_names_in_", None)
+        if hasattr(X, "columns") and names is not None:
+            X = X[list(names)]
+        X = np.asarray(X, dtype=np.float64)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def _submit(self, method: str, X: Any) -> Optional[Future]:
+        if INFERENCE_BATCHING:
+            return self.batcher.submit(method, self._rows(X))
+        if INFERENCE_POOL:
+            return inference_pool.submit(self.model_name, method, self._rows(X))
+        return None
+
+    def _call(self, method: str, X: Any) -> Any:
+        future = self._submit(method, X)
+        if future is None:
+            return getattr(model_registry.get_compiled(self.model_name), method)(X)
+        return future.result()
+
+    async def load_metadata_async(self):
+        """
+        Fetch classes_, feature_names_in_, ... from the pool workers without
+        blocking the event loop, so attribute reads that follow are served
+        from the pool's cache (no-op without INFERENCE_POOL)
+        """
+        if INFERENCE_POOL:
+            await inference_pool.metadata_async(self.model_name)
+
+    async def _call_async(self, method: str, X: Any) -> Any:
+        await self.load_metadata_async()
+        future = self._submit(method, X)
+        if future is None:
+            return getattr(model_registry.get_compiled(self.model_name), method)(X)
+        return await asyncio.wrap_future(future)
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self._call("predict", X)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self._call("predict_proba", X)
+
+    async def predict_async(self, X: Any) -> np.ndarray:
+        return await self._call_async("predict", X)
+
+    async def predict_proba_async(self, X: Any) -> np.ndarray:
+        return await self._call_async("predict_proba", X)
+
+
+_batched_models: Dict[str, BatchedModel] = {}
+_batched_lock = threading.Lock()
+
+
+def batched_model(model_name: str) -> BatchedModel:
+    """Get the process-wide BatchedModel for a registered model name"""
+    if model_name not in _batched_models:
+        with _batched_lock:
+            if model_name not in _batched_models:
+                _batched_models[model_name] = BatchedModel(model_name)
+    return _batched_models[model_name]
+
+
+def batcher_stats() -> Dict[str, Any]:
+    """Batching counters for every model that has been used"""
+    return {
+        "enabled": INFERENCE_BATCHING,
+        "models": {name: model.batcher.stats() for name, model in _batched_models.items()},
+    }
@@ -0,0 +1,219 @@
+"""
+Inference Cache Module
+LRU cache of model outputs keyed on request inputs rounded to per-feature
+tolerances, so repeated requests skip feature encoding and inference
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from model_registry import model_registry
+from singleflight import SingleFlight
+
+# Load environment variables
+load_dotenv()
+
+# Cache Configuration
+INFERENCE_CACHE = os.getenv("INFERENCE_CACHE", "1") == "1"
+INFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_MAX_ENTRIES", "4096"))
+INFERENCE_CACHE_TTL = int(os.getenv("INFERENCE_CACHE_TTL", "3600"))
+
+# Rounding step per input field; fields without a step are matched exactly.
+# Steps are at or below the precision the UI sliders and sensors report.
+INFERENCE_CACHE_TOLERANCES = {
+    "crop": {
+        "N": 1.0, "P": 1.0, "K": 1.0,
+        "temperature": 0.1, "humidity": 0.1, "ph": 0.01, "rainfall": 0.1, "ozone": 0.1,
+    },
+    "yield": {"ozone": 0.1, "temp": 0.1, "rain": 0.1, "soil": 0.01},
+}
+
+
+def quantize_value(value: Any, step: float) -> Any:
+    """Round a numeric value to the nearest multiple of step; other values pass through"""
+    if not step or value is None or isinstance(value, (str, bool)):
+        return value
+    return round(round(float(value) / step) * step, 6)
+
+
+class InferenceCache:
+    """
+    Thread-safe LRU cache of one model's outputs with a TTL
+
+    Inputs are rounded to the model's per-field tolerances only to build
+    the lookup key. A miss evaluates the model on the exact inputs, so a
+    first-time request gets the same answer as with the cache disabled
+    (and as the batch endpoints), and later requests within the same
+    tolerance cell reuse it.
+    Entries are tagged with the registry generation of the model and the
+    whole cache is dropped as soon as the model is reloaded. Concurrent
+    misses for the same inputs share one evaluation.
+    """
+
+    def __init__(self, model_name: str, tolerances: Optional[Mapping[str, float]] = None,
+                 max_entries: int = INFERENCE_CACHE_MAX_ENTRIES, ttl: float = INFERENCE_CACHE_TTL,
+                 enabled: bool = INFERENCE_CACHE):
+        self.model_name = model_name
+        self.tolerances = dict(INFERENCE_CACHE_TOLERANCES.get(model_name, {}) if tolerances is None else tolerances)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generation = model_registry.generation(model_name)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.flights = SingleFlight()
+
+    def quantize(self, inputs: Mapping[str, Any]) -> Dict[str, Any]:
+        """Round every input field to its tolerance"""
+        return {field: quantize_value(value, self.tolerances.get(field, 0)) for field, value in inputs.items()}
+
+    def _check_generation(self) -> int:
+        generation = model_registry.generation(self.model_name)
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self._entries.clear()
+                    self._generation = generation
+                    self.invalidations += 1
+        return generation
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now >= entry[0]:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _peek(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None and time.monotonic() < entry[0] else None
+
+    def _set(self, key: Hashable, value: Any, generation: int):
+        if isinstance(value, np.ndarray):
+            # Callers share the cached array, so it must not be modified in place
+            value.setflags(write=False)
+        with self._lock:
+            # Drop results computed by a model that has since been reloaded
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, inputs: Mapping[str, Any], compute: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Return the cached output for inputs' tolerance cell or call compute(inputs)
+
+        Args:
+            inputs: Raw request fields, before feature encoding
+            compute: Encodes the inputs and runs the model
+
+        Returns:
+            The model output, computed on the exact inputs on a miss
+            (None is not cached)
+        """
+        if not self.enabled:
+            return compute(dict(inputs))
+        generation = self._check_generation()
+        key = (generation,) + tuple(sorted(self.quantize(inputs).items()))
+        value = self._get(key)
+        if value is None:
+            def load() -> Any:
+                # A previous flight may have filled the entry since our miss
+                loaded = self._peek(key)
+                if loaded is None:
+                    loaded = compute(dict(inputs))
+                    if loaded is not None:
+                        self._set(key, loaded, generation)
+                return loaded
+
+            value = self.flights.do(key, load)
+        return value
+
+    async def get_or_compute_async(self, inputs: Mapping[str, Any],
+                                   compute: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of get_or_compute() for coroutine computations
+        """
+        if not self.enabled:
+            return await compute(dict(inputs))
+        generation = self._check_generation()
+        key = (generation,) + tuple(sorted(self.quantize(inputs).items()))
+        value = self._get(key)
+        if value is None:
+            async def load() -> Any:
+                loaded = self._peek(key)
+                if loaded is None:
+                    loaded = await compute(dict(inputs))
+                    if loaded is not None:
+                        self._set(key, loaded, generation)
+                return loaded
+
+            value = await self.flights.do_async(key, load)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "generation": self._generation,
+                "tolerances": self.tolerances,
+            }
+
+
+_caches: Dict[str, InferenceCache] = {}
+_caches_lock = threading.Lock()
+
+
+def inference_cache(model_name: str) -> InferenceCache:
+    """Get the process-wide InferenceCache for a registered model name"""
+    if model_name not in _caches:
+        with _caches_lock:
+            if model_name not in _caches:
+                _caches[model_name] = InferenceCache(model_name)
+    return _caches[model_name]
+
+
+def inference_cache_stats() -> Dict[str, Any]:
+    """Cache counters for every model that has been used"""
+    return {
+        "enabled": INFERENCE_CACHE,
+        "models": {name: cache.stats() for name, cache in _caches.items()},
+    }
@@ -0,0 +1,301 @@
+"""
+Inference Pool Module
+Optional pool of worker processes that each load the models once and
+evaluate them outside the web process, so CPU-bound inference does not
+hold the GIL that I/O threads and the event loop need
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from model_registry import model_registry
+
+# Load environment variables
+load_dotenv()
+
+# Pool Configuration
+INFERENCE_POOL = os.getenv("INFERENCE_POOL", "0") == "1"
+INFERENCE_POOL_WORKERS = int(os.getenv("INFERENCE_POOL_WORKERS", str(os.cpu_count() or 1)))
+# Size of each worker's input and output shared-memory buffers; larger calls are chunked
+INFERENCE_POOL_SLOT_MB = float(os.getenv("INFERENCE_POOL_SLOT_MB", "4"))
+
+
+class InferencePoolError(RuntimeError):
+    """Raised when a worker process dies or cannot be reached"""
+
+
+def _worker_main(conn: Any, in_name: str, out_name: str):
+    """
+    Worker process loop
+
+    Messages are (op, model_name, generation, method, n_rows, n_cols).
+    Inputs are read from the input buffer as float64 rows and outputs are
+    written to the output buffer as float64; only shapes and metadata go
+    through the pipe. A model is reloaded when the parent's registry
+    generation for it has moved on.
+    """
+    # Spawned workers share the parent's resource tracker, which unlinks the
+    # buffers once; attaching here only adds to its (idempotent) registry
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    generations: Dict[str, int] = {}
+    model_registry.warm_up_from_env()
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            op, name, generation, method, n_rows, n_cols = message
+            try:
+                if generations.setdefault(name, generation) != generation:
+                    model_registry.reload(name)
+                    generations[name] = generation
+                model = model_registry.get_compiled(name)
+                if op == "meta":
+                    conn.send(("ok", {
+                        attr: getattr(model, attr)
+                        for attr in ("classes_", "feature_names_in_", "n_features_in_")
+                        if hasattr(model, attr)
+                    }))
+                    continue
+                X = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=in_shm.buf)
+                if method == "predict" and hasattr(model, "classes_"):
+                    # Class labels can be any dtype; send indices into classes_ instead
+                    output = np.argmax(model.predict_proba(X), axis=1)
+                else:
+                    output = getattr(model, method)(X)
+                output = np.asarray(output, dtype=np.float64).reshape(n_rows, -1)
+                np.ndarray(output.shape, dtype=np.float64, buffer=out_shm.buf)[:] = output
+                conn.send(("ok", output.shape))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        in_shm.close()
+        out_shm.close()
+
+
+class _Worker:
+    """One worker process with its pipe and its pair of shared-memory buffers"""
+
+    def __init__(self, context: Any, slot_bytes: int, index: int):
+        self.index = index
+        self.slot_bytes = slot_bytes
+        self.in_shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, self.in_shm.name, self.out_shm.name),
+            name=f"inference-worker-{index}", daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.requests = 0
+        self.rows = 0
+
+    def call(self, op: str, name: str, generation: int, method: str = "",
+             X: Optional[np.ndarray] = None) -> Any:
+        n_rows, n_cols = X.shape if X is not None else (0, 0)
+        if X is not None:
+            np.ndarray(X.shape, dtype=np.float64, buffer=self.in_shm.buf)[:] = X
+        try:
+            self.conn.send((op, name, generation, method, n_rows, n_cols))
+            status, payload = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise InferencePoolError(f"Inference worker {self.index} is not responding: {e}")
+        if status != "ok":
+            raise RuntimeError(payload)
+        self.requests += 1
+        self.rows += n_rows
+        if op == "meta":
+            return payload
+        # Copy out before the buffer is reused by the next call
+        return np.ndarray(payload, dtype=np.float64, buffer=self.out_shm.buf).copy()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        for shm in (self.in_shm, self.out_shm):
+            shm.close()
+            shm.unlink()
+
+
+class InferencePool:
+    """
+    Fixed pool of model-serving worker processes
+
+    submit() returns a concurrent.futures.Future, so threadpool routes can
+    block on result() (waiting on a pipe releases the GIL) and async routes
+    can await it through asyncio.wrap_future(). Each call borrows an idle
+    worker, copies its rows into that worker's input buffer and copies the
+    result out of its output buffer; calls larger than a buffer are split
+    into chunks. Workers are started with the "spawn" method so they never
+    inherit the web process's threads or sockets.
+
+    Class labels, feature names and feature counts are fetched from a
+    worker once per model generation, so the web process never has to load
+    the models itself.
+    """
+
+    def __init__(self, workers: int = INFERENCE_POOL_WORKERS,
+                 slot_bytes: int = int(INFERENCE_POOL_SLOT_MB * 1024 * 1024)):
+        self.n_workers = max(1, workers)
+        self.slot_bytes = slot_bytes
+        self._context = get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._metadata: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.restarts = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        """Spawn the worker processes (idempotent)"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._workers = [_Worker(self._context, self.slot_bytes, i) for i in range(self.n_workers)]
+            for worker in self._workers:
+                self._idle.put(worker)
+            self._executor = ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix="inference-pool")
+        print(f"✅ Started {self.n_workers} inference worker processes")
+
+    def stop(self):
+        """Stop every worker and release the shared-memory buffers"""
+        with self._lock:
+            if self._executor is None:
+                return
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+            self._idle = queue.Queue()
+            self._metadata.clear()
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        # A worker that died mid-call is replaced so the pool keeps its size
+        try:
+            worker.close()
+        except Exception:
+            pass
+        replacement = _Worker(self._context, self.slot_bytes, worker.index)
+        with self._lock:
+            self._workers[self._workers.index(worker)] = replacement
+            self.restarts += 1
+        return replacement
+
+    def _run(self, op: str, name: str, generation: int, method: str = "",
+             X: Optional[np.ndarray] = None) -> Any:
+        worker = self._idle.get()
+        try:
+            if X is None:
+                return worker.call(op, name, generation)
+            chunk_rows = max(1, self.slot_bytes // (8 * max(X.shape[1], self._output_columns(name, generation, method))))
+            parts = [worker.call(op, name, generation, method, X[start:start + chunk_rows])
+                     for start in range(0, len(X), chunk_rows)]
+            return parts[0] if len(parts) == 1 else np.concatenate(parts)
+        except InferencePoolError:
+            worker = self._replace(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def _output_columns(self, name: str, generation: int, method: str) -> int:
+        if method != "predict_proba":
+            return 1
+        return len(self._metadata.get((name, generation), {}).get("classes_", ())) or 1
+
+    def metadata(self, name: str, generation: Optional[int] = None) -> Dict[str, Any]:
+        """
+        classes_, feature_names_in_ and n_features_in_ of a model, as loaded by the workers
+
+        Blocks on a worker the first time per model generation; async code
+        should await metadata_async() instead.
+        """
+        generation = model_registry.generation(name) if generation is None else generation
+        key = (name, generation)
+        if key not in self._metadata:
+            self.start()
+            self._metadata[key] = self._executor.submit(self._run, "meta", name, generation).result()
+        return self._metadata[key]
+
+    async def metadata_async(self, name: str) -> Dict[str, Any]:
+        """Async counterpart of metadata() that does not block the event loop"""
+        generation = model_registry.generation(name)
+        key = (name, generation)
+        if key not in self._metadata:
+            self.start()
+            self._metadata[key] = await asyncio.wrap_future(
+                self._executor.submit(self._run, "meta", name, generation)
+            )
+        return self._metadata[key]
+
+    def _decode(self, name: str, generation: int, method: str, output: np.ndarray) -> np.ndarray:
+        if method == "predict_proba":
+            return output
+        classes = self._metadata[(name, generation)].get("classes_")
+        if classes is not None:
+            return classes.take(output[:, 0].astype(np.intp), axis=0)
+        return output[:, 0]
+
+    def submit(self, name: str, method: str, X: np.ndarray) -> Future:
+        """
+        Evaluate a registered model in a worker process
+
+        Args:
+            name: Registered model name
+            method: "predict" or "predict_proba"
+            X: 2-D float array of feature rows in the model's feature order
+
+        Returns:
+            Future resolving to the same output the model would return in-process
+        """
+        # One generation for the metadata, the worker call and decoding, even if a reload lands in between
+        generation = model_registry.generation(name)
+        self.metadata(name, generation)
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return self._executor.submit(
+            lambda: self._decode(name, generation, method, self._run("call", name, generation, method, X))
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": INFERENCE_POOL,
+            "running": self.running,
+            "workers": [
+                {"pid": w.process.pid, "alive": w.process.is_alive(), "requests": w.requests, "rows": w.rows}
+                for w in list(self._workers)
+            ],
+            "idle": self._idle.qsize(),
+            "restarts": self.restarts,
+            "slot_bytes": self.slot_bytes,
+        }
+
+
+# Shared pool; only started when INFERENCE_POOL=1 (or start() is called)
+inference_pool = InferencePool()
+atexit.register(inference_pool.stop)
@@ -1,30 +1,49 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Body
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import joblib
-import pandas as pd
-from utils import fetch_weather_data, get_hourly_forecast, recommend_fertilizer, predict_stress_level
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from utils import fetch_weather_data, get_hourly_forecast, recommend_fertilizer, predict_stress_level, predict_yield_value
 from auth import router as auth_router
 from database import connect_to_mongodb, close_mongodb_connection
+from http_client import connect_http_client, close_http_client
 from db_helpers import get_database_stats
 from crop_models import ManualCropInput, LocationCropInput, CropPredictionResponse, LocationDataResponse
-from crop_service import predict_crop, fetch_all_location_data
+from crop_service import predict_crop, predict_crop_ranked_async, crop_class_index, fetch_all_location_data, get_soil_data_batch
+from soil_raster import SOIL_BATCH_MAX_POINTS
+from weather_cache import weather_cache
+from forecast_bundle import weather_fetcher
+from forecast_store import forecast_store
+from model_registry import model_registry
+from inference_batcher import batched_model, batcher_stats
+from inference_cache import inference_cache_stats
+from inference_pool import INFERENCE_POOL, inference_pool
+import batch_predict
+from batch_predict import BatchInputError
+from sweep import SweepInputError, run_sweep
 
 app = FastAPI(title="SmartAgri API", description="Smart Agriculture Decision Support System", version="1.0.0")
 
-# Event handlers for MongoDB connection
+# Event handlers for MongoDB connection and the shared HTTP client
 @app.on_event("startup")
 async def startup_event():
-    """Initialize MongoDB connection on application startup"""
+    """Initialize MongoDB connection and HTTP client on application startup"""
     await connect_to_mongodb()
+    await connect_http_client()
+    if INFERENCE_POOL:
+        # Models are loaded (and PRELOAD_MODELS warmed) inside the worker processes
+        inference_pool.start()
+    else:
+        model_registry.warm_up_from_env()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close MongoDB connection on application shutdown"""
+    """Close MongoDB connection and HTTP client on application shutdown"""
     await close_mongodb_connection()
+    await close_http_client()
+    inference_pool.stop()
 
 # Configure CORS
 app.add_middleware(
@@ -58,12 +77,27 @@ class SprayRequest(BaseModel):
     rainfall: float
     timeOfDay: str = ""
 
-# Load ML models
-yield_model = joblib.load("model/yield_model.pkl")
-time_model = joblib.load("model/best_window_model.pkl")
-fert_model = joblib.load("model/fert_model.pkl")
-stress_model = joblib.load("model/stress_model.pkl")
-crop_model = joblib.load("model/crop_model.pkl")
+class SweepAxis(BaseModel):
+    feature: str
+    min: float
+    max: float
+    steps: int = Field(50, ge=1, le=1000, description="Grid points along this feature")
+
+class SweepRequest(BaseModel):
+    model: str = Field(..., description="Registered model name, e.g. 'yield' or 'crop'")
+    base: Dict[str, Any] = Field(default_factory=dict, description="Inputs held fixed")
+    sweep: List[SweepAxis] = Field(..., min_length=1, max_length=2)
+    sampling: Literal["grid", "lhs"] = "grid"
+    samples: int = Field(500, ge=1, description="Latin hypercube sample size")
+    seed: Optional[int] = None
+
+class SoilBatchRequest(BaseModel):
+    latitudes: List[float]
+    longitudes: List[float]
+
+# ML models are loaded lazily, once per process, by model_registry, and
+# concurrent single-row predictions are micro-batched by inference_batcher
+# (and evaluated in worker processes by inference_pool when INFERENCE_POOL=1)
 
 # ====================
 # Main Application Routes
@@ -77,6 +111,32 @@ async def get_db_stats():
     stats = await get_database_stats()
     return stats
 
+@app.get("/api/weather/cache")
+def get_weather_cache_stats():
+    """Get hit/miss counters and occupancy of the in-memory and on-disk weather caches"""
+    # Plain def: the on-disk entry count is a blocking SQLite query, run in the threadpool
+    return {"memory": weather_cache.stats(), "disk": forecast_store.stats()}
+
+@app.get("/api/models/stats")
+async def get_model_stats():
+    """Get per-model load time and resident size, plus micro-batching, inference cache and worker pool counters"""
+    return {**model_registry.stats(), "batching": batcher_stats(), "cache": inference_cache_stats(),
+            "pool": inference_pool.stats()}
+
+@app.post("/api/models/{name}/reload")
+def reload_model(name: str):
+    """Re-read a model artifact from disk (e.g. after retraining); its cached results are dropped"""
+    try:
+        model_registry.reload(name)
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return model_registry.stats()["models"][name]
+
+@app.get("/api/weather/status")
+async def get_weather_provider_status():
+    """Get circuit breaker state and fresh/stale serving counters of the weather provider"""
+    return weather_fetcher.stats()
+
 # ====================
 # HTML Page Routes
 # ====================
@@ -98,8 +158,8 @@ async def predict_crop_manual(input_data: ManualCropInput):
     User provides all parameters manually through a form
     """
     try:
-        # Make prediction
-        crop, confidence = predict_crop(
+        # Make prediction (label, confidence and ranking from one predict_proba pass)
+        crop, confidence, ranking = await predict_crop_ranked_async(
             nitrogen=input_data.nitrogen,
             phosphorus=input_data.phosphorus,
             potassium=input_data.potassium,
@@ -107,14 +167,16 @@ async def predict_crop_manual(input_data: ManualCropInput):
             humidity=input_data.humidity,
             ph=input_data.ph,
             rainfall=input_data.rainfall,
-            ozone=input_data.ozone
+            ozone=input_data.ozone,
+            top_k=input_data.top_k
         )
         
         return CropPredictionResponse(
             success=True,
             crop=crop,
             confidence=confidence,
-            input_values=input_data.dict(),
+            ranking=ranking,
+            input_values=input_data.dict(exclude={"top_k"}),
             message="Crop recommendation generated successfully from manual input"
         )
     
@@ -122,7 +184,7 @@ async def predict_crop_manual(input_data: ManualCropInput):
         return CropPredictionResponse(
             success=False,
             crop="Unknown",
-            input_values=input_data.dict(),
+            input_values=input_data.dict(exclude={"top_k"}),
             message=f"Prediction failed: {str(e)}"
         )
 
@@ -158,8 +220,8 @@ async def predict_crop_location(input_data: LocationCropInput):
         rainfall = input_data.rainfall if input_data.rainfall is not None else location_data.get("rainfall", 100)
         ozone = input_data.ozone if input_data.ozone is not None else location_data.get("ozone", 30)
         
-        # Make prediction
-        crop, confidence = predict_crop(
+        # Make prediction (label, confidence and ranking from one predict_proba pass)
+        crop, confidence, ranking = await predict_crop_ranked_async(
             nitrogen=nitrogen,
             phosphorus=phosphorus,
             potassium=potassium,
@@ -167,13 +229,15 @@ async def predict_crop_location(input_data: LocationCropInput):
             humidity=humidity,
             ph=ph,
             rainfall=rainfall,
-            ozone=ozone
+            ozone=ozone,
+            top_k=input_data.top_k
         )
         
         return CropPredictionResponse(
             success=True,
             crop=crop,
             confidence=confidence,
+            ranking=ranking,
             input_values={
                 "latitude": input_data.latitude,
                 "longitude": input_data.longitude,
@@ -212,6 +276,19 @@ async def get_location_data(latitude: float, longitude: float):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch location data: {str(e)}")
 
+@app.post("/api/soil/batch")
+def get_soil_batch(request: SoilBatchRequest):
+    """
+    Soil values for many points as columns (raster where covered, regions
+    elsewhere), e.g. for map heatmaps
+    """
+    if len(request.latitudes) != len(request.longitudes):
+        raise HTTPException(status_code=400, detail="latitudes and longitudes must have the same length")
+    if len(request.latitudes) > SOIL_BATCH_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {SOIL_BATCH_MAX_POINTS} points per request")
+    columns = get_soil_data_batch(request.latitudes, request.longitudes)
+    return {"count": len(request.latitudes), **{name: values.tolist() for name, values in columns.items()}}
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -231,8 +308,7 @@ def predict_yield(lat: float, lon: float, ozone: float, soil: float):
         return JSONResponse({'result': None}, status_code=400)
     temp = weather['temp']
     rain = weather['rain']
-    features = pd.DataFrame([[ozone, temp, rain, soil]], columns=["ozone", "temp", "rain", "soil"])
-    prediction = yield_model.predict(features)[0]
+    prediction = predict_yield_value({"ozone": ozone, "temp": temp, "rain": rain, "soil": soil})
     return {"result": f"Predicted Potato Yield: {prediction:.2f} tonnes/hectare"}
 
 @app.get("/recommend_fertilizer")
@@ -242,36 +318,71 @@ def recommend_fertilizer_api(lat: float, lon: float, ozone: float, soil: float,
         return JSONResponse({'result': None}, status_code=400)
     temp = weather['temp']
     rain = weather['rain']
-    input_df = pd.DataFrame([{
+    input_data = {
         "ozone": ozone,
         "temp": temp,
         "rain": rain,
         "soil": soil,
         "ph": ph,
         "stage": stage
-    }])
-    result = recommend_fertilizer(input_df, fert_model)
+    }
+    result = recommend_fertilizer(input_data, batched_model("fertilizer"))
     return {"result": f"Recommended Fertilizer: {result}"}
 
 @app.get("/predict_stress")
 def predict_stress(lat: float, lon: float, ozone: float, temp: float, humidity: float, color: str, symptom: str):
-    input_df = pd.DataFrame([[ozone, temp, humidity, color, symptom]],
-                            columns=["ozone", "temp", "humidity", "color", "symptom"])
-    level, explanation = predict_stress_level(stress_model, input_df)
+    input_data = {"ozone": ozone, "temp": temp, "humidity": humidity, "color": color, "symptom": symptom}
+    level, explanation = predict_stress_level(batched_model("stress"), input_data)
     return {"result": f"Stress Level: {level}", "explanation": explanation}
 
 @app.get("/recommend_crop")
 def recommend_crop(N: float, P: float, K: float, temperature: float, humidity: float, ph: float, rainfall: float, ozone: float):
-    features = [[N, P, K, temperature, humidity, ph, rainfall, ozone]]
     try:
-        pred = crop_model.predict(features)[0]
-        known_crops = set(str(c) for c in crop_model.classes_)
-        if str(pred).strip().lower() in (c.strip().lower() for c in known_crops):
+        pred, _ = predict_crop(N, P, K, temperature, humidity, ph, rainfall, ozone)
+        if crop_class_index(batched_model("crop")).index_of(pred) is not None:
             return {"recommended_crop": pred}
         else:
             return {"recommended_crop": None, "message": "No preferred crop available for the given conditions."}
     except Exception as e:
         return {"recommended_crop": None, "message": f"Prediction error: {e}"}
+# ====================
+# Batch Prediction Endpoints
+# ====================
+# Each takes a JSON array of row objects or a columnar object of arrays
+# (up to BATCH_MAX_ROWS rows) and returns results in input order, with
+# {"error": ...} in place of rows that failed validation
+
+def run_batch(predict_batch, payload: Any):
+    try:
+        return predict_batch(payload)
+    except BatchInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/crop/recommend/batch")
+def api_recommend_crop_batch(payload: Any = Body(...)):
+    return run_batch(batch_predict.recommend_crop_batch, payload)
+
+@app.post("/api/yield/predict/batch")
+def api_predict_yield_batch(payload: Any = Body(...)):
+    return run_batch(batch_predict.predict_yield_batch, payload)
+
+@app.post("/recommend_fertilizer/batch")
+def recommend_fertilizer_batch(payload: Any = Body(...)):
+    return run_batch(batch_predict.recommend_fertilizer_batch, payload)
+
+@app.post("/predict_stress/batch")
+def predict_stress_batch(payload: Any = Body(...)):
+    return run_batch(batch_predict.predict_stress_batch, payload)
+
+@app.post("/api/sweep")
+def api_sweep(request: SweepRequest):
+    """Response surface of a model over one or two swept inputs, scored in one chunked pass"""
+    try:
+        return run_sweep(request.model, request.base, [axis.dict() for axis in request.sweep],
+                         request.sampling, request.samples, request.seed)
+    except SweepInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # API Endpoints for Frontend
 @app.get("/api/weather")
 def get_weather(lat: float, lon: float):
@@ -291,9 +402,8 @@ def api_recommend_crop(data: dict):
     rainfall = data.get('rainfall', 0)
     ozone = data.get('ozone', 0)
     
-    features = [[N, P, K, temperature, humidity, ph, rainfall, ozone]]
     try:
-        pred = crop_model.predict(features)[0]
+        pred, _ = predict_crop(N, P, K, temperature, humidity, ph, rainfall, ozone)
         return {"crop": pred}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction error: {str(e)}")
@@ -324,16 +434,9 @@ def api_predict_yield(data: dict):
         humidity = weather['humidity'] if humidity is None else humidity
         rain = weather['rain'] if rain is None else rain
     
-    # Prepare features for model
-    features = pd.DataFrame(
-        [[ozone, temp, rain, soil]], 
-        columns=["ozone", "temp", "rain", "soil"]
-    )
-    
     # Predict yield
     try:
-        prediction = yield_model.predict(features)[0]
-        yield_value = round(float(prediction), 2)
+        yield_value = round(predict_yield_value({"ozone": ozone, "temp": temp, "rain": rain, "soil": soil}), 2)
     except Exception as e:
         # Fallback calculation if model fails
         yield_value = round(float(area) * (30 + (temp * 0.5) + (rain * 0.3)), 2)
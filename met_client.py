@@ -0,0 +1,266 @@
+"""
+MET Norway Client Module
+Shared client for the MET locationforecast API that honours Expires and
+Last-Modified, and decodes only the forecast samples callers need
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+import http_client
+from singleflight import SingleFlight
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Load environment variables
+load_dotenv()
+
+# Client Configuration
+MET_URL = "https://api.met.no/weatherapi/locationforecast/2.0/compact"
+MET_CACHE_MAX_ENTRIES = int(os.getenv("MET_CACHE_MAX_ENTRIES", "512"))
+# Used when a response carries no usable Expires header
+MET_DEFAULT_TTL = int(os.getenv("MET_DEFAULT_TTL", "1800"))
+
+# Columns of the compact noon-sample array, in order
+NOON_COLUMNS = ("Temperature", "Humidity", "Rainfall", "Cloud Cover", "Wind Speed")
+
+
+class MetApiError(Exception):
+    """Raised when MET returns an error status"""
+
+
+def loads(content: bytes) -> Any:
+    """Decode JSON with orjson when installed, falling back to the stdlib"""
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Parse an HTTP date header to a Unix timestamp, None when missing or invalid"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_noon_samples(document: Dict[str, Any], days: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode the first 12:00 UTC entry of each day into a compact array
+
+    Only the hour digits of each timestamp are inspected, and the walk stops
+    as soon as `days` samples are found, so the rest of the ~9-day series is
+    never touched.
+
+    Returns:
+        Tuple of (dates as datetime64[D], float array of shape (n, 5) with
+        NOON_COLUMNS: temperature, humidity, rainfall over the next 6 hours,
+        cloud cover and wind speed in m/s)
+    """
+    dates = []
+    values = np.empty((days, len(NOON_COLUMNS)))
+    last_date = None
+
+    for entry in document["properties"]["timeseries"]:
+        timestamp = entry["time"]
+        if timestamp[11:13] != "12" or timestamp[:10] == last_date:
+            continue
+        last_date = timestamp[:10]
+        data = entry["data"]
+        details = data["instant"]["details"]
+        row = len(dates)
+        values[row] = (
+            details.get("air_temperature", 0),
+            details.get("relative_humidity", 0),
+            data.get("next_6_hours", {}).get("details", {}).get("precipitation_amount", 0.0),
+            details.get("cloud_area_fraction", 0),
+            details.get("wind_speed", 0),
+        )
+        dates.append(last_date)
+        if len(dates) == days:
+            break
+
+    return np.array(dates, dtype="datetime64[D]"), values[:len(dates)]
+
+
+def noon_rows(dates: np.ndarray, values: np.ndarray) -> List[Dict[str, Any]]:
+    """Expand a compact noon-sample array into the row dictionaries used by the risk model"""
+    return [
+        {"Date": str(date), **dict(zip(NOON_COLUMNS, row))}
+        for date, row in zip(dates, values.tolist())
+    ]
+
+
+class MetForecast:
+    """One cached locationforecast document with its validity headers"""
+
+    __slots__ = ("document", "last_modified", "expires", "_noon")
+
+    def __init__(self, document: Dict[str, Any], last_modified: Optional[str], expires: float):
+        self.document = document
+        self.last_modified = last_modified
+        self.expires = expires
+        self._noon: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def noon_samples(self, days: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+        """Noon-sample array for this document, decoded once per `days`"""
+        if days not in self._noon:
+            self._noon[days] = extract_noon_samples(self.document, days)
+        return self._noon[days]
+
+
+class MetClient:
+    """
+    Conditional-request client for MET Norway locationforecast 2.0
+
+    MET's terms require clients to cache responses until their Expires time
+    and to revalidate with If-Modified-Since afterwards. Documents are cached
+    per location (rounded to MET's 4 decimals) in a bounded LRU. Within
+    Expires no request is made at all; after it, a 304 Not Modified renews
+    the cached document without downloading or parsing it again. Documents
+    served without Last-Modified are re-downloaded rather than revalidated.
+    Concurrent requests for the same location share one upstream call.
+    """
+
+    def __init__(self, url: str = MET_URL, max_entries: int = MET_CACHE_MAX_ENTRIES):
+        self.url = url
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[float, float], MetForecast]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.cache_hits = 0
+        self.not_modified = 0
+        self.downloads = 0
+
+    @staticmethod
+    def _location(latitude: float, longitude: float) -> Tuple[float, float]:
+        # MET asks clients not to send more than 4 decimals
+        return round(latitude, 4), round(longitude, 4)
+
+    def _cached(self, location: Tuple[float, float]) -> Optional[MetForecast]:
+        with self._lock:
+            forecast = self._entries.get(location)
+            if forecast is not None:
+                self._entries.move_to_end(location)
+            return forecast
+
+    def _store(self, location: Tuple[float, float], forecast: MetForecast):
+        with self._lock:
+            self._entries[location] = forecast
+            self._entries.move_to_end(location)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _request(self, location: Tuple[float, float]) -> Tuple[Dict[str, Any], Dict[str, str], Optional[MetForecast]]:
+        """
+        Query parameters and headers for a location, plus the cached document
+        being revalidated (None when the request is unconditional)
+        """
+        params = {"lat": location[0], "lon": location[1]}
+        cached = self._cached(location)
+        # Only revalidate against a date the server sent us
+        if cached is None or not cached.last_modified:
+            return params, {}, None
+        return params, {"If-Modified-Since": cached.last_modified}, cached
+
+    def _handle(self, location: Tuple[float, float], response, cached: Optional[MetForecast]) -> MetForecast:
+        expires = parse_http_date(response.headers.get("Expires")) or time.time() + MET_DEFAULT_TTL
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            cached.expires = expires
+            # The entry may have been evicted while the request was in flight
+            self._store(location, cached)
+            return cached
+        if response.status_code not in (200, 203):
+            raise MetApiError(f"MET API Error: {response.status_code} - {response.text}")
+        self.downloads += 1
+        forecast = MetForecast(loads(response.content), response.headers.get("Last-Modified"), expires)
+        self._store(location, forecast)
+        return forecast
+
+    def get_forecast(self, latitude: float, longitude: float) -> MetForecast:
+        """
+        Get the forecast document for a location, revalidating only once it has expired
+
+        Raises:
+            MetApiError: If MET responds with an error status
+        """
+        location = self._location(latitude, longitude)
+        cached = self._cached(location)
+        if cached is not None and time.time() < cached.expires:
+            self.cache_hits += 1
+            return cached
+
+        def load() -> MetForecast:
+            params, headers, cached = self._request(location)
+            response = http_client.get_sync(self.url, params=params, headers=headers)
+            if response.status_code == 304 and cached is None:
+                # Nothing to renew: fetch the document in full
+                response = http_client.get_sync(self.url, params=params)
+            return self._handle(location, response, cached)
+
+        return self.flights.do(("met", location), load)
+
+    async def get_forecast_async(self, latitude: float, longitude: float) -> MetForecast:
+        """
+        Async counterpart of get_forecast()
+        """
+        location = self._location(latitude, longitude)
+        cached = self._cached(location)
+        if cached is not None and time.time() < cached.expires:
+            self.cache_hits += 1
+            return cached
+
+        async def load() -> MetForecast:
+            params, headers, cached = self._request(location)
+            response = await http_client.get(self.url, params=params, headers=headers)
+            if response.status_code == 304 and cached is None:
+                response = await http_client.get(self.url, params=params)
+            return self._handle(location, response, cached)
+
+        return await self.flights.do_async(("met", location), load)
+
+    def noon_samples(self, latitude: float, longitude: float, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Daily 12:00 UTC samples for the disease risk model
+
+        Returns:
+            List of dictionaries with Date, Temperature, Humidity, Rainfall
+            (next 6 hours), Cloud Cover and Wind Speed (m/s)
+        """
+        return noon_rows(*self.get_forecast(latitude, longitude).noon_samples(days))
+
+    async def noon_samples_async(self, latitude: float, longitude: float, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of noon_samples()
+        """
+        forecast = await self.get_forecast_async(latitude, longitude)
+        return noon_rows(*forecast.noon_samples(days))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "cache_hits": self.cache_hits,
+            "not_modified": self.not_modified,
+            "downloads": self.downloads,
+            "json_parser": "orjson" if orjson is not None else "json",
+            "single_flight": self.flights.stats(),
+        }
+
+
+# Shared client used by every MET consumer in the process
+met_client = MetClient()
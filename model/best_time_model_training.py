@@ -3,8 +3,14 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 import joblib
+import sys
 import os
 
+# Add the parent directory to sys.path to share the project-wide forest compiler
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forest_compiler import export_compiled
+
 # Simulate training data for spray timing
 np.random.seed(42)
 n = 500
@@ -29,4 +35,6 @@ model.fit(X, y)
 # Save model
 os.makedirs("model", exist_ok=True)
 joblib.dump(model, "model/time_model.pkl")
+# Memory-mappable compiled copy, loaded by model_registry instead of the pickle
+export_compiled(model, "model/time_model.pkl")
 print("✅ Fertilizer timing model trained and saved.")
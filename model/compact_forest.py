@@ -0,0 +1,218 @@
+"""
+Forest Compaction Tool
+Evaluates smaller variants of a trained forest (fewer trees, shallower trees,
+narrower dtypes) and reports accuracy, artifact size, load time and latency
+for each, so the serving variant is picked deliberately
+
+Usage (from the project root):
+    python model/compact_forest.py crop
+    python model/compact_forest.py yield --trees 100,50,25 --depth none,12,8 --precision float64,float32
+    python model/compact_forest.py crop --write 50,12,float32
+    python model/compact_forest.py stress --data held_out.csv --target stress
+
+--write saves the chosen variant as the model's compiled artifact
+(model/<name>.forest/), which model_registry then memory-maps instead of
+the full forest. Re-export the full forest with
+python model_registry.py export <name>.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path to resolve 'data', forest_compiler and model_registry imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data.sample_data import generate_data
+from forest_compiler import CompiledForest, compiled_path, source_identity
+from model_registry import model_registry
+
+# Threshold and leaf-value dtypes per precision setting (None keeps float64)
+PRECISIONS = {
+    "float64": (None, None),
+    "float32": (np.float32, np.float32),
+    "float16": (np.float32, np.float16),
+}
+
+BATCH_ROWS = 256
+
+
+def evaluation_set(name, model, data_path=None, target=None):
+    """
+    Rows to score variants on, in the model's feature order, and labels if known
+
+    Built-in sets mirror the training data of each script: data/crop.csv
+    for crop, the synthetic generators for yield and fertilizer. These are
+    (or resemble) training data, so pass --data with held-out rows for an
+    unbiased accuracy figure.
+    """
+    features = list(model.feature_names_in_)
+    if data_path:
+        df = pd.read_csv(data_path)
+        return df[features], (df[target].to_numpy() if target else None)
+    rng = np.random.default_rng(0)
+    if name == "crop":
+        df = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'data', 'crop.csv'))
+        return df[features], df["label"].to_numpy()
+    if name == "yield":
+        np.random.seed(0)
+        df = generate_data(2000)
+        return df[features], df["yield"].to_numpy()
+    if name == "fertilizer":
+        n = 2000
+        df = pd.DataFrame({
+            "ozone": rng.uniform(30, 100, n),
+            "temp": rng.uniform(15, 35, n),
+            "soil": rng.uniform(0.2, 0.5, n),
+            "rain": rng.uniform(0, 100, n),
+            "humidity": rng.uniform(20, 90, n),
+        })
+        return df[features], None
+    raise SystemExit(f"No built-in evaluation data for '{name}'; pass --data (and --target)")
+
+
+def score(forest, X, y, reference):
+    """Accuracy/R² against labels and agreement/MAE against the full forest"""
+    prediction = forest.predict(X)
+    if forest.is_classifier:
+        result = {"agreement": float(np.mean(prediction == reference))}
+        if y is not None:
+            result["accuracy"] = float(np.mean(prediction == y))
+        return result
+    result = {"mae_vs_full": float(np.mean(np.abs(prediction - reference)))}
+    if y is not None:
+        result["r2"] = float(1 - np.sum((y - prediction) ** 2) / np.sum((y - np.mean(y)) ** 2))
+    return result
+
+
+def artifact_stats(forest, repeats=5):
+    """On-disk size of the saved variant and the median time to read it fully"""
+    directory = tempfile.mkdtemp(prefix="forest-")
+    try:
+        forest.save(os.path.join(directory, "variant"))
+        path = os.path.join(directory, "variant")
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            CompiledForest.load(path, mmap_mode=None)
+            timings.append(time.perf_counter() - started)
+        return size, float(np.median(timings))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def latency(forest, X, single_calls=500, batch_calls=50):
+    """p50/p99 latency in ms of single-row calls and BATCH_ROWS-row calls"""
+    rng = np.random.default_rng(1)
+    rows = X[rng.integers(0, len(X), single_calls)]
+    batch = X[rng.integers(0, len(X), BATCH_ROWS)]
+    forest.predict(rows[:1])
+
+    def timed(calls):
+        timings = []
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return np.percentile(timings, 50), np.percentile(timings, 99)
+
+    single = timed([lambda row=row: forest.predict(row.reshape(1, -1)) for row in rows])
+    batched = timed([lambda: forest.predict(batch)] * batch_calls)
+    return single + batched
+
+
+def markdown_table(frame):
+    def cell(value):
+        return f"{value:.4g}" if isinstance(value, float) else str(value)
+    lines = ["| " + " | ".join(frame.columns) + " |", "|" + "---|" * len(frame.columns)]
+    lines += ["| " + " | ".join(cell(v) for v in row) + " |" for row in frame.itertuples(index=False)]
+    return "\n".join(lines) + "\n"
+
+
+def parse_list(text, cast):
+    return [None if item.strip().lower() == "none" else cast(item) for item in text.split(",")]
+
+
+def variant_label(n_trees, depth, precision):
+    return f"{n_trees} trees, depth {depth if depth is not None else 'full'}, {precision}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate and write compacted forest variants")
+    parser.add_argument("model", help="Registered model name (crop, yield, fertilizer, stress, time)")
+    parser.add_argument("--trees", default="100,50,25", help="Comma-separated tree counts")
+    parser.add_argument("--depth", default="none,16,12,8", help="Comma-separated depth limits ('none' = full)")
+    parser.add_argument("--precision", default="float64,float32,float16", help=f"Any of {', '.join(PRECISIONS)}")
+    parser.add_argument("--data", help="CSV of evaluation rows (defaults to a built-in set)")
+    parser.add_argument("--target", help="Label column in --data")
+    parser.add_argument("--report", help="Markdown report path (default: model/<name>_compaction.md)")
+    parser.add_argument("--write", metavar="TREES,DEPTH,PRECISION",
+                        help="Save this variant as the model's serving artifact")
+    args = parser.parse_args()
+
+    model_path = model_registry.path(args.model)
+    model = joblib.load(model_path)
+    full = CompiledForest.from_estimator(model)
+    frame, y = evaluation_set(args.model, model, args.data, args.target)
+    X = frame.to_numpy(dtype=np.float64)
+    reference = full.predict(X)
+
+    if args.write:
+        n_trees, depth, precision = args.write.split(",")
+        depth = None if depth.lower() == "none" else int(depth)
+        threshold_dtype, value_dtype = PRECISIONS[precision]
+        variant = full.compact(int(n_trees), depth, threshold_dtype, value_dtype)
+        directory = compiled_path(model_path)
+        variant.save(directory, source=source_identity(model_path),
+                     variant={"n_trees": int(n_trees), "max_depth": depth, "precision": precision})
+        print(f"✅ Wrote {variant_label(int(n_trees), depth, precision)} to {directory}: {score(variant, X, y, reference)}")
+        return
+
+    baseline = score(full, X, y, reference)
+    metric = "accuracy" if full.is_classifier else "r2"
+    rows = []
+    for n_trees in parse_list(args.trees, int):
+        for depth in parse_list(args.depth, int):
+            for precision in args.precision.split(","):
+                threshold_dtype, value_dtype = PRECISIONS[precision]
+                variant = full.compact(n_trees, depth, threshold_dtype, value_dtype)
+                scores = score(variant, X, y, reference)
+                size, load_seconds = artifact_stats(variant)
+                single_p50, single_p99, batch_p50, batch_p99 = latency(variant, X)
+                rows.append({
+                    "trees": variant.n_trees,
+                    "depth": depth if depth is not None else "full",
+                    "precision": precision,
+                    **scores,
+                    f"{metric}_delta": scores[metric] - baseline[metric] if metric in scores else None,
+                    "size_kb": size / 1024,
+                    "load_ms": load_seconds * 1000,
+                    "single_p50_ms": single_p50,
+                    "single_p99_ms": single_p99,
+                    f"batch{BATCH_ROWS}_p50_ms": batch_p50,
+                    f"batch{BATCH_ROWS}_p99_ms": batch_p99,
+                })
+                print(f"  {variant_label(variant.n_trees, depth, precision)}: {scores}")
+
+    report = pd.DataFrame(rows)
+    report_path = args.report or os.path.splitext(model_path)[0] + "_compaction.md"
+    with open(report_path, "w") as f:
+        f.write(f"# Compaction report: {args.model} ({os.path.basename(model_path)})\n\n")
+        f.write(f"Evaluated on {len(X)} rows ({args.data or 'built-in set'}); "
+                f"baseline {baseline}. load_ms is a full read of the saved arrays; "
+                f"latencies are CompiledForest.predict on one core.\n\n")
+        f.write(markdown_table(report))
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    print(f"✅ Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,13 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+import sys
+import os
+
+# Add the parent directory to sys.path to share the project-wide forest compiler
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forest_compiler import export_compiled
 
 # Generate dummy data
 np.random.seed(42)
@@ -29,4 +36,7 @@ model.fit(X, y)
 # Save model
 joblib.dump(model, "model/fert_model.pkl")
 joblib.dump(model, "model/fertilizer_model.pkl")  # Save with both names for compatibility
+# Memory-mappable compiled copies, loaded by model_registry instead of the pickles
+export_compiled(model, "model/fert_model.pkl")
+export_compiled(model, "model/fertilizer_model.pkl")
 print("✅ Fertilizer model trained and saved as model/fert_model.pkl")
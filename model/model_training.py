@@ -7,10 +7,11 @@ import joblib
 import sys
 import os
 
-# Add the parent directory to sys.path to resolve 'data' import
+# Add the parent directory to sys.path to resolve 'data' and forest_compiler imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from data.sample_data import generate_data
+from forest_compiler import export_compiled
 
 # Generate synthetic data for potato crops
 df = generate_data(300)
@@ -26,4 +27,6 @@ model.fit(X_train, y_train)
 
 # Save model
 joblib.dump(model, "model/yield_model.pkl")
+# Memory-mappable compiled copy, loaded by model_registry instead of the pickle
+export_compiled(model, "model/yield_model.pkl")
 print("✅ Potato yield model trained and saved to model/yield_model.pkl")
@@ -4,6 +4,13 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 import joblib
+import sys
+import os
+
+# Add the parent directory to sys.path to share the project-wide forest compiler
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forest_compiler import export_compiled
 
 # Sample synthetic data
 data = {
@@ -30,4 +37,6 @@ model = RandomForestClassifier(random_state=42)
 model.fit(X_train, y_train)
 
 joblib.dump(model, "model/stress_model.pkl")
+# Memory-mappable compiled copy, loaded by model_registry instead of the pickle
+export_compiled(model, "model/stress_model.pkl")
 print("✅ Crop stress model trained and saved as model/stress_model.pkl")
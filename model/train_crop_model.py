@@ -1,8 +1,14 @@
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+import sys
 import os
 
+# Add the parent directory to sys.path to share the project-wide forest compiler
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forest_compiler import export_compiled
+
 # Load the crop dataset
 base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 crop_df = pd.read_csv(os.path.join(base_path, 'data', 'crop.csv'))
@@ -28,5 +34,7 @@ model.fit(X, y)
 # Save the model
 model_path = os.path.join(base_path, 'model', 'crop_model.pkl')
 joblib.dump(model, model_path)
+# Memory-mappable compiled copy, loaded by model_registry instead of the pickle
+export_compiled(model, model_path)
 
 print('Crop recommendation model trained and saved as crop_model.pkl')
@@ -0,0 +1,292 @@
+"""
+Model Registry Module
+Loads each joblib artifact once per process, on first use or at an
+explicit warm-up, and shares it across every module that needs it
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import joblib
+from dotenv import load_dotenv
+
+from forest_compiler import (CompiledForest, compile_forest, compiled_path, export_compiled,
+                             file_digest, fresh_compiled_meta)
+from singleflight import SingleFlight
+
+# Load environment variables
+load_dotenv()
+
+# Registry Configuration
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model"))
+# Comma-separated model names to load at startup, "all", or empty for fully lazy loading
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "")
+# Memory-map up-to-date compiled artifacts (model/<name>.forest/) instead of unpickling
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+
+DEFAULT_MODELS = {
+    "crop": "crop_model.pkl",
+    "yield": "yield_model.pkl",
+    "time": "best_window_model.pkl",
+    "fertilizer": "fert_model.pkl",
+    "stress": "stress_model.pkl",
+}
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of lazily loaded model artifacts
+
+    Names map to file paths. Artifacts are deduplicated by real path and by
+    content digest, so two names or two byte-identical files (e.g.
+    fert_model.pkl and fertilizer_model.pkl) share one in-memory object.
+    Concurrent first uses share one load. Each load records its wall time
+    and the resident memory it added.
+
+    When a pickle has an up-to-date compiled artifact next to it (written by
+    export() or the training scripts), the forest arrays are memory-mapped
+    read-only instead of unpickled: loading is near-instant and every
+    worker process on the node shares one page-cache copy. get() then
+    returns the CompiledForest, which stands in for the estimator.
+
+    Every name has a generation that increases whenever the model behind it
+    may have changed (reload() or re-registration), so anything derived
+    from a model's outputs can tell when it is out of date.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, models: Optional[Dict[str, str]] = None):
+        self.model_dir = model_dir
+        self._paths: Dict[str, str] = {}
+        self._artifacts: Dict[str, Dict[str, Any]] = {}
+        self._by_path: Dict[str, str] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+        for name, filename in (DEFAULT_MODELS if models is None else models).items():
+            self.register(name, filename)
+
+    def register(self, name: str, path: str):
+        """Register a model name; relative paths are resolved against model_dir"""
+        if not os.path.isabs(path):
+            path = os.path.join(self.model_dir, path)
+        path = os.path.realpath(path)
+        with self._lock:
+            if self._paths.get(name) != path:
+                self._generations[name] = self._generations.get(name, -1) + 1
+            self._paths[name] = path
+
+    def path(self, name: str) -> str:
+        if name not in self._paths:
+            raise KeyError(f"Unknown model '{name}'. Registered: {', '.join(self._paths)}")
+        return self._paths[name]
+
+    def available(self, name: str) -> bool:
+        """Whether the artifact for a name exists on disk"""
+        return name in self._paths and os.path.exists(self._paths[name])
+
+    def is_loaded(self, name: str) -> bool:
+        return self._by_path.get(self._paths.get(name)) is not None
+
+    def generation(self, name: str) -> int:
+        """Counter that changes whenever the model behind a name may have changed"""
+        return self._generations.get(name, 0)
+
+    def _load(self, path: str) -> Dict[str, Any]:
+        meta = fresh_compiled_meta(path) if MODEL_MMAP else None
+        digest = meta["source"]["digest"] if meta else file_digest(path)
+        with self._lock:
+            for artifact in self._artifacts.values():
+                if artifact["digest"] == digest:
+                    self._by_path[path] = digest
+                    return artifact
+
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        model = None
+        if meta:
+            try:
+                model = CompiledForest.load(compiled_path(path))
+            except (OSError, ValueError, KeyError) as e:
+                # E.g. replaced by a concurrent export; the pickle is always authoritative
+                print(f"⚠️ Could not memory-map {os.path.basename(compiled_path(path))}: {e}")
+                meta = None
+        if model is None:
+            model = joblib.load(path)
+        load_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        artifact = {
+            "model": model,
+            "digest": digest,
+            "path": path,
+            "mmap": meta is not None,
+            # Compaction settings when a compacted variant is being served (model/compact_forest.py)
+            "variant": meta.get("variant") if meta else None,
+            "file_bytes": os.path.getsize(path),
+            "load_seconds": load_seconds,
+            "rss_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        }
+        if meta:
+            artifact["compiled"] = model
+            artifact["compile_seconds"] = 0.0
+        with self._lock:
+            self._artifacts[digest] = artifact
+            self._by_path[path] = digest
+        source = "memory-mapped" if meta else "unpickled"
+        print(f"✅ Loaded model {os.path.basename(path)} ({source}) in {load_seconds * 1000:.0f}ms")
+        return artifact
+
+    def _artifact(self, name: str) -> Dict[str, Any]:
+        path = self.path(name)
+        artifact = self._artifacts.get(self._by_path.get(path))
+        if artifact is None:
+            artifact = self.flights.do(path, lambda: self._load(path))
+        return artifact
+
+    def get(self, name: str) -> Any:
+        """
+        Get a model by name, loading it on first use
+
+        Raises:
+            KeyError: If the name is not registered
+            FileNotFoundError: If the artifact does not exist
+        """
+        return self._artifact(name)["model"]
+
+    def get_compiled(self, name: str) -> Any:
+        """
+        Get the array-backed CompiledForest for a model, compiling it on first use
+
+        Falls back to the original estimator when it cannot be compiled.
+        """
+        artifact = self._artifact(name)
+        compiled = artifact.get("compiled")
+        if compiled is None:
+            started = time.perf_counter()
+            compiled = compile_forest(artifact["model"])
+            with self._lock:
+                artifact["compiled"] = compiled
+                artifact["compile_seconds"] = time.perf_counter() - started
+        return compiled
+
+    def reload(self, name: str) -> Any:
+        """
+        Re-read a model's artifact from disk, e.g. after retraining
+
+        Names sharing the artifact's path are reloaded with it. When the
+        file content changed, their generations are bumped and the old
+        artifact is dropped once nothing references it.
+
+        Raises:
+            KeyError: If the name is not registered
+            FileNotFoundError: If the artifact does not exist
+        """
+        path = self.path(name)
+        with self._lock:
+            previous = self._by_path.pop(path, None)
+        try:
+            artifact = self.flights.do(path, lambda: self._load(path))
+        except Exception:
+            # Keep serving the model already in memory
+            with self._lock:
+                if previous is not None:
+                    self._by_path.setdefault(path, previous)
+            raise
+        if artifact["digest"] != previous:
+            with self._lock:
+                for other, other_path in self._paths.items():
+                    if other_path == path:
+                        self._generations[other] = self._generations.get(other, 0) + 1
+                if previous is not None and previous not in self._by_path.values():
+                    self._artifacts.pop(previous, None)
+        return artifact["model"]
+
+    def export(self, names: Optional[Iterable[str]] = None):
+        """
+        Write memory-mappable compiled artifacts next to the registered pickles
+
+        Each distinct pickle is unpickled once and saved with
+        forest_compiler.export_compiled(). Models that are not tree
+        ensembles are reported and skipped.
+        """
+        for path in dict.fromkeys(self.path(n) for n in (list(self._paths) if names is None else names)):
+            if not os.path.exists(path):
+                print(f"⚠️ Skipping {os.path.basename(path)}: file not found")
+                continue
+            directory = export_compiled(joblib.load(path), path)
+            if directory is None:
+                print(f"⚠️ Skipping {os.path.basename(path)}: not a compilable forest")
+            else:
+                print(f"✅ Exported {os.path.basename(path)} to {os.path.basename(directory)}/")
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        """
+        Load and compile models ahead of the first request
+
+        Args:
+            names: Model names to load; defaults to every registered model.
+                Missing artifacts are reported and skipped.
+        """
+        for name in (list(self._paths) if names is None else names):
+            try:
+                self.get_compiled(name)
+            except Exception as e:
+                print(f"❌ Error loading model '{name}': {e}")
+
+    def warm_up_from_env(self, spec: str = PRELOAD_MODELS):
+        """Warm up the models named in PRELOAD_MODELS ("all" for every model)"""
+        spec = spec.strip()
+        if not spec:
+            return
+        self.warm_up(None if spec == "all" else [n.strip() for n in spec.split(",") if n.strip()])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-model load time and memory, plus process totals"""
+        with self._lock:
+            models = {}
+            for name, path in self._paths.items():
+                artifact = self._artifacts.get(self._by_path.get(path))
+                models[name] = {
+                    "path": path,
+                    "loaded": artifact is not None,
+                    "shared_with": sorted(n for n, p in self._paths.items()
+                                          if n != name and artifact is not None
+                                          and self._by_path.get(p) == artifact["digest"]),
+                    "file_bytes": artifact["file_bytes"] if artifact else None,
+                    "load_seconds": round(artifact["load_seconds"], 4) if artifact else None,
+                    "rss_bytes": artifact["rss_bytes"] if artifact else None,
+                    "compiled": isinstance(artifact.get("compiled"), CompiledForest) if artifact else False,
+                    "mmap": artifact["mmap"] if artifact else False,
+                    "variant": artifact["variant"] if artifact else None,
+                    "generation": self._generations.get(name, 0),
+                }
+            return {
+                "models": models,
+                "artifacts_loaded": len(self._artifacts),
+                "total_load_seconds": round(sum(a["load_seconds"] for a in self._artifacts.values()), 4),
+                "process_rss_bytes": _rss_bytes(),
+            }
+
+
+# Shared registry used by every app and service in the process
+model_registry = ModelRegistry()
+
+
+if __name__ == "__main__":
+    # python model_registry.py export [name ...]: write compiled artifacts for existing pickles
+    if sys.argv[1:2] != ["export"]:
+        print("Usage: python model_registry.py export [model_name ...]")
+        sys.exit(1)
+    model_registry.export(sys.argv[2:] or None)
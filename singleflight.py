@@ -0,0 +1,127 @@
+"""
+Single-Flight Module
+Coalesces concurrent identical calls so that only one upstream request
+is in flight per key; every concurrent caller receives its result
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key across threads and coroutines
+
+    In-flight calls are tracked as concurrent.futures.Future objects, so a
+    threadpool route and an async route asking for the same key share one
+    call: threads block on Future.result(), coroutines await it through
+    asyncio.wrap_future() without blocking the event loop.
+
+    The blocking do() must not be called from the event loop thread itself.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether the caller leads it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            # Running futures cannot be cancelled, so one follower giving up
+            # (asyncio.wrap_future cancels pending futures) never affects the others
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _resolve(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument callable performing the upstream call
+
+        Returns:
+            Result of the shared call (exceptions are shared too)
+        """
+        future, leader = self._claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._resolve(key, future, error=e)
+            raise
+        self._resolve(key, future, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of do() for coroutine functions
+
+        The call runs in a task of its own, so it completes (and its result
+        is shared) even when the caller that started it is cancelled.
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine function performing the upstream call
+
+        Returns:
+            Result of the shared call (exceptions are shared too)
+        """
+        future, leader = self._claim(key)
+        if leader:
+            # The shared call runs as its own task, so cancelling whichever
+            # caller started it leaves the call running for everyone else
+            task = asyncio.get_running_loop().create_task(fn())
+            self._tasks.add(task)
+            task.add_done_callback(lambda done: self._finish(key, future, done))
+        waiter = asyncio.wrap_future(future)
+        # Mark a shared error as retrieved even when every caller gave up on it
+        waiter.add_done_callback(lambda w: w.cancelled() or w.exception())
+        # Shielded so a cancelled caller only cancels its own wait
+        return await asyncio.shield(waiter)
+
+    def _finish(self, key: Hashable, future: Future, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            # Only happens when the task itself is cancelled, e.g. at loop shutdown
+            self._resolve(key, future, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._resolve(key, future, error=task.exception())
+        else:
+            self._resolve(key, future, task.result())
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Get leader/coalesced counters"""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
@@ -0,0 +1,235 @@
+"""
+Soil Raster Module
+Gridded soil dataset (N, P, K, pH and ozone bands at a fixed resolution)
+memory-mapped from disk and sampled with vectorized bilinear interpolation
+
+Build a raster from a CSV of grid points (e.g. a SoilGrids export):
+    python soil_raster.py build soil_points.csv data/soil_raster --resolution 0.1
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from soil_regions import SOIL_FIELDS
+
+# Load environment variables
+load_dotenv()
+
+# Raster Configuration
+SOIL_RASTER_PATH = os.getenv(
+    "SOIL_RASTER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "soil_raster")
+)
+# Most points accepted by one batch soil query (e.g. a map heatmap)
+SOIL_BATCH_MAX_POINTS = int(os.getenv("SOIL_BATCH_MAX_POINTS", "50000"))
+
+RASTER_FORMAT = 1
+BANDS_FILE = "bands.npy"
+META_FILE = "meta.json"
+
+
+class SoilRasterError(ValueError):
+    """Raised when a raster directory is missing pieces or inconsistent"""
+
+
+def write_raster(directory: str, bands: Dict[str, np.ndarray], min_lat: float, min_lon: float,
+                 resolution: float):
+    """
+    Save a soil raster as a (rows, cols, bands) float32 array plus metadata
+
+    Node (i, j) holds the values at (min_lat + i * resolution,
+    min_lon + j * resolution); NaN marks nodes without data. Bands are
+    interleaved per node so one lookup touches one or two pages. Written to
+    a staging directory and renamed into place, so readers never see a
+    partial raster.
+
+    Args:
+        directory: Output directory
+        bands: Equal-shape (rows, cols) arrays for every field in SOIL_FIELDS
+        min_lat: Latitude of row 0
+        min_lon: Longitude of column 0
+        resolution: Node spacing in degrees
+    """
+    missing = [field for field in SOIL_FIELDS if field not in bands]
+    if missing:
+        raise SoilRasterError(f"Missing bands: {', '.join(missing)}")
+    data = np.stack([np.asarray(bands[field], dtype=np.float32) for field in SOIL_FIELDS], axis=-1)
+    staging = directory.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, BANDS_FILE), data)
+    with open(os.path.join(staging, META_FILE), "w") as f:
+        json.dump({
+            "format": RASTER_FORMAT,
+            "bands": list(SOIL_FIELDS),
+            "min_lat": float(min_lat),
+            "min_lon": float(min_lon),
+            "resolution": float(resolution),
+            "rows": int(data.shape[0]),
+            "cols": int(data.shape[1]),
+        }, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+
+
+class SoilRaster:
+    """
+    Read-only soil raster backed by a memory-mapped array
+
+    Only the pages around the queried nodes are read, so a worker never
+    holds the whole grid in RAM and all workers on a host share the page
+    cache. A point is covered when it lies inside the grid and all four
+    surrounding nodes have data; its values are then bilinearly
+    interpolated between them.
+    """
+
+    def __init__(self, data: np.ndarray, min_lat: float, min_lon: float, resolution: float):
+        if data.ndim != 3 or data.shape[2] != len(SOIL_FIELDS) or min(data.shape[:2]) < 2:
+            raise SoilRasterError(f"Expected a (rows >= 2, cols >= 2, {len(SOIL_FIELDS)}) array, got {data.shape}")
+        self.data = data
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.resolution = resolution
+        self.rows, self.cols = data.shape[:2]
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "SoilRaster":
+        """
+        Open a raster written by write_raster()
+
+        Raises:
+            OSError: If the files are missing
+            SoilRasterError: If the metadata does not match this reader or the data
+        """
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("format") != RASTER_FORMAT or meta.get("bands") != list(SOIL_FIELDS):
+            raise SoilRasterError(f"Unsupported raster format or bands in {directory}")
+        data = np.load(os.path.join(directory, BANDS_FILE), mmap_mode=mmap_mode)
+        if data.shape[:2] != (meta["rows"], meta["cols"]):
+            raise SoilRasterError(f"Raster shape {data.shape} does not match its metadata")
+        return cls(data, meta["min_lat"], meta["min_lon"], meta["resolution"])
+
+    @property
+    def bounds(self) -> Dict[str, float]:
+        return {
+            "min_lat": self.min_lat,
+            "max_lat": self.min_lat + (self.rows - 1) * self.resolution,
+            "min_lon": self.min_lon,
+            "max_lon": self.min_lon + (self.cols - 1) * self.resolution,
+        }
+
+    def sample(self, lats: Any, lons: Any) -> Dict[str, np.ndarray]:
+        """
+        Bilinearly interpolated soil values for many points
+
+        Args:
+            lats: Latitudes (scalar or array)
+            lons: Longitudes, same shape as lats
+
+        Returns:
+            {"covered": bool array, "nitrogen": ..., ...} with the shape of
+            the inputs; values are NaN where a point is not covered
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        shape = lats.shape
+        y = (lats.ravel() - self.min_lat) / self.resolution
+        x = (lons.ravel() - self.min_lon) / self.resolution
+        inside = (y >= 0) & (y <= self.rows - 1) & (x >= 0) & (x <= self.cols - 1)
+
+        values = np.full((len(y), len(SOIL_FIELDS)), np.nan)
+        rows = np.flatnonzero(inside)
+        if len(rows):
+            # The last row/column interpolates from the cell below/left of it
+            i0 = np.minimum(np.floor(y[rows]).astype(np.intp), self.rows - 2)
+            j0 = np.minimum(np.floor(x[rows]).astype(np.intp), self.cols - 2)
+            ty = (y[rows] - i0)[:, None]
+            tx = (x[rows] - j0)[:, None]
+            # Fancy indexing on the memmap reads only these nodes
+            v00 = self.data[i0, j0].astype(np.float64)
+            v01 = self.data[i0, j0 + 1].astype(np.float64)
+            v10 = self.data[i0 + 1, j0].astype(np.float64)
+            v11 = self.data[i0 + 1, j0 + 1].astype(np.float64)
+            values[rows] = (v00 * (1 - ty) * (1 - tx) + v01 * (1 - ty) * tx
+                            + v10 * ty * (1 - tx) + v11 * ty * tx)
+
+        covered = ~np.isnan(values).any(axis=1)
+        values[~covered] = np.nan
+        columns = {"covered": covered.reshape(shape)}
+        for i, field in enumerate(SOIL_FIELDS):
+            columns[field] = values[:, i].reshape(shape)
+        return columns
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[Dict[str, float]]:
+        """Soil values for one point in the shape of get_soil_data_by_region, None where not covered"""
+        sampled = self.sample(latitude, longitude)
+        if not sampled["covered"]:
+            return None
+        return {field: round(float(sampled[field]), 2) for field in SOIL_FIELDS}
+
+
+def build_from_points(frame: pd.DataFrame, resolution: float) -> Dict[str, Any]:
+    """
+    Place grid point rows (lat, lon and soil field columns) onto nodes
+
+    Points are snapped to the nearest node; nodes without a point are NaN.
+
+    Returns:
+        Keyword arguments for write_raster() other than the directory
+    """
+    i = np.rint((frame["lat"].to_numpy() - frame["lat"].min()) / resolution).astype(np.intp)
+    j = np.rint((frame["lon"].to_numpy() - frame["lon"].min()) / resolution).astype(np.intp)
+    shape = (max(i.max() + 1, 2), max(j.max() + 1, 2))
+    bands = {}
+    for field in SOIL_FIELDS:
+        band = np.full(shape, np.nan, dtype=np.float32)
+        band[i, j] = frame[field].to_numpy()
+        bands[field] = band
+    return {"bands": bands, "min_lat": float(frame["lat"].min()), "min_lon": float(frame["lon"].min()),
+            "resolution": resolution}
+
+
+_raster: Optional[SoilRaster] = None
+_raster_loaded = False
+_raster_lock = threading.Lock()
+
+
+def soil_raster() -> Optional[SoilRaster]:
+    """Get the process-wide raster at SOIL_RASTER_PATH, None when there is none"""
+    global _raster, _raster_loaded
+    if not _raster_loaded:
+        with _raster_lock:
+            if not _raster_loaded:
+                if os.path.isdir(SOIL_RASTER_PATH):
+                    try:
+                        _raster = SoilRaster.load(SOIL_RASTER_PATH)
+                        print(f"✅ Memory-mapped soil raster {_raster.rows}x{_raster.cols} "
+                              f"at {_raster.resolution}° from {os.path.basename(SOIL_RASTER_PATH)}")
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"⚠️ Soil raster unavailable, using soil regions: {e}")
+                _raster_loaded = True
+    return _raster
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a memory-mappable soil raster")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build from a CSV of lat, lon and soil field columns")
+    build.add_argument("points", help="CSV with lat, lon, " + ", ".join(SOIL_FIELDS))
+    build.add_argument("output", help="Raster directory to write")
+    build.add_argument("--resolution", type=float, required=True, help="Grid spacing in degrees")
+    args = parser.parse_args()
+
+    grid = build_from_points(pd.read_csv(args.points), args.resolution)
+    write_raster(args.output, **grid)
+    rows, cols = grid["bands"]["nitrogen"].shape
+    print(f"✅ Wrote {rows}x{cols} soil raster to {args.output}")
@@ -0,0 +1,270 @@
+"""
+Soil Regions Module
+Regional soil profiles (N, P, K, pH, ozone) loaded from a CSV of bounding
+boxes or a GeoJSON of polygons, with a uniform grid index for point and
+vectorized batch lookups
+"""
+
+import csv
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Soil Region Configuration
+SOIL_REGIONS_FILE = os.getenv(
+    "SOIL_REGIONS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "soil_regions.csv")
+)
+# Edge length in degrees of the grid cells regions are bucketed into
+SOIL_INDEX_CELL_DEG = float(os.getenv("SOIL_INDEX_CELL_DEG", "1.0"))
+
+SOIL_FIELDS = ("nitrogen", "phosphorus", "potassium", "ph", "ozone")
+
+# Used where no region covers a point
+DEFAULT_SOIL = {
+    "nitrogen": 50.0,
+    "phosphorus": 50.0,
+    "potassium": 50.0,
+    "ph": 6.5,
+    "ozone": 30.0
+}
+
+
+class SoilRegionError(ValueError):
+    """Raised when a soil region file cannot be parsed"""
+
+
+def _ring_area(ring: np.ndarray) -> float:
+    """Planar (degree²) area of a closed or open ring of (lon, lat) vertices"""
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+
+def _in_rings(rings: Sequence[np.ndarray], lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Even-odd point-in-polygon test over all rings of a (multi)polygon,
+    vectorized across points; holes are rings like any other
+    """
+    inside = np.zeros(len(lats), dtype=bool)
+    for ring in rings:
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            if ay == by:
+                continue
+            crosses = (ay > lats) != (by > lats)
+            x_at = ax + (lats - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (lons < x_at)
+    return inside
+
+
+def load_regions(path: str) -> List[Dict[str, Any]]:
+    """
+    Read soil regions from a CSV of boxes or a GeoJSON FeatureCollection
+
+    CSV columns: name, priority, min_lat, max_lat, min_lon, max_lon and the
+    soil fields. GeoJSON features need a Polygon or MultiPolygon geometry
+    and name, priority (optional, default 0) and soil field properties.
+
+    Returns:
+        Regions as dicts with name, priority, area, bbox, rings (None for
+        boxes) and the soil values
+
+    Raises:
+        SoilRegionError: If a row or feature is malformed
+    """
+    regions = []
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path) as f:
+            features = json.load(f).get("features", [])
+        for number, feature in enumerate(features):
+            props = feature.get("properties") or {}
+            geometry = feature.get("geometry") or {}
+            try:
+                if geometry.get("type") == "Polygon":
+                    polygons = [geometry["coordinates"]]
+                elif geometry.get("type") == "MultiPolygon":
+                    polygons = geometry["coordinates"]
+                else:
+                    raise SoilRegionError(f"unsupported geometry {geometry.get('type')!r}")
+                polygons = [[np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon] for polygon in polygons]
+                rings = [ring for polygon in polygons for ring in polygon]
+                points = np.concatenate(rings)
+                # The first ring of each polygon is its outline, the rest are holes
+                area = sum(_ring_area(p[0]) - sum(_ring_area(hole) for hole in p[1:]) for p in polygons)
+                regions.append({
+                    "name": str(props.get("name", f"region {number}")),
+                    "priority": float(props.get("priority", 0)),
+                    "area": area,
+                    "bbox": (points[:, 1].min(), points[:, 1].max(), points[:, 0].min(), points[:, 0].max()),
+                    "rings": rings,
+                    **{field: float(props[field]) for field in SOIL_FIELDS},
+                })
+            except (KeyError, TypeError, ValueError, IndexError) as e:
+                raise SoilRegionError(f"{os.path.basename(path)} feature {number}: {e}")
+    else:
+        with open(path, newline="") as f:
+            for number, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    bbox = tuple(float(row[k]) for k in ("min_lat", "max_lat", "min_lon", "max_lon"))
+                    if bbox[0] > bbox[1] or bbox[2] > bbox[3]:
+                        raise ValueError("min must not exceed max")
+                    regions.append({
+                        "name": row["name"],
+                        "priority": float(row.get("priority") or 0),
+                        "area": (bbox[1] - bbox[0]) * (bbox[3] - bbox[2]),
+                        "bbox": bbox,
+                        "rings": None,
+                        **{field: float(row[field]) for field in SOIL_FIELDS},
+                    })
+                except (KeyError, TypeError, ValueError) as e:
+                    raise SoilRegionError(f"{os.path.basename(path)} line {number}: {e}")
+    return regions
+
+
+class SoilRegionIndex:
+    """
+    Soil regions bucketed into a uniform lat/lon grid
+
+    Each grid cell lists the regions whose bounding box touches it, already
+    sorted by precedence, so a lookup tests only the few candidates of one
+    cell and the first region that contains the point wins. Precedence is
+    higher priority first, then smaller area (the more specific region),
+    then name, so overlaps resolve the same way whatever the file order.
+
+    Boxes include their edges. Batch lookups test candidate k of every
+    unresolved point at once, for k up to the deepest cell.
+    """
+
+    def __init__(self, regions: Sequence[Dict[str, Any]], cell_deg: float = SOIL_INDEX_CELL_DEG):
+        order = sorted(range(len(regions)), key=lambda i: (-regions[i]["priority"], regions[i]["area"], regions[i]["name"]))
+        self.regions = [regions[i] for i in order]
+        self.cell_deg = cell_deg
+        self.n_lat = int(math.ceil(180 / cell_deg))
+        self.n_lon = int(math.ceil(360 / cell_deg))
+
+        bounds = np.array([r["bbox"] for r in self.regions], dtype=np.float64).reshape(-1, 4)
+        self.min_lat, self.max_lat, self.min_lon, self.max_lon = bounds.T
+        self.values = np.array([[r[f] for f in SOIL_FIELDS] for r in self.regions], dtype=np.float64).reshape(-1, len(SOIL_FIELDS))
+        # Trailing None so that rank -1 (no region) indexes to None
+        self.names = np.array([r["name"] for r in self.regions] + [None], dtype=object)
+
+        buckets: Dict[int, List[int]] = {}
+        for rank, region in enumerate(self.regions):
+            lat0, lat1 = self._lat_cell(region["bbox"][0]), self._lat_cell(region["bbox"][1])
+            lon0, lon1 = self._lon_cell(region["bbox"][2]), self._lon_cell(region["bbox"][3])
+            for i in range(int(lat0), int(lat1) + 1):
+                for j in range(int(lon0), int(lon1) + 1):
+                    # Ranks are appended in precedence order, so each list stays sorted
+                    buckets.setdefault(i * self.n_lon + j, []).append(rank)
+        self.depth = max((len(b) for b in buckets.values()), default=0)
+        # Dense (cells, depth) candidate table padded with -1
+        self.table = np.full((self.n_lat * self.n_lon, max(self.depth, 1)), -1, dtype=np.int32)
+        for cell, ranks in buckets.items():
+            self.table[cell, :len(ranks)] = ranks
+
+    @classmethod
+    def from_file(cls, path: str = SOIL_REGIONS_FILE, cell_deg: float = SOIL_INDEX_CELL_DEG) -> "SoilRegionIndex":
+        return cls(load_regions(path), cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def _lat_cell(self, lat: Any) -> Any:
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_deg), 0, self.n_lat - 1).astype(np.int64)
+
+    def _lon_cell(self, lon: Any) -> Any:
+        return np.clip(np.floor((np.asarray(lon) + 180) / self.cell_deg), 0, self.n_lon - 1).astype(np.int64)
+
+    def _contains(self, ranks: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        inside = ((self.min_lat[ranks] <= lats) & (lats <= self.max_lat[ranks])
+                  & (self.min_lon[ranks] <= lons) & (lons <= self.max_lon[ranks]))
+        for rank in np.unique(ranks[inside]):
+            rings = self.regions[rank]["rings"]
+            if rings is not None:
+                rows = np.flatnonzero(inside & (ranks == rank))
+                inside[rows] = _in_rings(rings, lats[rows], lons[rows])
+        return inside
+
+    def locate(self, lats: Any, lons: Any) -> np.ndarray:
+        """
+        Precedence rank of the region containing each point, -1 where none does
+
+        Args:
+            lats: Latitudes (scalar or array)
+            lons: Longitudes, same shape as lats
+
+        Returns:
+            int array with the shape of the inputs (ranks index self.regions)
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        shape = lats.shape
+        lats, lons = lats.ravel(), lons.ravel()
+        found = np.full(len(lats), -1, dtype=np.int64)
+        if not len(self.regions):
+            return found.reshape(shape)
+        candidates = self.table[self._lat_cell(lats) * self.n_lon + self._lon_cell(lons)]
+        pending = np.flatnonzero(~(np.isnan(lats) | np.isnan(lons)))
+        for k in range(self.depth):
+            ranks = candidates[pending, k]
+            has_candidate = ranks >= 0
+            pending, ranks = pending[has_candidate], ranks[has_candidate]
+            if not len(pending):
+                break
+            hit = self._contains(ranks, lats[pending], lons[pending])
+            found[pending[hit]] = ranks[hit]
+            pending = pending[~hit]
+        return found.reshape(shape)
+
+    def lookup_many(self, lats: Any, lons: Any) -> Dict[str, np.ndarray]:
+        """
+        Soil values for many points, as columns
+
+        Returns:
+            {"region": names (None where uncovered), "nitrogen": ..., ...};
+            uncovered points take DEFAULT_SOIL
+        """
+        ranks = self.locate(lats, lons)
+        covered = ranks >= 0
+        columns: Dict[str, np.ndarray] = {"region": self.names[ranks]}
+        for i, field in enumerate(SOIL_FIELDS):
+            column = np.full(ranks.shape, DEFAULT_SOIL[field])
+            column[covered] = self.values[ranks[covered], i]
+            columns[field] = column
+        return columns
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """Soil values and region name for one point, None where no region covers it"""
+        rank = int(self.locate(latitude, longitude))
+        if rank < 0:
+            return None
+        region = self.regions[rank]
+        return {"region": region["name"], **{field: region[field] for field in SOIL_FIELDS}}
+
+
+_index: Optional[SoilRegionIndex] = None
+_index_lock = threading.Lock()
+
+
+def soil_region_index() -> SoilRegionIndex:
+    """Get the process-wide index for SOIL_REGIONS_FILE, loading it on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = SoilRegionIndex.from_file(SOIL_REGIONS_FILE)
+                    print(f"✅ Loaded {len(_index)} soil regions from {os.path.basename(SOIL_REGIONS_FILE)}")
+                except (OSError, SoilRegionError) as e:
+                    print(f"⚠️ Soil regions unavailable, using defaults: {e}")
+                    _index = SoilRegionIndex([])
+    return _index
@@ -0,0 +1,154 @@
+"""
+Spray Planner Module
+Ranks spraying windows over the whole hourly forecast horizon from the
+spray timing model, for one field or many fields at once
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from forecast_bundle import fetch_forecast_bundle, fetch_weather_batch
+from inference_batcher import batched_model
+
+# Load environment variables
+load_dotenv()
+
+# Planner Configuration
+SPRAY_WINDOW_HOURS = int(os.getenv("SPRAY_WINDOW_HOURS", "3"))
+SPRAY_TOP_K = int(os.getenv("SPRAY_TOP_K", "3"))
+# Mean probability at or above which a window counts as suitable
+SPRAY_MIN_CONFIDENCE = float(os.getenv("SPRAY_MIN_CONFIDENCE", "0.5"))
+# Constant ozone value (ppb) used until a per-field source is available
+SPRAY_OZONE = float(os.getenv("SPRAY_OZONE", "60"))
+# Most fields accepted by one batch spray plan request
+SPRAY_BATCH_MAX_FIELDS = int(os.getenv("SPRAY_BATCH_MAX_FIELDS", "500"))
+
+SPRAY_FEATURES = ["hour", "temp", "humidity", "wind", "ozone", "rain"]
+
+
+def window_scores(probability: np.ndarray, hours: int) -> np.ndarray:
+    """
+    Mean probability of every window of `hours` consecutive hours
+
+    Element i scores the window starting at hour i; hours with an unknown
+    probability (NaN) make every window containing them NaN.
+    """
+    if hours < 1 or len(probability) < hours:
+        return np.empty(0)
+    return np.convolve(probability, np.full(hours, 1.0 / hours), mode="valid")
+
+
+def top_windows(scores: np.ndarray, hours: int, top_k: int) -> List[int]:
+    """
+    Start indices of the top_k highest-scoring windows that do not overlap
+
+    Windows are picked greedily by score; ties go to the earliest window.
+    """
+    remaining = np.where(np.isnan(scores), -np.inf, scores)
+    starts = []
+    for _ in range(top_k):
+        if not len(remaining):
+            break
+        start = int(np.argmax(remaining))
+        if remaining[start] == -np.inf:
+            break
+        starts.append(start)
+        # Every window sharing an hour with the chosen one starts within hours - 1 of it
+        remaining[max(0, start - hours + 1):start + hours] = -np.inf
+    return starts
+
+
+def describe_window(start: pd.Timestamp, end: pd.Timestamp) -> str:
+    """Human-readable window such as 'Sat 18 Oct 06:00 to 09:00'"""
+    # A window ending at midnight still belongs to the day it started on
+    same_day = (end - pd.Timedelta(minutes=1)).normalize() == start.normalize()
+    return f"{start:%a %d %b %H:%M} to {end.strftime('%H:%M' if same_day else '%a %d %b %H:%M')}"
+
+
+def _windows(frame: pd.DataFrame, probability: np.ndarray, hours: int, top_k: int) -> List[Dict[str, Any]]:
+    scores = window_scores(probability, hours)
+    times = pd.DatetimeIndex(frame["time"])
+    windows = []
+    for start in top_windows(scores, hours, top_k):
+        begins = times[start]
+        ends = times[start + hours - 1] + pd.Timedelta(hours=1)
+        windows.append({
+            "start": begins.isoformat(),
+            "end": ends.isoformat(),
+            "window": describe_window(begins, ends),
+            "confidence": round(float(scores[start]), 4),
+            "suitable": bool(scores[start] >= SPRAY_MIN_CONFIDENCE),
+        })
+    return windows
+
+
+def plan_spray_windows(frames: Sequence[pd.DataFrame], hours: int = SPRAY_WINDOW_HOURS,
+                       top_k: int = SPRAY_TOP_K) -> List[List[Dict[str, Any]]]:
+    """
+    Top spraying windows for several hourly forecasts with one model call
+
+    Args:
+        frames: Hourly frames from ForecastBundle.hourly_frame() (with a time column)
+        hours: Window length in hours
+        top_k: Maximum number of non-overlapping windows per frame
+
+    Returns:
+        Per frame, its windows best first, each with start/end timestamps,
+        a readable label, the mean probability and whether it is suitable
+    """
+    lengths = [len(frame) for frame in frames]
+    plans: List[List[Dict[str, Any]]] = [[] for _ in frames]
+    if not sum(lengths):
+        return plans
+    X = np.concatenate([frame[SPRAY_FEATURES].to_numpy(dtype=np.float64) for frame in frames if len(frame)])
+    complete = ~np.isnan(X).any(axis=1)
+    probability = np.full(len(X), np.nan)
+    if complete.any():
+        probability[complete] = batched_model("time").predict_proba(X[complete])[:, 1]
+    offsets = np.cumsum([0] + lengths)
+    for i, frame in enumerate(frames):
+        if lengths[i]:
+            plans[i] = _windows(frame, probability[offsets[i]:offsets[i + 1]], hours, top_k)
+    return plans
+
+
+def plan_field(lat: float, lon: float, hours: int = SPRAY_WINDOW_HOURS,
+               top_k: int = SPRAY_TOP_K) -> List[Dict[str, Any]]:
+    """Top spraying windows over the full hourly forecast for one location"""
+    try:
+        frame = fetch_forecast_bundle(lat, lon, ("hourly",)).hourly_frame(ozone=SPRAY_OZONE)
+    except Exception as e:
+        print("Error fetching forecast:", e)
+        return []
+    return plan_spray_windows([frame], hours, top_k)[0]
+
+
+def plan_fields(points: Sequence[Tuple[float, float]], hours: int = SPRAY_WINDOW_HOURS,
+                top_k: int = SPRAY_TOP_K) -> List[Optional[List[Dict[str, Any]]]]:
+    """
+    Top spraying windows for many locations: forecasts are fetched with
+    batched requests and every location is scored in one model call
+
+    Returns:
+        Per point, its windows (None where no forecast is available)
+    """
+    bundles = fetch_weather_batch(points, ("hourly",))
+    frames = [b.hourly_frame(ozone=SPRAY_OZONE) if b is not None else pd.DataFrame() for b in bundles]
+    plans = plan_spray_windows(frames, hours, top_k)
+    return [plan if len(frame) else None for plan, frame in zip(plans, frames)]
+
+
+def summarize(windows: List[Dict[str, Any]], hours: int = SPRAY_WINDOW_HOURS) -> Dict[str, Any]:
+    """Legacy single-window response (result message, window, confidence) plus all windows"""
+    if not windows:
+        return {"result": "No hourly forecast data available.", "window": None, "confidence": None, "windows": []}
+    best = windows[0]
+    if best["suitable"]:
+        msg = f"Best {hours}-hour window to spray: {best['window']} (Confidence: {best['confidence']:.2f})"
+    else:
+        msg = f"No ideal {hours}-hour window, but highest confidence: {best['window']} (Confidence: {best['confidence']:.2f})"
+    return {"result": msg, "window": best["window"], "confidence": best["confidence"], "windows": windows}
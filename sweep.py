@@ -0,0 +1,199 @@
+"""
+What-if Sweep Module
+Evaluates a model over a grid or Latin hypercube sample of one or two
+input features around a base input, scored in bounded chunks
+"""
+
+import math
+import numbers
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from feature_encoders import encoder_for
+from inference_batcher import batched_model
+from model_registry import model_registry
+
+# Load environment variables
+load_dotenv()
+
+# Sweep Configuration
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "100000"))
+# Rows scored per model call; bounds the feature matrix held in memory at once
+SWEEP_CHUNK_ROWS = int(os.getenv("SWEEP_CHUNK_ROWS", "8192"))
+SWEEP_MAX_FEATURES = 2
+
+SAMPLING_METHODS = ("grid", "lhs")
+
+
+class SweepInputError(ValueError):
+    """Raised when a sweep request cannot be evaluated as given"""
+
+
+def grid_points(ranges: Sequence[Tuple[float, float]], steps: Sequence[int]) -> Tuple[List[np.ndarray], np.ndarray]:
+    """
+    Full Cartesian grid over the ranges
+
+    Returns:
+        The values along each axis, and an (n_points, n_axes) array in
+        row-major order (the last axis varies fastest)
+    """
+    axes = [np.linspace(low, high, n) for (low, high), n in zip(ranges, steps)]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return axes, np.column_stack([m.ravel() for m in mesh])
+
+
+def latin_hypercube(ranges: Sequence[Tuple[float, float]], samples: int,
+                    seed: Optional[int] = None) -> np.ndarray:
+    """
+    Latin hypercube sample: each axis is cut into `samples` equal strata and
+    every stratum is sampled exactly once, in an independent random order
+    per axis
+
+    Returns:
+        (samples, n_axes) array
+    """
+    rng = np.random.default_rng(seed)
+    unit = np.column_stack([(rng.permutation(samples) + rng.random(samples)) / samples for _ in ranges])
+    low = np.array([r[0] for r in ranges])
+    high = np.array([r[1] for r in ranges])
+    return low + unit * (high - low)
+
+
+def _validate(model: Any, base: Mapping[str, Any], features: Sequence[str]):
+    encoder = encoder_for(model)
+    for field, value in base.items():
+        if isinstance(value, str):
+            if (field, value) not in encoder.onehot_index:
+                raise SweepInputError(f"Model has no category {value!r} for input '{field}'")
+        elif isinstance(value, numbers.Real) and not isinstance(value, bool):
+            if field not in encoder.numeric_index:
+                raise SweepInputError(f"Model has no numeric input '{field}'")
+            if not math.isfinite(value):
+                raise SweepInputError(f"Input '{field}' must be finite, got {value!r}")
+        else:
+            raise SweepInputError(f"Input '{field}' must be a number or a category name, got {value!r}")
+    if not 1 <= len(features) <= SWEEP_MAX_FEATURES:
+        raise SweepInputError(f"Sweep 1 to {SWEEP_MAX_FEATURES} features")
+    if len(set(features)) != len(features):
+        raise SweepInputError("Swept features must be distinct")
+    for feature in features:
+        if feature not in encoder.numeric_index:
+            raise SweepInputError(f"'{feature}' is not a numeric input of the model; "
+                                  f"numeric inputs: {', '.join(encoder.numeric_index)}")
+
+
+def _defaulted_inputs(encoder: Any, base: Mapping[str, Any], features: Sequence[str]) -> List[str]:
+    """Model inputs the request left at 0"""
+    covered = {encoder.numeric_index[f] for f in features}
+    for field, value in base.items():
+        if isinstance(value, str):
+            covered.update(i for (prefix, _), i in encoder.onehot_index.items() if prefix == field)
+        else:
+            covered.add(encoder.numeric_index[field])
+    return [name for i, name in enumerate(encoder.feature_names) if i not in covered]
+
+
+def score_points(model: Any, base: Mapping[str, Any], features: Sequence[str], points: np.ndarray,
+                 chunk_rows: int = SWEEP_CHUNK_ROWS) -> Dict[str, np.ndarray]:
+    """
+    Evaluate the model on base with the swept features replaced by each point
+
+    The base input is encoded once; each chunk tiles it and overwrites the
+    swept columns, so memory stays at chunk_rows x n_features.
+
+    Returns:
+        {"value": ...} for regressors, {"value": labels, "confidence": max
+        class probability} for classifiers, each of length len(points)
+    """
+    encoder = encoder_for(model)
+    base_row = encoder.encode(base)
+    columns = [encoder.numeric_index[feature] for feature in features]
+    is_classifier = hasattr(model, "classes_")
+    classes = np.asarray(model.classes_) if is_classifier else None
+
+    values = np.empty(len(points), dtype=classes.dtype if is_classifier else np.float64)
+    confidence = np.empty(len(points)) if is_classifier else None
+    for start in range(0, len(points), chunk_rows):
+        chunk = points[start:start + chunk_rows]
+        X = np.repeat(base_row, len(chunk), axis=0)
+        X[:, columns] = chunk
+        if is_classifier:
+            proba = model.predict_proba(X)
+            best = np.argmax(proba, axis=1)
+            values[start:start + len(chunk)] = classes[best]
+            confidence[start:start + len(chunk)] = proba[np.arange(len(chunk)), best]
+        else:
+            values[start:start + len(chunk)] = np.asarray(model.predict(X), dtype=np.float64).ravel()
+    result = {"value": values}
+    if is_classifier:
+        result["confidence"] = confidence
+    return result
+
+
+def run_sweep(model_name: str, base: Mapping[str, Any], axes: Sequence[Mapping[str, Any]],
+              sampling: str = "grid", samples: int = 500, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Response surface of a model over one or two swept features
+
+    Args:
+        model_name: Registered model name
+        base: Inputs held fixed (missing model inputs are 0, as in the
+            single-row endpoints)
+        axes: Per swept feature, {"feature", "min", "max", "steps"};
+            steps is used by grid sampling only
+        sampling: "grid" for the Cartesian grid, "lhs" for a Latin hypercube
+        samples: Number of points for "lhs"
+        seed: Random seed for "lhs", for reproducible samples
+
+    Returns:
+        For grid sampling, the axis values and the surface shaped
+        (steps_1[, steps_2]); for lhs, the sampled points and values as
+        columns. Classifiers add a matching confidence array.
+
+    Raises:
+        SweepInputError: If the model, features, ranges or size are invalid
+    """
+    if sampling not in SAMPLING_METHODS:
+        raise SweepInputError(f"sampling must be one of {', '.join(SAMPLING_METHODS)}")
+    try:
+        model_registry.path(model_name)
+    except KeyError as e:
+        raise SweepInputError(str(e.args[0]))
+    if not model_registry.available(model_name):
+        raise SweepInputError(f"Model '{model_name}' is not available")
+
+    features = [axis["feature"] for axis in axes]
+    ranges = [(float(axis["min"]), float(axis["max"])) for axis in axes]
+    if any(low > high for low, high in ranges):
+        raise SweepInputError("Every range needs min <= max")
+    steps = [int(axis.get("steps", 50)) for axis in axes]
+    n_points = int(np.prod(steps)) if sampling == "grid" else samples
+    if n_points > SWEEP_MAX_POINTS:
+        raise SweepInputError(f"Sweep has {n_points} points; the maximum is {SWEEP_MAX_POINTS}")
+
+    model = batched_model(model_name)
+    _validate(model, base, features)
+    base = {k: v for k, v in base.items() if k not in features}
+
+    started = time.perf_counter()
+    if sampling == "grid":
+        axis_values, points = grid_points(ranges, steps)
+    else:
+        points = latin_hypercube(ranges, samples, seed)
+    scored = score_points(model, base, features, points)
+
+    result: Dict[str, Any] = {"model": model_name, "sampling": sampling, "features": features,
+                              "n_points": len(points)}
+    if sampling == "grid":
+        result["axes"] = {f: values.tolist() for f, values in zip(features, axis_values)}
+        result.update({k: v.reshape(steps).tolist() for k, v in scored.items()})
+    else:
+        result["points"] = {f: points[:, i].tolist() for i, f in enumerate(features)}
+        result.update({k: v.tolist() for k, v in scored.items()})
+    result["defaulted_inputs"] = _defaulted_inputs(encoder_for(model), base, features)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
@@ -1,41 +1,25 @@
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import joblib
 
+from forecast_bundle import fetch_forecast_bundle
+from feature_encoders import encoder_for
+from inference_batcher import batched_model
+from inference_cache import inference_cache
+
 def fetch_weather_data(lat, lon):
     try:
-        # Use 'current' parameter to get real-time precipitation
-        url = (
-            "https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}"
-            "&current=temperature_2m,relative_humidity_2m,precipitation,windspeed_10m"
-            "&timezone=auto"
-        )
-
-        res = requests.get(url)
-        data = res.json()
-
-        if "current" not in data:
+        # Current conditions come from the shared forecast bundle (one request per grid cell)
+        weather = fetch_forecast_bundle(lat, lon, ("current",)).current_conditions()
+
+        if weather is None:
             print("No current weather data found.")
             return None
 
-        current = data["current"]
-        
-        temp = current.get("temperature_2m", 0)
-        humidity = current.get("relative_humidity_2m", 0)
-        rain = current.get("precipitation", 0)
-        wind = current.get("windspeed_10m", 0)
-        
-        print(f"DEBUG: Temp={temp}°C, Humidity={humidity}%, Rain={rain}mm, Wind={wind}km/h")
-
-        return {
-            "temp": round(float(temp), 2),
-            "humidity": round(float(humidity), 2),
-            "rain": round(float(rain), 2),
-            "wind": round(float(wind), 2),
-        }
+        print(f"DEBUG: Temp={weather['temp']}°C, Humidity={weather['humidity']}%, Rain={weather['rain']}mm, Wind={weather['wind']}km/h")
+
+        return weather
 
     except Exception as e:
         print("Error fetching weather data:", e)
@@ -43,45 +27,15 @@ def fetch_weather_data(lat, lon):
 
 def get_hourly_forecast(lat, lon):
     try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,relative_humidity_2m,precipitation,windspeed_10m&timezone=auto"
-        res = requests.get(url)
-        data = res.json()
-
-        hourly = data.get("hourly", {})
-        df = pd.DataFrame({
-            "hour": pd.to_datetime(hourly["time"]).hour,
-            "temp": hourly["temperature_2m"],
-            "humidity": hourly["relative_humidity_2m"],
-            "rain": hourly["precipitation"],
-            "wind": hourly["windspeed_10m"]
-        })
-
         # Assume constant ozone value (to be updated from app.py input)
-        df["ozone"] = 60  # Placeholder
-        return df
+        return fetch_forecast_bundle(lat, lon, ("hourly",)).hourly_frame(ozone=60)
     except Exception as e:
         print("Error fetching forecast:", e)
         return pd.DataFrame()
 
 def get_7_day_forecast(lat, lon):
     try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max,relative_humidity_2m_max&timezone=auto"
-        res = requests.get(url)
-        data = res.json()
-
-        daily = data.get("daily", {})
-        if not daily:
-            return pd.DataFrame()
-
-        df = pd.DataFrame({
-            "day": pd.to_datetime(daily["time"]).strftime("%a"),
-            "temp": daily["temperature_2m_max"],
-            "rain": daily["precipitation_sum"],
-            "wind": daily["windspeed_10m_max"],
-            "humidity": daily["relative_humidity_2m_max"]
-        })
-
-        return df
+        return fetch_forecast_bundle(lat, lon, ("daily",)).daily_frame()
     except Exception as e:
         print("Error fetching 7-day forecast:", e)
         return pd.DataFrame()
@@ -108,25 +62,34 @@ def generate_weather_alerts(forecast_df):
 
     return alerts
 
-def recommend_fertilizer(input_df, model):
-    input_df = pd.get_dummies(input_df)
-    for col in model.feature_names_in_:
-        if col not in input_df.columns:
-            input_df[col] = 0
-    input_df = input_df[model.feature_names_in_]
-    return model.predict(input_df)[0]
-
-def predict_stress_level(model, input_df):
-    input_df = pd.get_dummies(input_df)
-    for col in model.feature_names_in_:
-        if col not in input_df.columns:
-            input_df[col] = 0
-    input_df = input_df[model.feature_names_in_]
-
-    prediction = model.predict(input_df)[0]
-    explanation = {
-        "Low": "Healthy plant: Dark green leaves, no visible symptoms.",
-        "Medium": "Mild stress detected: Possible leaf curling or slight discoloration.",
-        "High": "High stress detected: Brown spots, yellowing, stunted growth due to ozone or nutrient imbalance."
-    }
-    return prediction, explanation.get(prediction, "Unknown stress level.")
+STRESS_EXPLANATIONS = {
+    "Low": "Healthy plant: Dark green leaves, no visible symptoms.",
+    "Medium": "Mild stress detected: Possible leaf curling or slight discoloration.",
+    "High": "High stress detected: Brown spots, yellowing, stunted growth due to ozone or nutrient imbalance."
+}
+
+def encode_features(input_data, model):
+    # Map a request dict or a DataFrame onto the model's training columns
+    # (same result as get_dummies + zero-filled reindex, without pandas)
+    encoder = encoder_for(model)
+    if isinstance(input_data, dict):
+        return encoder.encode(input_data)
+    return encoder.encode_columns({col: input_data[col].to_numpy() for col in input_data.columns})
+
+def predict_yield_value(input_data):
+    # Yield for one request dict ({"ozone", "temp", "rain", "soil"}); repeated
+    # inputs are answered from the inference cache without encoding or inference
+    model = batched_model("yield")
+    return inference_cache("yield").get_or_compute(
+        input_data, lambda inputs: float(model.predict(encode_features(inputs, model))[0])
+    )
+
+def recommend_fertilizer(input_data, model):
+    return model.predict(encode_features(input_data, model))[0]
+
+def explain_stress_level(level):
+    return STRESS_EXPLANATIONS.get(level, "Unknown stress level.")
+
+def predict_stress_level(model, input_data):
+    prediction = model.predict(encode_features(input_data, model))[0]
+    return prediction, explain_stress_level(prediction)
@@ -0,0 +1,258 @@
+"""
+Weather Cache Module
+In-process TTL cache for weather API payloads, keyed on coordinates
+snapped to a grid so nearby map clicks share one upstream response
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from singleflight import SingleFlight
+
+# Load environment variables
+load_dotenv()
+
+# Cache Configuration
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.05"))
+WEATHER_CACHE_MAX_MB = float(os.getenv("WEATHER_CACHE_MAX_MB", "32"))
+
+# Time-to-live per product, in seconds (Open-Meteo updates roughly every 15 minutes)
+WEATHER_TTLS = {
+    "current": int(os.getenv("WEATHER_TTL_CURRENT", "900")),
+    "hourly": int(os.getenv("WEATHER_TTL_HOURLY", "1800")),
+    "daily": int(os.getenv("WEATHER_TTL_DAILY", "3600")),
+}
+
+# How long expired entries are kept to be served stale while refreshing
+WEATHER_STALE_TTL = int(os.getenv("WEATHER_STALE_TTL", "21600"))
+
+
+def snap_coordinates(latitude: float, longitude: float, grid: float = WEATHER_GRID_DEG) -> Tuple[float, float]:
+    """
+    Snap a coordinate to the centre of its grid cell
+
+    Args:
+        latitude: Latitude coordinate
+        longitude: Longitude coordinate
+        grid: Cell size in degrees
+
+    Returns:
+        Tuple of (snapped_latitude, snapped_longitude)
+    """
+    return (
+        round(round(float(latitude) / grid) * grid, 6),
+        round(round(float(longitude) / grid) * grid, 6),
+    )
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate memory footprint of a cached value in bytes
+    Handles the JSON-like payloads, arrays and frames stored in the cache
+    """
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes) + 112
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + estimate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class GeoCache:
+    """
+    Thread-safe LRU cache with per-product TTLs and a memory bound
+
+    Keys are (product, snapped_lat, snapped_lon, variables). Entries are
+    evicted least-recently-used first once max_bytes is exceeded. Expired
+    entries stay readable with allow_stale=True for stale_ttl seconds.
+    Misses for the same key are coalesced into a single upstream load.
+    """
+
+    def __init__(self, max_bytes: int = int(WEATHER_CACHE_MAX_MB * 1024 * 1024),
+                 ttls: Optional[Dict[str, int]] = None, grid: float = WEATHER_GRID_DEG,
+                 stale_ttl: int = WEATHER_STALE_TTL):
+        self.max_bytes = max_bytes
+        self.ttls = dict(WEATHER_TTLS if ttls is None else ttls)
+        self.grid = grid
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flights = SingleFlight()
+
+    def make_key(self, product: str, latitude: float, longitude: float, variables: str = "") -> Tuple:
+        """Build a cache key from a product name, coordinates and variable set"""
+        return (product,) + snap_coordinates(latitude, longitude, self.grid) + (variables,)
+
+    def ttl_for(self, key: Tuple) -> int:
+        return self.ttls.get(key[0], min(self.ttls.values()))
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[Any]:
+        """
+        Look up a key, counting a hit or miss
+
+        Args:
+            key: Cache key
+            allow_stale: Also return entries past their TTL but within stale_ttl
+
+        Returns:
+            Cached value, or None when missing or expired
+        """
+        found = self._read(key, allow_stale)
+        return None if found is None else found[0]
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """
+        Look up a key once, fresh or stale, counting a hit, stale hit or miss
+
+        Returns:
+            Tuple of (value, is_fresh), or None when missing or past stale_ttl
+        """
+        return self._read(key, allow_stale=True)
+
+    def _read(self, key: Hashable, allow_stale: bool) -> Optional[Tuple[Any, bool]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, stale_until, size, value = entry
+            if now >= stale_until:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            fresh = now < expires_at
+            if not fresh:
+                if not allow_stale:
+                    self.misses += 1
+                    return None
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            self._entries.move_to_end(key)
+            return value, fresh
+
+    def _peek(self, key: Hashable) -> Optional[Any]:
+        """Look up a fresh value without touching counters or LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[0]:
+                return None
+            return entry[3]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, stale_ttl: Optional[float] = None):
+        """
+        Store a value, evicting least-recently-used entries beyond max_bytes
+
+        ttl defaults to the product TTL and stale_ttl (how long the value stays
+        servable stale after ttl) to the cache's; a ttl <= 0 stores an
+        already-stale value, e.g. one promoted from a slower tier.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl_for(key) if ttl is None else ttl)
+        stale_until = expires_at + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, stale_until, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        size = self._entries.pop(key)[2]
+        self._bytes -= size
+
+    def get_or_load(self, product: str, latitude: float, longitude: float, variables: str,
+                    loader: Callable[[float, float], Any]) -> Any:
+        """
+        Return a cached value or call loader(snapped_lat, snapped_lon)
+
+        The loader is called with the cell centre so every point in a cell
+        gets the same data. Concurrent misses share one loader call.
+        None results are not cached.
+        """
+        key = self.make_key(product, latitude, longitude, variables)
+        value = self.get(key)
+        if value is None:
+            def load() -> Any:
+                # A previous flight may have filled the entry since our miss
+                loaded = self._peek(key)
+                if loaded is None:
+                    loaded = loader(key[1], key[2])
+                    if loaded is not None:
+                        self.set(key, loaded)
+                return loaded
+
+            value = self.flights.do(key, load)
+        return value
+
+    async def get_or_load_async(self, product: str, latitude: float, longitude: float, variables: str,
+                                loader: Callable[[float, float], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of get_or_load() for coroutine loaders
+        """
+        key = self.make_key(product, latitude, longitude, variables)
+        value = self.get(key)
+        if value is None:
+            async def load() -> Any:
+                loaded = self._peek(key)
+                if loaded is None:
+                    loaded = await loader(key[1], key[2])
+                    if loaded is not None:
+                        self.set(key, loaded)
+                return loaded
+
+            value = await self.flights.do_async(key, load)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "grid_deg": self.grid,
+                "single_flight": self.flights.stats(),
+            }
+
+
+# Shared cache used by every weather consumer in the process
+weather_cache = GeoCache()
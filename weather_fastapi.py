@@ -1,16 +1,16 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Query, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from utils import fetch_weather_data, get_hourly_forecast, generate_weather_alerts, get_7_day_forecast
-import joblib
-import pandas as pd
+from utils import fetch_weather_data, generate_weather_alerts, get_7_day_forecast
+from pydantic import BaseModel, Field
+from typing import Dict, List
+from spray_planner import SPRAY_BATCH_MAX_FIELDS, SPRAY_TOP_K, SPRAY_WINDOW_HOURS, plan_field, plan_fields, summarize
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-time_model = joblib.load("model/best_window_model.pkl")
 
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
@@ -24,26 +24,27 @@ def get_weather(lat: float, lon: float):
     return {"weather": weather}
 
 @app.get("/spray_window")
-def spray_window(lat: float, lon: float):
-    hourly_data = get_hourly_forecast(lat, lon)
-    if hourly_data.empty:
-        return JSONResponse({'result': 'No hourly forecast data available.', 'window': None})
-    hourly_data['probability'] = time_model.predict_proba(
-        hourly_data[["hour", "temp", "humidity", "wind", "ozone", "rain"]]
-    )[:, 1]
-    best_window = None
-    best_score = -1
-    for i in range(len(hourly_data) - 2):
-        window = hourly_data.iloc[i:i+3]
-        avg_prob = window['probability'].mean()
-        if avg_prob > best_score:
-            best_score = avg_prob
-            best_window = f"{int(window.iloc[0]['hour'])}:00 to {int(window.iloc[2]['hour']) + 1}:00"
-    if best_score >= 0.5:
-        msg = f"Best 3-hour window to spray: {best_window} (Confidence: {best_score:.2f})"
-    else:
-        msg = f"No ideal 3-hour window, but highest confidence: {best_window} (Confidence: {best_score:.2f})"
-    return {"result": msg, "window": best_window, "confidence": best_score}
+def spray_window(lat: float, lon: float, hours: int = Query(SPRAY_WINDOW_HOURS, ge=1, le=24),
+                 top_k: int = Query(SPRAY_TOP_K, ge=1, le=20)):
+    """Best spraying windows over the full 7-day hourly forecast"""
+    return summarize(plan_field(lat, lon, hours, top_k), hours)
+
+class SprayPlanRequest(BaseModel):
+    fields: List[Dict[str, float]] = Field(..., description="Locations as {'lat': ..., 'lon': ...}")
+    hours: int = Field(SPRAY_WINDOW_HOURS, ge=1, le=24)
+    top_k: int = Field(SPRAY_TOP_K, ge=1, le=20)
+
+@app.post("/spray_window/batch")
+def spray_window_batch(request: SprayPlanRequest):
+    """Spraying windows for many fields, scored with one model call"""
+    if len(request.fields) > SPRAY_BATCH_MAX_FIELDS:
+        return JSONResponse({'error': f"At most {SPRAY_BATCH_MAX_FIELDS} fields per request"}, status_code=400)
+    try:
+        points = [(float(f["lat"]), float(f["lon"])) for f in request.fields]
+    except KeyError as e:
+        return JSONResponse({'error': f"Every field needs {e}"}, status_code=400)
+    plans = plan_fields(points, request.hours, request.top_k)
+    return {"results": [summarize(plan or [], request.hours) for plan in plans]}
 
 @app.get("/weather_alerts")
 def weather_alerts(lat: float, lon: float):
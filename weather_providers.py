@@ -0,0 +1,333 @@
+"""
+Weather Providers Module
+Pluggable weather backends (Open-Meteo, MET Norway and a deterministic
+local simulator) behind one interface returning Open-Meteo-shaped payloads
+"""
+
+import asyncio
+import os
+import random
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+import http_client
+from met_client import MetApiError, met_client
+
+# Load environment variables
+load_dotenv()
+
+# Provider Configuration
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "open-meteo")
+WEATHER_SIM_SEED = int(os.getenv("WEATHER_SIM_SEED", "42"))
+WEATHER_SIM_LATENCY_MS = float(os.getenv("WEATHER_SIM_LATENCY_MS", "0"))
+WEATHER_SIM_ERROR_RATE = float(os.getenv("WEATHER_SIM_ERROR_RATE", "0"))
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Variables requested for each product; the union of what every view needs
+BUNDLE_VARIABLES = {
+    "current": "temperature_2m,relative_humidity_2m,precipitation,windspeed_10m",
+    "hourly": "temperature_2m,relative_humidity_2m,precipitation,windspeed_10m,cloud_cover",
+    "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max,relative_humidity_2m_max",
+}
+
+HOURLY_FIELDS = BUNDLE_VARIABLES["hourly"].split(",")
+DAILY_FIELDS = BUNDLE_VARIABLES["daily"].split(",")
+
+
+class ProviderError(Exception):
+    """Raised when a weather provider returns an error or no usable data"""
+
+
+class WeatherProvider:
+    """
+    Base class for weather backends
+
+    Providers return payloads shaped like an Open-Meteo response
+    ({"current": {...}, "hourly": {...}, "daily": {...}}) so every view in
+    forecast_bundle works unchanged whichever backend is configured.
+    """
+
+    name = "base"
+
+    def fetch_payload(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def fetch_payload_async(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def fetch_batch_payloads(self, points: Sequence[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        """Fetch several locations; providers without a batch API loop"""
+        return [self.fetch_payload(lat, lon) for lat, lon in points]
+
+    async def fetch_batch_payloads_async(self, points: Sequence[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.fetch_payload_async(lat, lon) for lat, lon in points)))
+
+    async def fetch_noon_samples_async(self, latitude: float, longitude: float, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Daily midday samples for the disease risk model
+
+        Returns:
+            List of dictionaries with Date, Temperature, Humidity, Rainfall,
+            Cloud Cover and Wind Speed
+        """
+        from forecast_bundle import ForecastBundle
+
+        payload = await self.fetch_payload_async(latitude, longitude)
+        return ForecastBundle.from_payload(payload, latitude, longitude).noon_samples(days)
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo forecast API (free, no API key, native multi-location requests)"""
+
+    name = "open-meteo"
+
+    def _params(self, points: Sequence[Tuple[float, float]]) -> Dict[str, Any]:
+        params = {
+            "latitude": ",".join(str(lat) for lat, _ in points),
+            "longitude": ",".join(str(lon) for _, lon in points),
+            "timezone": "auto",
+        }
+        params.update(BUNDLE_VARIABLES)
+        return params
+
+    def fetch_payload(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        return http_client.get_json_sync(OPEN_METEO_URL, params=self._params([(latitude, longitude)]))
+
+    async def fetch_payload_async(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        return await http_client.get_json(OPEN_METEO_URL, params=self._params([(latitude, longitude)]))
+
+    def fetch_batch_payloads(self, points: Sequence[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        payload = http_client.get_json_sync(OPEN_METEO_URL, params=self._params(points))
+        return payload if isinstance(payload, list) else [payload]
+
+    async def fetch_batch_payloads_async(self, points: Sequence[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        payload = await http_client.get_json(OPEN_METEO_URL, params=self._params(points))
+        return payload if isinstance(payload, list) else [payload]
+
+
+def met_document_to_payload(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a MET locationforecast compact document to an Open-Meteo-shaped
+    payload (UTC times, wind in km/h)
+
+    Hourly series cover the hourly-resolution part of the forecast; daily
+    aggregates use 1-hour precipitation where available and 6-hour amounts
+    for the 6-hourly tail.
+    """
+    timeseries = document["properties"]["timeseries"]
+    if not timeseries:
+        raise ProviderError("MET API returned an empty timeseries")
+
+    hourly = {name: [] for name in ["time"] + HOURLY_FIELDS}
+    days: "OrderedDict[str, Dict[str, List[float]]]" = OrderedDict()
+    for entry in timeseries:
+        details = entry["data"]["instant"]["details"]
+        one_hour = entry["data"].get("next_1_hours", {}).get("details", {})
+        six_hours = entry["data"].get("next_6_hours", {}).get("details", {})
+        temperature = details.get("air_temperature", 0)
+        humidity = details.get("relative_humidity", 0)
+        wind = details.get("wind_speed", 0) * 3.6
+
+        if one_hour:
+            hourly["time"].append(entry["time"][:16])
+            hourly["temperature_2m"].append(temperature)
+            hourly["relative_humidity_2m"].append(humidity)
+            hourly["precipitation"].append(one_hour.get("precipitation_amount", 0.0))
+            hourly["windspeed_10m"].append(wind)
+            hourly["cloud_cover"].append(details.get("cloud_area_fraction", 0))
+
+        day = days.setdefault(entry["time"][:10], {"temp": [], "rain": [], "wind": [], "humidity": []})
+        day["temp"].append(temperature)
+        day["wind"].append(wind)
+        day["humidity"].append(humidity)
+        day["rain"].append(one_hour.get("precipitation_amount", 0.0) if one_hour
+                           else six_hours.get("precipitation_amount", 0.0))
+
+    first = timeseries[0]
+    first_details = first["data"]["instant"]["details"]
+    return {
+        "timezone": "GMT",
+        "current": {
+            "time": first["time"][:16],
+            "temperature_2m": first_details.get("air_temperature", 0),
+            "relative_humidity_2m": first_details.get("relative_humidity", 0),
+            "precipitation": first["data"].get("next_1_hours", {}).get("details", {}).get("precipitation_amount", 0.0),
+            "windspeed_10m": first_details.get("wind_speed", 0) * 3.6,
+        },
+        "hourly": hourly,
+        "daily": {
+            "time": list(days),
+            "temperature_2m_max": [max(d["temp"]) for d in days.values()],
+            "temperature_2m_min": [min(d["temp"]) for d in days.values()],
+            "precipitation_sum": [sum(d["rain"]) for d in days.values()],
+            "windspeed_10m_max": [max(d["wind"]) for d in days.values()],
+            "relative_humidity_2m_max": [max(d["humidity"]) for d in days.values()],
+        },
+    }
+
+
+class MetNoProvider(WeatherProvider):
+    """
+    MET Norway locationforecast 2.0 (compact); requires an identifying
+    User-Agent. Requests go through the shared conditional met_client.
+    """
+
+    name = "met"
+
+    def fetch_document(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        try:
+            return met_client.get_forecast(latitude, longitude).document
+        except MetApiError as e:
+            raise ProviderError(str(e)) from e
+
+    async def fetch_document_async(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        try:
+            return (await met_client.get_forecast_async(latitude, longitude)).document
+        except MetApiError as e:
+            raise ProviderError(str(e)) from e
+
+    def fetch_payload(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        return met_document_to_payload(self.fetch_document(latitude, longitude))
+
+    async def fetch_payload_async(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        return met_document_to_payload(await self.fetch_document_async(latitude, longitude))
+
+    async def fetch_noon_samples_async(self, latitude: float, longitude: float, days: int = 7) -> List[Dict[str, Any]]:
+        try:
+            return await met_client.noon_samples_async(latitude, longitude, days)
+        except MetApiError as e:
+            raise ProviderError(str(e)) from e
+
+
+class SimulatorProvider(WeatherProvider):
+    """
+    Deterministic local weather simulator for offline load tests and benchmarks
+
+    Series depend only on the seed, the location and the forecast start, so
+    repeated runs produce identical data. Latency and failures can be
+    injected to exercise timeouts, retries and the circuit breaker.
+    """
+
+    name = "simulator"
+
+    def __init__(self, seed: int = WEATHER_SIM_SEED, latency_ms: float = WEATHER_SIM_LATENCY_MS,
+                 error_rate: float = WEATHER_SIM_ERROR_RATE, hours: int = 168,
+                 start: Optional[np.datetime64] = None):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.hours = hours
+        self.start = start
+        self._faults = random.Random(seed)
+        self.requests = 0
+        self.injected_errors = 0
+
+    def _rng(self, latitude: float, longitude: float) -> np.random.Generator:
+        location = zlib.crc32(f"{latitude:.4f},{longitude:.4f}".encode())
+        return np.random.default_rng([self.seed, location])
+
+    def _check_fault(self):
+        self.requests += 1
+        if self.error_rate and self._faults.random() < self.error_rate:
+            self.injected_errors += 1
+            raise ProviderError("Simulated upstream failure")
+
+    def generate(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        """
+        Generate current, hourly and daily series for a location
+
+        Temperature follows a diurnal cycle around a latitude-dependent base
+        with day-to-day drift; humidity moves against temperature; rain comes
+        in bursts on rainy days, which are also cloudier and more humid.
+        """
+        rng = self._rng(latitude, longitude)
+        start = self.start if self.start is not None else np.datetime64("today", "D")
+        times = start.astype("datetime64[m]") + np.arange(self.hours) * np.timedelta64(60, "m")
+        hour_of_day = np.arange(self.hours) % 24
+        day_index = np.arange(self.hours) // 24
+        n_days = int(day_index[-1]) + 1
+
+        base_temp = 30.0 - 0.35 * abs(latitude) + rng.normal(0, 2)
+        day_drift = np.cumsum(rng.normal(0, 1.2, n_days))
+        rainy_day = rng.random(n_days) < 0.3
+        temperature = (base_temp + day_drift[day_index]
+                       + 6.0 * np.sin(2 * np.pi * (hour_of_day - 9) / 24)
+                       + rng.normal(0, 0.6, self.hours))
+        rain_burst = rainy_day[day_index] & (rng.random(self.hours) < 0.25)
+        precipitation = np.where(rain_burst, rng.gamma(0.8, 1.5, self.hours), 0.0)
+        humidity = np.clip(70 - 2.0 * (temperature - base_temp) + 15 * rainy_day[day_index]
+                           + rng.normal(0, 4, self.hours), 15, 100)
+        cloud_cover = np.clip(35 + 45 * rainy_day[day_index] + rng.normal(0, 15, self.hours), 0, 100)
+        wind = np.clip(rng.gamma(2.0, 4.0, self.hours) + 3 * np.sin(2 * np.pi * (hour_of_day - 12) / 24), 0, None)
+
+        now = np.datetime64("now", "m")
+        current = int(np.clip((now - times[0]) // np.timedelta64(60, "m"), 0, self.hours - 1))
+
+        def daily(values: np.ndarray, reducer) -> List[float]:
+            return [round(float(reducer(values[day_index == d])), 2) for d in range(n_days)]
+
+        hourly = {
+            "temperature_2m": temperature,
+            "relative_humidity_2m": humidity,
+            "precipitation": precipitation,
+            "windspeed_10m": wind,
+            "cloud_cover": cloud_cover,
+        }
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "timezone": "GMT",
+            "current": {"time": str(times[current]), **{k: round(float(v[current]), 2)
+                                                         for k, v in hourly.items() if k != "cloud_cover"}},
+            "hourly": {"time": times.astype(str).tolist(),
+                       **{k: np.round(v, 2).tolist() for k, v in hourly.items()}},
+            "daily": {
+                "time": [str(start + np.timedelta64(d, "D")) for d in range(n_days)],
+                "temperature_2m_max": daily(temperature, np.max),
+                "temperature_2m_min": daily(temperature, np.min),
+                "precipitation_sum": daily(precipitation, np.sum),
+                "windspeed_10m_max": daily(wind, np.max),
+                "relative_humidity_2m_max": daily(humidity, np.max),
+            },
+        }
+
+    def fetch_payload(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        self._check_fault()
+        return self.generate(latitude, longitude)
+
+    async def fetch_payload_async(self, latitude: float, longitude: float) -> Dict[str, Any]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self._check_fault()
+        return self.generate(latitude, longitude)
+
+
+PROVIDERS = {
+    OpenMeteoProvider.name: OpenMeteoProvider,
+    MetNoProvider.name: MetNoProvider,
+    SimulatorProvider.name: SimulatorProvider,
+}
+
+
+def get_provider(name: Optional[str] = None) -> WeatherProvider:
+    """
+    Create a weather provider by name
+
+    Args:
+        name: "open-meteo", "met" or "simulator" (defaults to WEATHER_PROVIDER)
+
+    Returns:
+        WeatherProvider instance
+    """
+    name = name or WEATHER_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown weather provider '{name}'. Available: {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]()
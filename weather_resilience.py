@@ -0,0 +1,301 @@
+"""
+Weather Provider Resilience Module
+Circuit breaker and stale-while-revalidate wrapper around upstream
+weather fetches, so a slow or dead provider never stalls requests
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from singleflight import SingleFlight
+
+# Load environment variables
+load_dotenv()
+
+# Resilience Configuration
+WEATHER_FAILURE_THRESHOLD = int(os.getenv("WEATHER_FAILURE_THRESHOLD", "5"))
+WEATHER_LATENCY_SLO = float(os.getenv("WEATHER_LATENCY_SLO", "3.0"))
+WEATHER_RECOVERY_TIMEOUT = float(os.getenv("WEATHER_RECOVERY_TIMEOUT", "30"))
+WEATHER_REFRESH_WORKERS = int(os.getenv("WEATHER_REFRESH_WORKERS", "4"))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker
+
+    The circuit opens after failure_threshold consecutive failures; a call
+    slower than latency_slo seconds counts as a failure even if it
+    succeeded. After recovery_timeout seconds the circuit half-opens and
+    lets a single probe call through: success closes it, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = WEATHER_FAILURE_THRESHOLD,
+                 latency_slo: float = WEATHER_LATENCY_SLO,
+                 recovery_timeout: float = WEATHER_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_slo = latency_slo
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.slo_breaches = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed, moving open -> half-open when due"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency: float):
+        if latency > self.latency_slo:
+            with self._lock:
+                self.slo_breaches += 1
+            self.record_failure(f"latency {latency:.2f}s exceeded SLO {self.latency_slo:.2f}s")
+            return
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = self.CLOSED
+
+    def record_failure(self, reason: str):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = reason
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"⚠️  Circuit '{self.name}' opened: {reason}")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give up a call's probe slot without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() through the breaker
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self.record_failure(str(e) or type(e).__name__)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no verdict on the upstream, but a
+            # half-open circuit must be free to probe again
+            self.release_probe()
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of call() for coroutine functions
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except Exception as e:
+            self.record_failure(str(e) or type(e).__name__)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no verdict on the upstream, but a
+            # half-open circuit must be free to probe again
+            self.release_probe()
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "slo_breaches": self.slo_breaches,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "open_for_seconds": round(time.monotonic() - self.opened_at, 1)
+                if self.state != self.CLOSED and self.opened_at else 0.0,
+                "last_error": self.last_error,
+                "failure_threshold": self.failure_threshold,
+                "latency_slo": self.latency_slo,
+                "recovery_timeout": self.recovery_timeout,
+            }
+
+
+class ResilientFetcher:
+    """
+    Stale-while-revalidate front for an upstream provider
+
+    fetch() returns a fresh cached value when there is one. Otherwise it
+    serves the last good (stale) value immediately and refreshes it in the
+    background. Only when nothing is cached does the caller wait for the
+    upstream, and every upstream call goes through the circuit breaker.
+    """
+
+    def __init__(self, name: str, breaker: Optional[CircuitBreaker] = None,
+                 flights: Optional[SingleFlight] = None):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(name)
+        self.flights = flights or SingleFlight()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.fresh_served = 0
+        self.stale_served = 0
+        self.upstream_loads = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _start_refresh(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def _end_refresh(self, key: Hashable, error: Optional[BaseException]):
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is not None:
+                self.refresh_failures += 1
+
+    def _refresh(self, key: Hashable, load: Callable[[], Any]):
+        error = None
+        try:
+            self.flights.do(key, lambda: self.breaker.call(load))
+        except Exception as e:
+            error = e
+        finally:
+            # Always clear the key, or it would be served stale without refreshes forever
+            self._end_refresh(key, error)
+
+    async def _refresh_async(self, key: Hashable, load: Callable[[], Awaitable[Any]]):
+        error = None
+        try:
+            await self.flights.do_async(key, lambda: self.breaker.call_async(load))
+        except Exception as e:
+            error = e
+        finally:
+            self._end_refresh(key, error)
+
+    def fetch(self, key: Hashable, lookup: Callable[[], Optional[Tuple[Any, bool]]],
+              load: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Get a value with stale-while-revalidate semantics
+
+        Args:
+            key: Single-flight key for the upstream load
+            lookup: Reads the cache once, returning (value, is_fresh) for a
+                fresh or stale entry and None on miss
+            load: Performs the upstream call, stores and returns the value
+
+        Returns:
+            Tuple of (value, is_fresh)
+
+        Raises:
+            CircuitOpenError: If nothing is cached and the circuit is open
+        """
+        found = lookup()
+        if found is not None:
+            value, fresh = found
+            if fresh:
+                self.fresh_served += 1
+                return value, True
+            self.stale_served += 1
+            if self._start_refresh(key):
+                if self._executor is None:
+                    with self._lock:
+                        if self._executor is None:
+                            self._executor = ThreadPoolExecutor(
+                                max_workers=WEATHER_REFRESH_WORKERS, thread_name_prefix=f"{self.name}-refresh"
+                            )
+                self._executor.submit(self._refresh, key, load)
+            return value, False
+        self.upstream_loads += 1
+        return self.flights.do(key, lambda: self.breaker.call(load)), True
+
+    async def fetch_async(self, key: Hashable, lookup: Callable[[], Awaitable[Optional[Tuple[Any, bool]]]],
+                          load: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Async counterpart of fetch() with a coroutine lookup, so slow cache
+        tiers need not block the event loop; background refreshes run as
+        tasks on the current event loop
+        """
+        found = await lookup()
+        if found is not None:
+            value, fresh = found
+            if fresh:
+                self.fresh_served += 1
+                return value, True
+            self.stale_served += 1
+            if self._start_refresh(key):
+                task = asyncio.get_running_loop().create_task(self._refresh_async(key, load))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value, False
+        self.upstream_loads += 1
+        return await self.flights.do_async(key, lambda: self.breaker.call_async(load)), True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get circuit state and serving counters"""
+        with self._lock:
+            refreshing = len(self._refreshing)
+        return {
+            "provider": self.name,
+            "circuit": self.breaker.stats(),
+            "fresh_served": self.fresh_served,
+            "stale_served": self.stale_served,
+            "upstream_loads": self.upstream_loads,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": refreshing,
+            "single_flight": self.flights.stats(),
+        }